@@ -4,9 +4,13 @@ from pathlib import Path
 from flask import Flask, send_from_directory, jsonify, request
 from flask_cors import CORS
 from bson.objectid import ObjectId
-from extensions import bcrypt, jwt, mongo
+from extensions import bcrypt, jwt, mongo, clients
+from json_provider import BSONJSONProvider
 from dotenv import load_dotenv
 from datetime import timedelta
+from features.ai_coach import diary_jobs
+import indexes
+from features.lg_appliance import device_events, device_cycles, device_provisioning, master_catalog
 
 import dns.resolver
 dns.resolver.default_resolver = dns.resolver.Resolver(configure=False)
@@ -29,7 +33,10 @@ except ImportError:
 
 def create_app():
     app = Flask(__name__, static_folder=str(BUILD_DIR), static_url_path='/static_files')
-    CORS(app, resources={r"/api/*": {"origins": "*"}}, supports_credentials=True)
+    # ObjectId/datetime(KST) 등 BSON 타입을 jsonify 에서 바로 직렬화합니다.
+    app.json = BSONJSONProvider(app)
+    CORS(app, resources={r"/api/*": {"origins": "*"}}, supports_credentials=True,
+         expose_headers=["X-Next-Cursor", "ETag"])
 
     app.config.from_object('config.Config')
     app.config["JWT_TOKEN_LOCATION"] = ["headers"]
@@ -43,6 +50,7 @@ def create_app():
     mongo.init_app(app)
     bcrypt.init_app(app)
     jwt.init_app(app)
+    clients.warm()
 
     @jwt.user_lookup_loader
     def user_lookup_loader(_jwt_header, jwt_data):
@@ -74,6 +82,10 @@ def create_app():
 
     # --- DB Initialization ---
     with app.app_context():
+        device_events.ensure_collection()
+        # user_device_name unique 인덱스 전에 예전 가전 문서(_id 가 이름)에 name 을 채웁니다.
+        device_provisioning.migrate_device_names()
+        indexes.ensure_indexes(mongo.db)
         if initialize_master_devices_db:
             print("Checking and initializing master LG devices DB...")
             initialize_master_devices_db()
@@ -82,6 +94,8 @@ def create_app():
             print("="*50)
             print("!! 경고 !!: initialize_master_devices_db 함수가 import되지 않아 DB 초기화를 건너뜁니다.")
             print("="*50)
+        # 마스터 가전 카탈로그를 미리 읽어 둡니다. (preload 된 마스터에서 읽으면 워커들이 물려받습니다)
+        master_catalog.catalog.load()
         
     @app.before_request
     def _req_log():
@@ -134,6 +148,8 @@ def create_app():
     
 if __name__ == '__main__':
     app = create_app()
+    diary_jobs.start_workers()
+    device_cycles.start_scheduler()
     print(f"[SERVE_MODE] {SERVE_MODE}")
     print(f"[STATIC FOLDER] {getattr(app, 'static_folder', None)}")
     app.run(debug=False, host='0.0.0.0', port=5001, ssl_context=('cert.pem', 'key.pem'))
\ No newline at end of file
@@ -1,5 +1,6 @@
 import os
 import json
+import tempfile
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -9,6 +10,25 @@ class Config:
     SECRET_KEY = os.getenv('SECRET_KEY', 'a-default-fallback-secret-key')
     
     COLAB_TTS_URL = os.getenv("COLAB_TTS_URL")
+    # Colab 서버 호출이 실패하면 이 시간(초) 동안은 바로 Google TTS 로 대체합니다.
+    COLAB_TTS_COOLDOWN_SEC = int(os.getenv("COLAB_TTS_COOLDOWN_SEC", "60"))
+
+    # 문장 단위 TTS 스트리밍: 동시 합성 워커 수, 이보다 짧은 문장은 앞 문장과 합쳐서 합성
+    TTS_PIPELINE_WORKERS = int(os.getenv("TTS_PIPELINE_WORKERS", "4"))
+    TTS_MIN_SENTENCE_CHARS = int(os.getenv("TTS_MIN_SENTENCE_CHARS", "6"))
+
+    # --- STT 설정 ---
+    STT_BACKEND = os.getenv("STT_BACKEND", "google")  # "google" 또는 "local"(테스트용 대체 백엔드)
+    STT_WORKERS = int(os.getenv("STT_WORKERS", "4"))
+    STT_MAX_INFLIGHT = int(os.getenv("STT_MAX_INFLIGHT", "4"))
+    STT_SILENCE_RMS = int(os.getenv("STT_SILENCE_RMS", "300"))
+    STT_MIN_SILENCE_MS = int(os.getenv("STT_MIN_SILENCE_MS", "600"))
+    STT_MAX_SEGMENT_MS = int(os.getenv("STT_MAX_SEGMENT_MS", "15000"))
+
+    # --- TTS 캐시 설정 ---
+    TTS_CACHE_DIR = os.getenv("TTS_CACHE_DIR", os.path.join(tempfile.gettempdir(), "momentbox_tts_cache"))
+    TTS_CACHE_MAX_BYTES = int(os.getenv("TTS_CACHE_MAX_BYTES", str(200 * 1024 * 1024)))
+    TTS_CACHE_SHARED_TIER = os.getenv("TTS_CACHE_SHARED_TIER", "").lower()  # "" 또는 "gridfs"
     
     # --- 데이터베이스 설정 ---
     MONGO_URI = os.getenv('MONGO_URI')
@@ -21,8 +41,104 @@ class Config:
     GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
     GEMINI_MODEL = "models/gemini-2.5-flash"
 
+    # --- Gemini 호출 타임아웃/재시도 (호출 위치별) ---
+    LLM_TIMEOUTS = {
+        "chat": 30,
+        "photo": 45,
+        "photo_pregen": 45,
+        "next_photo_wrapup": 30,
+        "diary": 90,
+        "session_summary": 30,
+    }
+    LLM_DEFAULT_TIMEOUT_SEC = 60
+    LLM_MAX_ATTEMPTS = int(os.getenv("LLM_MAX_ATTEMPTS", "3"))
+    LLM_RETRY_BUDGET_RATIO = float(os.getenv("LLM_RETRY_BUDGET_RATIO", "0.1"))  # 호출 1회당 적립되는 재시도 토큰
+    LLM_RETRY_BUDGET_MAX = float(os.getenv("LLM_RETRY_BUDGET_MAX", "10"))
+    LLM_RETRY_BACKOFF_BASE_SEC = 0.5
+    LLM_RETRY_BACKOFF_MAX_SEC = 4
+
+    # --- 날짜 기준 시간대 (달력/날짜 필터) ---
+    APP_TIMEZONE = os.getenv("APP_TIMEZONE", "Asia/Seoul")
+
+    # --- 가전 상태 캐시 ---
+    DEVICE_CACHE_SHARED_TIER = os.getenv("DEVICE_CACHE_SHARED_TIER", "mongo")  # "mongo" 또는 "local"
+    DEVICE_CACHE_MAX_USERS = int(os.getenv("DEVICE_CACHE_MAX_USERS", "5000"))
+
+    # --- 마스터 가전 카탈로그 ---
+    CATALOG_VERSION_CHECK_SEC = float(os.getenv("CATALOG_VERSION_CHECK_SEC", "60"))
+
+    # --- 가전 상태 실시간 전달 (SSE) ---
+    DEVICE_EVENTS_CAPPED_BYTES = int(os.getenv("DEVICE_EVENTS_CAPPED_BYTES", str(16 * 1024 * 1024)))
+    DEVICE_EVENTS_HEARTBEAT_SEC = int(os.getenv("DEVICE_EVENTS_HEARTBEAT_SEC", "15"))
+    DEVICE_EVENTS_RETRY_MS = 3000
+    DEVICE_EVENTS_AWAIT_MS = 1000
+    DEVICE_EVENTS_MAX_PENDING = 256  # 이보다 밀린 구독자는 snapshot 을 다시 받습니다.
+    # 프로세스당 동시 SSE 구독 수. 구독마다 gthread 스레드 하나를 잡으므로 기본값은 GUNICORN_THREADS 의 절반입니다.
+    DEVICE_EVENTS_MAX_SUBSCRIBERS = int(os.getenv(
+        "DEVICE_EVENTS_MAX_SUBSCRIBERS", str(max(1, int(os.getenv("GUNICORN_THREADS", "8")) // 2))
+    ))
+
+    # --- 가전 사이클 자동 완료 ---
+    DEVICE_CYCLE_SCHEDULER = os.getenv("DEVICE_CYCLE_SCHEDULER", "1") == "1"  # 0 이면 이 프로세스에서는 실행하지 않음
+    DEVICE_CYCLE_SWEEP_SEC = float(os.getenv("DEVICE_CYCLE_SWEEP_SEC", "5"))
+    DEVICE_CYCLE_BATCH_SIZE = int(os.getenv("DEVICE_CYCLE_BATCH_SIZE", "500"))
+    DEVICE_CYCLE_LEASE_SEC = 30
+
+    # --- 가전 일괄 제어 ---
+    DEVICE_BATCH_MAX_COMMANDS = int(os.getenv("DEVICE_BATCH_MAX_COMMANDS", "50"))
+    DEVICE_PROVISION_BATCH_USERS = int(os.getenv("DEVICE_PROVISION_BATCH_USERS", "200"))  # backfill 때 insert_many 한 번에 넣을 사용자 수
+
+    # --- 가전 사용 기록 ---
+    DEVICE_TELEMETRY_MAX_EVENTS_PER_BUCKET = 500  # 가전별 하루 문서에 남길 최대 이벤트 수
+    DEVICE_USAGE_MAX_DAYS = int(os.getenv("DEVICE_USAGE_MAX_DAYS", "366"))
+
+    # --- 목록 페이지네이션 ---
+    PAGE_DEFAULT_LIMIT = int(os.getenv("PAGE_DEFAULT_LIMIT", "50"))
+    PAGE_MAX_LIMIT = int(os.getenv("PAGE_MAX_LIMIT", "200"))
+
+    # --- 일기 대화 기록 버킷 ---
+    DIARY_MESSAGES_PER_BUCKET = int(os.getenv("DIARY_MESSAGES_PER_BUCKET", "50"))
+
+    # --- 일기 내보내기 ---
+    DIARY_EXPORT_BATCH_SIZE = int(os.getenv("DIARY_EXPORT_BATCH_SIZE", "100"))
+
+    # --- 일기 검색 ---
+    DIARY_SEARCH_MAX_RESULTS = int(os.getenv("DIARY_SEARCH_MAX_RESULTS", "100"))
+    DIARY_SEARCH_MAX_TERMS = 32
+
+    # --- AI 코치 세션 설정 ---
+    AI_SESSION_TOKEN_BUDGET = int(os.getenv("AI_SESSION_TOKEN_BUDGET", "2000"))
+    AI_SESSION_SUMMARY_MAX_CHARS = int(os.getenv("AI_SESSION_SUMMARY_MAX_CHARS", "600"))
+
+    # --- 일기 생성 비동기 작업 (웹 워커와 별개의 작업 스레드 풀) ---
+    DIARY_JOB_WORKERS = int(os.getenv("DIARY_JOB_WORKERS", "2"))
+    DIARY_JOB_MAX_ATTEMPTS = int(os.getenv("DIARY_JOB_MAX_ATTEMPTS", "4"))
+    DIARY_JOB_BACKOFF_BASE_SEC = float(os.getenv("DIARY_JOB_BACKOFF_BASE_SEC", "2"))
+    DIARY_JOB_BACKOFF_MAX_SEC = float(os.getenv("DIARY_JOB_BACKOFF_MAX_SEC", "60"))
+    # 실행 중인 작업은 HEARTBEAT 마다 임대를 LEASE 만큼 연장합니다. (LLM 재시도까지 포함한 실행 시간이 임대보다 길어도 됨)
+    DIARY_JOB_LEASE_SEC = int(os.getenv("DIARY_JOB_LEASE_SEC", "180"))
+    DIARY_JOB_HEARTBEAT_SEC = float(os.getenv("DIARY_JOB_HEARTBEAT_SEC", "30"))
+    DIARY_JOB_POLL_SEC = float(os.getenv("DIARY_JOB_POLL_SEC", "1"))
+    # /diary_jobs/<id>/events 스트림이 요청 스레드를 잡고 있는 최대 시간. 넘으면 timeout 이벤트 후 닫습니다.
+    DIARY_JOB_EVENTS_MAX_SEC = int(os.getenv("DIARY_JOB_EVENTS_MAX_SEC", "120"))
+
     # --- GCS 설정 ---
     GCS_BUCKET_NAME = "momentbox"
+    SERVICE_ACCOUNT_FILE = os.getenv("SERVICE_ACCOUNT_FILE")  # 비어 있으면 기본 인증(ADC) 사용
+
+    # --- 사진 대화용 이미지 준비 캐시 ---
+    PHOTO_MAX_EDGE = int(os.getenv("PHOTO_MAX_EDGE", "1024"))
+    PHOTO_JPEG_QUALITY = int(os.getenv("PHOTO_JPEG_QUALITY", "85"))
+    PHOTO_CACHE_MAX_BYTES = int(os.getenv("PHOTO_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+    PHOTO_PREFETCH_WORKERS = int(os.getenv("PHOTO_PREFETCH_WORKERS", "4"))
+
+    # 사진 세션 시작 시 나머지 사진의 첫 질문을 미리 생성할지 여부와 동시 생성 수
+    PHOTO_PREGENERATE = os.getenv("PHOTO_PREGENERATE", "false").lower() == "true"
+    PHOTO_PREGENERATE_CONCURRENCY = int(os.getenv("PHOTO_PREGENERATE_CONCURRENCY", "3"))
+    PHOTO_PREGENERATE_WAIT_SEC = int(os.getenv("PHOTO_PREGENERATE_WAIT_SEC", "30"))
+
+    # --- 외부 HTTP (Colab TTS 등) 커넥션 풀 크기 ---
+    HTTP_POOL_MAXSIZE = int(os.getenv("HTTP_POOL_MAXSIZE", "16"))
 
     SYSTEM_PROMPT = """
         너는 ‘일기 코치’다.
@@ -58,6 +174,13 @@ class Config:
         - 답변은 2문장으로 짧게 해줘.
         - 사용자가 답변하면 그 내용을 기반으로 질문을 이어가고, 다음 사진으로 넘어갈 때까지 이 역할을 유지해줘.
         """
+    SESSION_SUMMARY_PROMPT = """
+        너는 일기 코치와 사용자의 대화를 요약하는 역할을 맡았다.
+        - 기존 요약과 새 대화를 합쳐 하나의 요약으로 다시 작성한다.
+        - 오늘 있었던 사건, 사람, 장소, 사용자가 드러낸 감정 위주로 사실만 남긴다.
+        - 이미 나눈 질문은 짧게 표시해서 같은 질문을 반복하지 않도록 한다.
+        - 요약문만 출력한다.
+        """
     DIARY_PROMPT = """
         너는 사용자의 일기 작성을 돕는 AI 비서다.
         아래에 제공된 대화 기록과 사진 정보를 바탕으로 사용자의 하루를 요약하고, 감정을 담은 따뜻한 문체로 한 편의 일기를 작성해 줘.
@@ -1,7 +1,103 @@
+import os
+import threading
+
 from flask_bcrypt import Bcrypt
 from flask_jwt_extended import JWTManager
 from flask_pymongo import PyMongo
 
+from config import Config
+
 bcrypt = Bcrypt()
 jwt = JWTManager()
 mongo = PyMongo()
+
+
+class ClientRegistry:
+    """
+    Gemini / GCS / Cloud TTS / Colab HTTP 세션을 프로세스 단위로 한 번만 만들어 재사용합니다.
+    gunicorn --preload 처럼 fork 된 자식 프로세스에서는 부모의 gRPC/TLS 연결을 물려받지 않고 새로 만듭니다.
+    """
+
+    def __init__(self):
+        self._reset()
+        if hasattr(os, "register_at_fork"):
+            os.register_at_fork(after_in_child=self._reset)
+
+    def _reset(self):
+        self._pid = os.getpid()
+        # bucket() 처럼 만드는 중에 다른 클라이언트(gcs)를 꺼내는 경우가 있어 재진입 가능한 잠금을 씁니다.
+        self._lock = threading.RLock()
+        self._clients = {}
+        self._gemini_configured = False
+
+    def _get(self, name, factory):
+        if self._pid != os.getpid():
+            self._reset()
+        client = self._clients.get(name)
+        if client is None:
+            with self._lock:
+                client = self._clients.get(name)
+                if client is None:
+                    client = factory()
+                    self._clients[name] = client
+        return client
+
+    @property
+    def gcs(self):
+        def factory():
+            from google.cloud import storage
+            if Config.SERVICE_ACCOUNT_FILE:
+                return storage.Client.from_service_account_json(Config.SERVICE_ACCOUNT_FILE)
+            return storage.Client()
+        return self._get("gcs", factory)
+
+    def bucket(self, bucket_name=None):
+        bucket_name = bucket_name or Config.GCS_BUCKET_NAME
+        return self._get(f"gcs_bucket:{bucket_name}", lambda: self.gcs.bucket(bucket_name))
+
+    @property
+    def tts(self):
+        def factory():
+            from google.cloud import texttospeech
+            return texttospeech.TextToSpeechClient()
+        return self._get("tts", factory)
+
+    @property
+    def http(self):
+        """Colab TTS 서버 등 외부 HTTP 호출용 keep-alive 커넥션 풀."""
+        def factory():
+            import requests
+            from requests.adapters import HTTPAdapter
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=4, pool_maxsize=Config.HTTP_POOL_MAXSIZE)
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+            return session
+        return self._get("http", factory)
+
+    def gemini_model(self, model_name=None):
+        import google.generativeai as genai
+        model_name = model_name or Config.GEMINI_MODEL
+
+        def factory():
+            if not self._gemini_configured and Config.GEMINI_API_KEY:
+                genai.configure(api_key=Config.GEMINI_API_KEY)
+                self._gemini_configured = True
+            return genai.GenerativeModel(model_name)
+        return self._get(f"gemini:{model_name}", factory)
+
+    def warm(self):
+        """서버 시작 시 클라이언트를 미리 만들어 첫 요청에서 인증/TLS 핸드셰이크 비용을 치르지 않도록 합니다."""
+        for name, create in (
+            ("gemini", self.gemini_model),
+            ("gcs", lambda: self.bucket()),
+            ("tts", lambda: self.tts),
+            ("http", lambda: self.http),
+        ):
+            try:
+                create()
+            except Exception as e:
+                print(f"WARNING: {name} 클라이언트 초기화 실패. {e}")
+
+
+clients = ClientRegistry()
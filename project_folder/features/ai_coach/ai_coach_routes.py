@@ -1,10 +1,47 @@
-from flask import Blueprint, request, jsonify, Response
+from flask import Blueprint, request, jsonify, Response, stream_with_context
+import itertools
+import time
 import traceback
 from flask_jwt_extended import jwt_required, current_user
-from . import ai_coach_service
+from . import ai_coach_service, diary_jobs, llm_metrics
+from config import Config
+from json_provider import dumps_bytes
 
 ai_coach_bp = Blueprint('ai_coach', __name__, url_prefix='/api/ai_coach')
 
+def _wants_stream(data):
+    """요청 본문의 stream 플래그 또는 Accept: text/event-stream 헤더로 스트리밍 모드를 판단합니다."""
+    if data and data.get("stream"):
+        return True
+    return request.accept_mimetypes.best == "text/event-stream"
+
+def _sse_event(event, payload):
+    # REST 응답(app.json)과 같은 인코더로 직렬화합니다. (ObjectId, datetime 등)
+    return f"event: {event}\ndata: ".encode() + dumps_bytes(payload) + b"\n\n"
+
+def _sse_response(events, extra=None):
+    """
+    서비스의 ('token' | 'done', payload) 이벤트 스트림을 Server-Sent Events 응답으로 변환합니다.
+    첫 이벤트는 미리 받아 두어, 입력 검증 오류는 스트림 시작 전에 일반 JSON 오류로 반환되도록 합니다.
+    """
+    first = next(events)
+
+    def generate():
+        try:
+            for event, payload in itertools.chain([first], events):
+                if event == "done" and extra:
+                    payload = {**extra, **payload}
+                yield _sse_event(event, payload)
+        except Exception as e:
+            traceback.print_exc()
+            yield _sse_event("error", {"status": "error", "message": str(e)})
+
+    return Response(
+        stream_with_context(generate()),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
 @ai_coach_bp.route('/init', methods=['POST'])
 @jwt_required()
 def init_session():
@@ -19,14 +56,22 @@ def init_session():
 @ai_coach_bp.route('/start_photo_session', methods=['POST'])
 @jwt_required()
 def start_photo_session():
-    """사진 목록을 받아 사진 기반 대화를 시작합니다."""
+    """
+    사진 목록을 받아 사진 기반 대화를 시작합니다.
+    "pregenerate": true 이면 나머지 사진의 첫 질문을 미리 생성해 next_photo 가 바로 응답하도록 합니다.
+    """
     try:
         user_id = current_user['_id']
         data = request.get_json()
         diary_id = data.get("diary_id")              
         photo_list = data.get("photos", [])          
+        pregenerate = data.get("pregenerate")
 
-        result = ai_coach_service.start_photo_session_logic(user_id, diary_id, photo_list)
+        if _wants_stream(data):
+            events = ai_coach_service.start_photo_session_stream(user_id, diary_id, photo_list, pregenerate)
+            return _sse_response(events, extra={"status": "success"})
+
+        result = ai_coach_service.start_photo_session_logic(user_id, diary_id, photo_list, pregenerate)
         return jsonify({"status": "success", **result})
     except Exception as e:
         traceback.print_exc()
@@ -41,6 +86,9 @@ def next_photo():
         user_id = current_user['_id']
         data = request.get_json()
         diary_id = data.get("diary_id")   
+        if _wants_stream(data):
+            return _sse_response(ai_coach_service.next_photo_stream(user_id, diary_id), extra={"status": "success"})
+
         result = ai_coach_service.next_photo_logic(user_id, diary_id)
         return jsonify({"status": "success", **result})
     except Exception as e:
@@ -49,13 +97,19 @@ def next_photo():
 @ai_coach_bp.route('/chat', methods=['POST'])
 @jwt_required()
 def chat():
-    """일반 텍스트 입력을 처리합니다."""
+    """
+    일반 텍스트 입력을 처리합니다.
+    본문에 "stream": true 를 주거나 Accept: text/event-stream 으로 요청하면 응답을 SSE 로 스트리밍합니다.
+    """
     try:
         user_id = current_user['_id']
         data = request.get_json()
         diary_id = data.get("diary_id")            
         user_query = data.get("text")
 
+        if _wants_stream(data):
+            return _sse_response(ai_coach_service.process_user_input_stream(user_id, user_query, diary_id))
+
         result = ai_coach_service.process_user_input_logic(user_id, user_query, diary_id)
         return jsonify(result)
     except Exception as e:
@@ -67,6 +121,7 @@ def text_to_speech():
     """
     텍스트와 diary_id를 받아, 해당 일기에 설정된 스피커(목소리)로 음성을 변환합니다.
     Colab 서버 실패 시 Google 기본 음성으로 자동 대체됩니다.
+    "stream": true 이면 문장 단위로 병렬 합성하여 준비된 순서대로 오디오를 스트리밍합니다.
     """
     try:
         data = request.get_json()
@@ -76,6 +131,10 @@ def text_to_speech():
         if not text or not diary_id:
             return jsonify({"status": "error", "message": "텍스트 또는 diary_id가 없습니다."}), 400
         
+        if data.get('stream'):
+            audio_stream, mimetype = ai_coach_service.text_to_speech_stream(text, diary_id)
+            return Response(stream_with_context(audio_stream), mimetype=mimetype)
+
         audio_content, mimetype = ai_coach_service.text_to_speech_logic(text, diary_id)
         return Response(audio_content, mimetype=mimetype)
     
@@ -84,6 +143,18 @@ def text_to_speech():
         traceback.print_exc() 
         return jsonify({"status": "error", "message": str(e)}), 500
 
+@ai_coach_bp.route('/metrics', methods=['GET'])
+@jwt_required()
+def llm_call_metrics():
+    """Gemini 호출 위치별 지연 시간 히스토그램, 토큰 수, 오류/재시도 횟수와 TTS 캐시 통계를 반환합니다."""
+    return jsonify({"llm": llm_metrics.snapshot(), "tts_cache": ai_coach_service.get_tts_cache_stats()})
+
+@ai_coach_bp.route('/tts/cache_stats', methods=['GET'])
+@jwt_required()
+def tts_cache_stats():
+    """TTS 캐시 적중/미스 카운터와 디스크 사용량을 반환합니다."""
+    return jsonify({"status": "success", "stats": ai_coach_service.get_tts_cache_stats()})
+
 @ai_coach_bp.route('/stt', methods=['POST'])
 @jwt_required() # API 남용 방지를 위해 인증 필요
 def speech_to_text():
@@ -119,11 +190,18 @@ def create_diary():
 @ai_coach_bp.route('/generate_diary', methods=['POST'])
 @jwt_required()
 def generate_diary():
-    """대화 내용을 바탕으로 일기를 생성합니다."""
+    """
+    대화 내용을 바탕으로 일기를 생성합니다.
+    "async": true 이면 생성 작업을 큐에 넣고 바로 job_id 를 반환합니다. (202, 같은 일기에 대한 중복 요청은 같은 작업 반환)
+    """
     try:
         user_id = current_user['_id']
         data = request.get_json()
         diary_id = data.get("diary_id")
+        if data.get("async"):
+            job = diary_jobs.enqueue(user_id, diary_id)
+            return jsonify({"status": "accepted", **diary_jobs.serialize_job(job)}), 202
+
         result = ai_coach_service.generate_diary_logic(user_id, diary_id)
         return jsonify({"status": "success", **result})
     except ValueError as e:
@@ -131,6 +209,55 @@ def generate_diary():
     except Exception as e:
         return jsonify({"status": "error", "message": str(e)}), 500
 
+@ai_coach_bp.route('/diary_jobs/<job_id>', methods=['GET'])
+@jwt_required()
+def get_diary_job(job_id):
+    """일기 생성 작업의 상태와 (완료 시) 결과를 반환합니다."""
+    try:
+        job = diary_jobs.get_job(current_user['_id'], job_id)
+        if not job:
+            return jsonify({"status": "error", "message": "Job not found"}), 404
+        return jsonify({"status": "success", **diary_jobs.serialize_job(job)})
+    except Exception as e:
+        return jsonify({"status": "error", "message": str(e)}), 500
+
+@ai_coach_bp.route('/diary_jobs/<job_id>/events', methods=['GET'])
+@jwt_required()
+def diary_job_events(job_id):
+    """
+    일기 생성 작업 상태가 바뀔 때마다 SSE 로 알리고, 완료/실패 시 스트림을 닫습니다.
+    요청 스레드를 오래 잡지 않도록 DIARY_JOB_EVENTS_MAX_SEC 가 지나면 timeout 이벤트를 보내고 닫으므로,
+    그 뒤에는 GET /diary_jobs/<job_id> 로 상태를 확인하거나 다시 구독하면 됩니다.
+    """
+    user_id = current_user['_id']
+    if not diary_jobs.get_job(user_id, job_id):
+        return jsonify({"status": "error", "message": "Job not found"}), 404
+
+    def generate():
+        last_state = None
+        deadline = time.monotonic() + Config.DIARY_JOB_EVENTS_MAX_SEC
+        while True:
+            job = diary_jobs.get_job(user_id, job_id)
+            if job is None:
+                yield _sse_event("error", {"job_id": job_id, "message": "Job not found"})
+                return
+            state = (job["status"], job.get("attempts", 0))
+            if state != last_state:
+                last_state = state
+                yield _sse_event(job["status"], diary_jobs.serialize_job(job))
+            if job["status"] in diary_jobs.TERMINAL_STATUSES:
+                return
+            if time.monotonic() >= deadline:
+                yield _sse_event("timeout", {"job_id": job_id, "status": job["status"]})
+                return
+            time.sleep(1)
+
+    return Response(
+        stream_with_context(generate()),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
 @ai_coach_bp.route('/diaries/<diary_id>', methods=['PUT'])
 @jwt_required()
 def update_diary(diary_id):
@@ -4,138 +4,89 @@ import traceback
 from datetime import datetime
 import os
 import io
+import struct
+import time
+import wave
+from concurrent.futures import ThreadPoolExecutor
 import json
-import PIL.Image
 from google.cloud import texttospeech
 import speech_recognition as sr
 from pydub import AudioSegment
-from pydub.exceptions import CouldntDecodeError
 from bson.objectid import ObjectId
-from google.cloud import storage
 import google.auth
-from urllib.parse import unquote 
 import requests 
 
 from features.lg_appliance import lg_appliance_service
+from features.ai_coach import session_store
+from features.ai_coach.tts_cache import tts_cache
+from features.ai_coach import photo_pregen, stt_pipeline, llm_metrics, conversation_store
+from features.diaries.search_index import search_index
+from features.ai_coach.photo_cache import photo_cache, blob_name_from_url, PREPARED_MIMETYPE
 from config import Config
-from extensions import mongo
+from extensions import mongo, clients
 
-SERVICE_VERSION = "Final"
+# Colab TTS 서버가 마지막으로 실패한 시각 (time.monotonic 기준)
+_colab_last_failure = float("-inf")
+
+# 문장 단위 TTS 파이프라인용 워커 풀과 문장 경계 (마침표/물음표/느낌표/말줄임표/물결 뒤 공백, 줄바꿈)
+_tts_executor = ThreadPoolExecutor(max_workers=Config.TTS_PIPELINE_WORKERS, thread_name_prefix="tts")
+_SENTENCE_BOUNDARY = re.compile(r"(?<=[.!?。！？…~])\s+|\n+")
 
 def append_diary_conversation(diary_id, role, content, photo_filename=None):
-    """특정 일기에 대화 메시지를 추가"""
-    mongo.db.diaries.update_one(
-        {"_id": ObjectId(diary_id)},
-        {
-            "$push": {
-                "conversations": {
-                    "role": role,
-                    "content": content,
-                    "photo_url": photo_filename,  
-                    "created_at": datetime.utcnow()
-                }
-            },
-            "$set": {"updated_at": datetime.utcnow()}
-        }
+    """특정 일기에 대화 메시지를 추가 (대화 기록은 diary_messages 버킷에 저장)"""
+    conversation_store.append_messages(
+        diary_id, [conversation_store.make_message(role, content, photo_filename)]
     )
 
-def _get_user_session(user_id):
-    """DB에서 사용자 세션 정보를 가져옵니다."""
-    user = mongo.db.users.find_one({"_id": ObjectId(user_id)}, {"ai_session": 1})
-    if user and "ai_session" in user:
-        return user["ai_session"]
-    return {
-        "history": [],
-        "selected_photos": [],
-        "current_photo_index": -1,
-        "current_mode": "idle"
-    }
-
-def _save_user_session(user_id, session_data):
-    """DB에 사용자 세션 정보를 저장합니다."""
-    print(f"\n--- [DEBUG {SERVICE_VERSION}] _save_user_session 시작 ---")
-    try:
-        serializable_history = []
-        history_to_process = session_data.get('history', [])
-        print(f"[DEBUG {SERVICE_VERSION}] 변환 전 history 항목 개수: {len(history_to_process)}")
-
-        for i, item in enumerate(history_to_process):
-            print(f"[DEBUG {SERVICE_VERSION}] History item #{i}의 타입: {type(item)}")
-            if hasattr(item, 'role') and hasattr(item, 'parts'):
-                serializable_item = {"role": item.role, "parts": []}
-                for part in item.parts:
-                    if hasattr(part, 'text'): 
-                        serializable_item["parts"].append({"text": part.text})
-                    elif hasattr(part, 'blob'): 
-                        if hasattr(part.blob, 'to_dict'):
-                            serializable_item["parts"].append({"blob": part.blob.to_dict()})
-                        else:
-                            serializable_item["parts"].append({"blob": str(part.blob)})
-                    else:
-                        if hasattr(part, 'to_dict'):
-                            serializable_item["parts"].append(part.to_dict())
-                        else:
-                            serializable_item["parts"].append(str(part))
-                serializable_history.append(serializable_item)
-            elif isinstance(item, dict): 
-                if 'parts' in item and isinstance(item['parts'], list):
-                    new_parts = []
-                    for part in item['parts']:
-                        if hasattr(part, 'text'):
-                            new_parts.append({"text": part.text})
-                        elif hasattr(part, 'blob'):
-                            if hasattr(part.blob, 'to_dict'):
-                                new_parts.append({"blob": part.blob.to_dict()})
-                            else:
-                                new_parts.append({"blob": str(part.blob)})
-                        else:
-                            if hasattr(part, 'to_dict'):
-                                new_parts.append(part.to_dict())
-                            else:
-                                new_parts.append(part) 
-                    item['parts'] = new_parts
-                serializable_history.append(item)
-            else:
-                print(f"[DEBUG {SERVICE_VERSION}] History item #{i}는 일반 객체입니다. 그대로 추가합니다.")
-                serializable_history.append(item)
-
-        session_data['history'] = serializable_history
-        print(f"[DEBUG {SERVICE_VERSION}] History 변환 완료.")
-
-        mongo.db.users.update_one(
-            {"_id": ObjectId(user_id)},
-            {"$set": {"ai_session": session_data}}
-        )
-        print(f"--- [DEBUG {SERVICE_VERSION}] _save_user_session 성공적으로 완료 ---\n")
-    except Exception as e:
-        print(f"--- [DEBUG {SERVICE_VERSION}] _save_user_session 에서 오류 발생: {e} ---")
-        raise e
-
-def initialize_general_chat_session(user_id):
-    """일반 대화 세션을 초기화합니다. (가전 브리핑 비활성화)"""
-    session = {
-        "history": [],
-        "selected_photos": [],
-        "current_photo_index": -1,
-        "current_mode": "idle"
-    }
-    
-    initial_history = [
+def _general_chat_preamble():
+    return [
         {"role": "user", "parts": [Config.SYSTEM_PROMPT]},
         {"role": "model", "parts": ["네, 일기 코치 역할을 시작합니다."]},
     ]
-    
-    session['current_mode'] = "general_chat"
-    session['history'] = initial_history
-    
-    _save_user_session(user_id, session)
+
+def initialize_general_chat_session(user_id):
+    """일반 대화 세션을 초기화합니다. (가전 브리핑 비활성화)"""
+    # 사진 세션에서 넘어온 경우 미리 생성된 질문과 토큰도 같은 쓰기에서 지웁니다.
+    photo_pregen.cancel(user_id, clear_session=False)
+    session_store.reset_session(
+        user_id, "general_chat", preamble=_general_chat_preamble(), clear=photo_pregen.SESSION_FIELDS
+    )
     
     return "일기 코치와의 대화를 시작합니다."
 
-def start_photo_session_logic(user_id, diary_id, photo_url_list):
+def _stream_reply(site, chat, content):
+    """[Helper] Gemini 응답을 생성되는 대로 조각(token) 단위로 내보내고, 완성된 전체 텍스트를 반환합니다."""
+    chunks = []
+    for chunk in llm_metrics.stream_message(site, chat, content):
+        try:
+            text = chunk.text
+        except ValueError:
+            # finish_reason 만 담긴 마지막 조각 등 텍스트가 없는 chunk 는 건너뜁니다.
+            continue
+        if text:
+            chunks.append(text)
+            yield ("token", {"text": text})
+    return "".join(chunks).strip()
+
+
+def _drain_events(events):
+    """[Helper] 이벤트 스트림을 끝까지 소비하고 마지막 'done' 이벤트의 결과만 반환합니다. (비스트리밍 모드용)"""
+    result = None
+    for event, payload in events:
+        if event == "done":
+            result = payload
+    return result
+
+
+def start_photo_session_logic(user_id, diary_id, photo_url_list, pregenerate=None):
     """
     선택된 사진 URL 배열을 diary에 추가하고 첫 번째 사진 대화를 시작합니다.
+    pregenerate 가 참이면(기본값: Config.PHOTO_PREGENERATE) 나머지 사진의 첫 질문을 미리 생성해 둡니다.
     """
+    return _drain_events(start_photo_session_stream(user_id, diary_id, photo_url_list, pregenerate))
+
+def start_photo_session_stream(user_id, diary_id, photo_url_list, pregenerate=None):
+    """start_photo_session_logic 의 스트리밍 버전. ('token', ...) 이벤트 후 ('done', 결과)를 내보냅니다."""
     if not photo_url_list:
         raise ValueError("선택된 사진이 없습니다.")
     photo_objects = [{'filename': url.split('/')[-1], 'url': url} for url in photo_url_list]
@@ -144,124 +95,154 @@ def start_photo_session_logic(user_id, diary_id, photo_url_list):
         {"$addToSet": {"photos": {"$each": photo_objects}}}
     )
 
-    session = {
-        "history": [],
-        "selected_photos": photo_url_list, 
-        "current_photo_index": 0,
-        "current_mode": "photo_session"
-    }
-    _save_user_session(user_id, session)
+    # 다음 사진으로 넘어갈 때 GCS 다운로드를 기다리지 않도록 전체 사진을 미리 받아 축소해 둡니다.
+    photo_cache.prefetch(photo_url_list)
 
-    return _process_photo_message_logic(user_id, diary_id)
+    if pregenerate is None:
+        pregenerate = Config.PHOTO_PREGENERATE
+    token = photo_pregen.new_token() if pregenerate else None
+    photo_pregen.cancel(user_id, clear_session=False)
 
-def _process_photo_message_logic(user_id, diary_id):
+    session_store.reset_session(
+        user_id, "photo_session", selected_photos=photo_url_list, current_photo_index=0,
+        photo_session_token=token, pregenerated={}
+    )
+    if pregenerate:
+        photo_pregen.start(user_id, token, photo_url_list)
+
+    return (yield from _process_photo_message_events(user_id, diary_id))
+
+def _process_photo_message_events(user_id, diary_id):
     """
     현재 사진(URL)에 대한 대화를 시작합니다.
     """
     print("--- Starting _process_photo_message_logic ---")
-    session = _get_user_session(user_id)
+    session = session_store.get_session(user_id)
     index = session['current_photo_index']
     gcs_url = session['selected_photos'][index]
     print(f"Processing photo URL: {gcs_url}")
 
-    storage_client = storage.Client() 
-    bucket = storage_client.bucket(Config.GCS_BUCKET_NAME)
-
-    blob_name_encoded = gcs_url.replace(f'https://storage.googleapis.com/{Config.GCS_BUCKET_NAME}/', '', 1)
-    blob_name_decoded = unquote(blob_name_encoded) 
-    blob = bucket.blob(blob_name_decoded) 
-    print("Downloading from GCS...")
+    blob_name_decoded = blob_name_from_url(gcs_url)
     try:
-        image_bytes = blob.download_as_bytes()
-        image = PIL.Image.open(io.BytesIO(image_bytes))
-        prompt = [Config.PHOTO_PROMPT, image]
-        print("GCS download successful.")
+        prepared_image = photo_cache.get(gcs_url)
+        prompt = [Config.PHOTO_PROMPT, {"mime_type": PREPARED_MIMETYPE, "data": prepared_image}]
+        print("Prepared photo ready.")
     except google.api_core.exceptions.NotFound:
         print(f"WARNING: File not found in GCS: {blob_name_decoded}") 
         prompt = f"시스템 메시지: 사용자가 '{blob_name_decoded.split('/')[-1]}' 사진에 대해 대화를 시도했지만, 파일을 클라우드 저장소에서 찾을 수 없었습니다. 이 사진을 불러올 수 없다고 사용자에게 알리고, 다음 사진으로 넘어가자고 제안하세요."
         gcs_url = None
 
-    print("Calling Gemini API...")
-    model = genai.GenerativeModel(Config.GEMINI_MODEL)
-    chat = model.start_chat(history=[])
-    
-    try:
-        response = chat.send_message(prompt)
-        ai_response = response.text.strip()
-        print("Gemini API call successful.")
-
-        append_diary_conversation(diary_id, 'ai', ai_response, photo_filename=gcs_url)
-
-        session['history'] = chat.history
-        _save_user_session(user_id, session)
-
-        return {
-            "response": ai_response,
-            "current_photo": gcs_url,
-            "is_last_photo": index == len(session['selected_photos']) - 1
-        }
-    except google.api_core.exceptions.InternalServerError as e:
-        print(f"!! Gemini API Internal Server Error: {e}")
-        error_message = "이 이미지는 현재 처리할 수 없습니다. 다음 사진으로 넘어가 주세요."
-        append_diary_conversation(diary_id, 'ai', error_message, photo_filename=gcs_url)
-        return {
-            "response": error_message,
-            "current_photo": gcs_url,
-            "is_last_photo": index == len(session['selected_photos']) - 1,
-            "error": "ImageProcessingError"
-        }
+    is_last_photo = index == len(session['selected_photos']) - 1
+
+    pregenerated = photo_pregen.take(user_id, session, index) if gcs_url else None
+    if pregenerated:
+        print("Using pregenerated photo question.")
+        ai_response = pregenerated
+        yield ("token", {"text": ai_response})
+        preamble = [
+            {"role": "user", "parts": [Config.PHOTO_PROMPT, session_store.PHOTO_PLACEHOLDER]},
+            {"role": "model", "parts": [ai_response]},
+        ]
+    else:
+        print("Calling Gemini API...")
+        model = clients.gemini_model()
+        chat = model.start_chat(history=[])
+
+        try:
+            ai_response = yield from _stream_reply("photo", chat, prompt)
+            print("Gemini API call successful.")
+        except google.api_core.exceptions.InternalServerError as e:
+            print(f"!! Gemini API Internal Server Error: {e}")
+            error_message = "이 이미지는 현재 처리할 수 없습니다. 다음 사진으로 넘어가 주세요."
+            append_diary_conversation(diary_id, 'ai', error_message, photo_filename=gcs_url)
+            result = {
+                "response": error_message,
+                "current_photo": gcs_url,
+                "is_last_photo": is_last_photo,
+                "error": "ImageProcessingError"
+            }
+            yield ("done", result)
+            return result
+        preamble = chat.history
+
+    append_diary_conversation(diary_id, 'ai', ai_response, photo_filename=gcs_url)
+
+    # 사진 프롬프트와 첫 응답은 이 사진에 대한 대화 동안 고정(preamble)해 둡니다.
+    session_store.reset_session(
+        user_id, "photo_session", preamble=preamble,
+        selected_photos=session['selected_photos'], current_photo_index=index
+    )
+
+    result = {
+        "response": ai_response,
+        "current_photo": gcs_url,
+        "is_last_photo": is_last_photo
+    }
+    yield ("done", result)
+    return result
 
 
 def next_photo_logic(user_id, diary_id):
-    session = _get_user_session(user_id)
-    session['current_photo_index'] += 1
+    return _drain_events(next_photo_stream(user_id, diary_id))
 
-    if session['current_photo_index'] < len(session['selected_photos']):
-        _save_user_session(user_id, session)
-        return _process_photo_message_logic(user_id, diary_id)
-    else:
-        session['current_mode'] = "general_chat"
-        session['selected_photos'] = []
-        session['current_photo_index'] = -1
-        session['history'] = [
-            {"role": "user", "parts": [Config.SYSTEM_PROMPT]},
-            {"role": "model", "parts": ["네, 일기 코치 역할을 시작합니다."]},
-        ]
+def next_photo_stream(user_id, diary_id):
+    """next_photo_logic 의 스트리밍 버전. 마지막 사진 이후의 마무리 멘트도 스트리밍합니다."""
+    session = session_store.get_session(user_id)
+    next_index = session['current_photo_index'] + 1
+
+    if next_index < len(session['selected_photos']):
+        session_store.update_session_state(user_id, current_photo_index=next_index)
+        return (yield from _process_photo_message_events(user_id, diary_id))
+
+    # 사진 세션이 끝났으므로 남은 미리 생성 작업과 결과는 버립니다.
+    photo_pregen.cancel(user_id)
 
-        model = genai.GenerativeModel(Config.GEMINI_MODEL)
-        chat = model.start_chat(history=session['history'])
-        response = chat.send_message("자, 이제 사진 이야기는 끝났어. 오늘 하루는 어땠어?")
-        final_message = response.text.strip()
+    preamble = _general_chat_preamble()
+    model = clients.gemini_model()
+    chat = model.start_chat(history=preamble)
+    final_message = yield from _stream_reply("next_photo_wrapup", chat, "자, 이제 사진 이야기는 끝났어. 오늘 하루는 어땠어?")
 
-        append_diary_conversation(diary_id, 'ai', final_message)
+    append_diary_conversation(diary_id, 'ai', final_message)
 
-        session['history'] = chat.history
-        _save_user_session(user_id, session)
+    session_store.reset_session(
+        user_id, "general_chat", preamble=preamble, window=chat.history[len(preamble):]
+    )
 
-        return {"status": "finished", "response": final_message}
+    result = {"status": "finished", "response": final_message}
+    yield ("done", result)
+    return result
 
 
 def process_user_input_logic(user_id, user_query, diary_id):
-    session = _get_user_session(user_id)
+    return _drain_events(process_user_input_stream(user_id, user_query, diary_id))
+
+def process_user_input_stream(user_id, user_query, diary_id):
+    """
+    process_user_input_logic 의 스트리밍 버전.
+    토큰은 생성되는 즉시 내보내고, 대화 기록과 세션 저장은 응답이 끝난 뒤 한 번만 수행합니다.
+    """
+    session = session_store.get_session(user_id)
 
     if not session['history']:
         raise ValueError("AI가 아직 시작되지 않았습니다.")
     if not user_query:
         raise ValueError("입력된 내용이 없습니다.")
 
-    append_diary_conversation(diary_id, 'user', user_query)
-
-    model = genai.GenerativeModel(Config.GEMINI_MODEL)
+    model = clients.gemini_model()
     chat = model.start_chat(history=session['history'])
-    response = chat.send_message(user_query)
-    ai_response = response.text.strip()
+    ai_response = yield from _stream_reply("chat", chat, user_query)
 
-    append_diary_conversation(diary_id, 'ai', ai_response)
+    # 한 턴의 두 메시지를 한 번의 쓰기로 저장합니다.
+    conversation_store.append_messages(diary_id, [
+        conversation_store.make_message('user', user_query),
+        conversation_store.make_message('ai', ai_response),
+    ])
 
-    session['history'] = chat.history
-    _save_user_session(user_id, session)
+    session_store.append_turns(user_id, session, chat.history[len(session['history']):])
 
-    return {"status": "success", "response": ai_response}
+    result = {"status": "success", "response": ai_response}
+    yield ("done", result)
+    return result
 
 
 def generate_diary_logic(user_id, diary_id):
@@ -269,15 +250,18 @@ def generate_diary_logic(user_id, diary_id):
     if not diary:
         raise ValueError("Diary not found")
 
-    conversations = diary.get("conversations", [])
+    # 사진 세션 도중에 일기를 만들면 쓰이지 않은 미리 생성 작업은 버립니다.
+    photo_pregen.cancel(user_id)
+
+    conversations = conversation_store.load_for_diary(diary)
     categories = diary.get("categories", [])
     photos = diary.get("photos", [])
 
     dialogue_text = "\n".join([f"{c.get('role')}: {c.get('content','')}" for c in conversations])
     prompt = f"{Config.DIARY_PROMPT}\n\n해시태그: {categories}\n대화 기록:\n{dialogue_text}"
 
-    diary_model = genai.GenerativeModel(Config.GEMINI_MODEL)
-    diary_response = diary_model.generate_content(prompt)
+    diary_model = clients.gemini_model()
+    diary_response = llm_metrics.generate_content("diary", diary_model, prompt)
     full_text = diary_response.text.strip()
 
     title_match = re.search(r'\[제목\]\n(.*?)\n\[일기\]', full_text, re.DOTALL)
@@ -292,6 +276,7 @@ def generate_diary_logic(user_id, diary_id):
         {"_id": ObjectId(diary_id)},
         {"$set": {"title": diary_title, "summary_context": diary_text, "status": "completed", "updated_at": datetime.utcnow()}}
     )
+    search_index.index_diary(diary_id)
 
     return {"title": diary_title, "summary_context": diary_text, "photos": photos}
 
@@ -299,7 +284,7 @@ def _google_tts_logic(text):
     """[Helper] 텍스트를 Google 기본 음성(MP3)으로 변환합니다."""
     print("[TTS LOGIC] Using Google Default TTS (MP3)")
     try:
-        client = texttospeech.TextToSpeechClient() 
+        client = clients.tts
         synthesis_input = texttospeech.SynthesisInput(text=text)
         voice = texttospeech.VoiceSelectionParams(language_code="ko-KR", name="ko-KR-Standard-A")
         audio_config = texttospeech.AudioConfig(audio_encoding=texttospeech.AudioEncoding.MP3)
@@ -321,7 +306,7 @@ def _colab_tts_logic(text, speaker):
         "text": text,
         "speaker": speaker  
     }
-    response = requests.post(
+    response = clients.http.post(
         Config.COLAB_TTS_URL,
         json=payload,
         timeout=60  
@@ -339,51 +324,151 @@ def _colab_tts_logic(text, speaker):
         raise Exception(f"Colab TTS 서버 응답 오류 (Code {response.status_code}): {err_msg}")
 
 
+def _cached_google_tts(text):
+    """[Helper] 캐시를 거쳐 Google 기본 음성(MP3)을 반환합니다."""
+    return tts_cache.get_or_synthesize("default", text, "mp3", lambda: _google_tts_logic(text))
+
+def _colab_in_cooldown():
+    return time.monotonic() - _colab_last_failure < Config.COLAB_TTS_COOLDOWN_SEC
+
+def _synthesize_for_speaker(text, speaker):
+    """
+    [Helper] 스피커에 맞춰 캐시 → Colab → Google 순서로 음성을 가져옵니다.
+    Colab 이 최근에 실패했다면 쿨다운 동안은 Colab 을 건너뛰고 바로 Google 음성으로 대체합니다.
+    """
+    global _colab_last_failure
+
+    if speaker == "default":
+        return _cached_google_tts(text)
+
+    cached = tts_cache.get(speaker, text, "wav")
+    if cached:
+        return cached
+
+    if _colab_in_cooldown():
+        print(f"[TTS FALLBACK] Colab TTS 쿨다운 중 (speaker: {speaker}). Google 기본 음성으로 대체합니다.")
+        return _cached_google_tts(text)
+
+    try:
+        audio_content, mimetype = _colab_tts_logic(text, speaker)
+    except Exception as colab_error:
+        _colab_last_failure = time.monotonic()
+        print(f"--- [TTS FALLBACK] ---")
+        print(f"Colab TTS 호출 실패 (speaker: {speaker}). Google 기본 음성으로 대체합니다.")
+        print(f"Colab Error: {colab_error}")
+        print(f"------------------------")
+        return _cached_google_tts(text)
+
+    tts_cache.put(speaker, text, "wav", audio_content, mimetype)
+    return audio_content, mimetype
+
 def text_to_speech_logic(text, diary_id):
     """
     diary_id를 조회하여 설정된 스피커에 따라 TTS를 분기합니다.
+    같은 (스피커, 텍스트) 조합은 캐시에서 바로 반환하며,
     Colab 실패 시 Google 기본 음성으로 자동 대체(fallback)합니다.
     """
     try:
         diary = mongo.db.diaries.find_one({"_id": ObjectId(diary_id)}, {"speaker": 1})
         speaker = diary.get("speaker", "default") if diary else "default"
-        
-        if speaker == "default":
-            return _google_tts_logic(text)
-        
-        else:
-            try:
-                return _colab_tts_logic(text, speaker)
-            except Exception as colab_error:
-                print(f"--- [TTS FALLBACK] ---")
-                print(f"Colab TTS 호출 실패 (speaker: {speaker}). Google 기본 음성으로 대체합니다.")
-                print(f"Colab Error: {colab_error}")
-                print(f"------------------------")
-                return _google_tts_logic(text) 
+        return _synthesize_for_speaker(text, speaker)
 
     except Exception as e:
         print(f"!!! [TTS FATAL ERROR] Google TTS마저 실패했습니다: {e}")
         return _google_tts_logic(text)
 
+def split_sentences(text):
+    """한국어 응답을 문장 단위로 나눕니다. 너무 짧은 조각은 앞 문장에 붙여 합성 호출 수를 줄입니다."""
+    pieces = [p.strip() for p in _SENTENCE_BOUNDARY.split(text) if p and p.strip()]
+    sentences = []
+    for piece in pieces:
+        if sentences and len(piece) < Config.TTS_MIN_SENTENCE_CHARS:
+            sentences[-1] = f"{sentences[-1]} {piece}"
+        else:
+            sentences.append(piece)
+    return sentences
+
+def _wav_stream_header(channels, sample_width, frame_rate):
+    """[Helper] 길이를 모르는 스트리밍용 WAV 헤더 (RIFF/data 크기를 최대값으로 채움)."""
+    return (
+        b"RIFF" + struct.pack("<I", 0xFFFFFFFF) + b"WAVE"
+        + b"fmt " + struct.pack("<IHHIIHH", 16, 1, channels, frame_rate,
+                                frame_rate * channels * sample_width, channels * sample_width, sample_width * 8)
+        + b"data" + struct.pack("<I", 0xFFFFFFFF - 36)
+    )
+
+def _read_wav(audio):
+    with wave.open(io.BytesIO(audio), "rb") as wav:
+        params = (wav.getnchannels(), wav.getsampwidth(), wav.getframerate())
+        return params, wav.readframes(wav.getnframes())
+
+def _to_pcm(audio, mimetype, params):
+    """[Helper] 합성된 조각을 스트림의 WAV 파라미터에 맞는 PCM 으로 변환합니다. (Google 대체 음성이 섞인 경우 등)"""
+    if mimetype == "audio/wav":
+        chunk_params, frames = _read_wav(audio)
+        if chunk_params == params:
+            return frames
+    channels, sample_width, frame_rate = params
+    segment = AudioSegment.from_file(io.BytesIO(audio))
+    return segment.set_channels(channels).set_sample_width(sample_width).set_frame_rate(frame_rate).raw_data
+
+def _to_mp3(audio, mimetype):
+    if mimetype == "audio/mpeg":
+        return audio
+    buffer = io.BytesIO()
+    AudioSegment.from_file(io.BytesIO(audio)).export(buffer, format="mp3")
+    return buffer.getvalue()
+
+def text_to_speech_stream(text, diary_id):
+    """
+    응답을 문장 단위로 나눠 워커 풀에서 동시에 합성하고, 준비되는 순서대로(원문 순서 유지) 스트리밍합니다.
+    첫 문장은 미리 합성해 두어 Content-Type 을 결정하므로 (audio_iterator, mimetype) 을 반환합니다.
+    """
+    diary = mongo.db.diaries.find_one({"_id": ObjectId(diary_id)}, {"speaker": 1})
+    speaker = diary.get("speaker", "default") if diary else "default"
+
+    sentences = split_sentences(text) or [text]
+    futures = [_tts_executor.submit(_synthesize_for_speaker, sentence, speaker) for sentence in sentences]
+
+    try:
+        first_audio, mimetype = futures[0].result()
+    except Exception:
+        for future in futures:
+            future.cancel()
+        raise
+
+    def generate():
+        try:
+            if mimetype == "audio/wav":
+                params, frames = _read_wav(first_audio)
+                yield _wav_stream_header(*params)
+                yield frames
+                for future in futures[1:]:
+                    yield _to_pcm(*future.result(), params)
+            else:
+                yield first_audio
+                for future in futures[1:]:
+                    yield _to_mp3(*future.result())
+        finally:
+            # 클라이언트가 중간에 끊으면 아직 시작하지 않은 합성은 취소합니다.
+            for future in futures:
+                future.cancel()
+
+    return generate(), mimetype
+
+def get_tts_cache_stats():
+    return tts_cache.get_stats()
+
 def speech_to_text_from_file(audio_file):
     """
     업로드된 오디오 파일(스트림)을 텍스트로 변환합니다.
-    pydub을 사용하여 webm -> wav 변환을 명시적으로 수행하고, 변환 실패 시 상세 오류를 기록합니다.
+    ffmpeg 로 16kHz 모노 PCM 을 스트리밍 디코딩하여 묵음 단위로 나눈 뒤, 구간들을 동시에 인식합니다.
+    변환 실패 시 상세 오류를 기록합니다.
     """
     try:
-        audio_segment = AudioSegment.from_file(audio_file)
-        wav_buffer = io.BytesIO()
-        audio_segment.export(wav_buffer, format="wav")
-        wav_buffer.seek(0)
-
-        r = sr.Recognizer()
-        with sr.AudioFile(wav_buffer) as source:
-            audio_data = r.record(source)
-        
-        text = r.recognize_google(audio_data, language='ko-KR')
-        return text
-
-    except CouldntDecodeError as e:
+        return stt_pipeline.transcribe_stream(audio_file)
+
+    except stt_pipeline.AudioDecodeError as e:
         print(f"[PYDUB ERROR] 오디오 파일을 디코딩할 수 없습니다. FFmpeg가 설치되어 있고 PATH에 잡혀있는지 확인하세요. 원본 오류: {e}")
         raise ValueError("오디오 파일 변환 실패. FFmpeg가 설치되지 않았거나 지원하지 않는 오디오 형식입니다.")
     except sr.UnknownValueError:
@@ -404,7 +489,7 @@ def create_diary_session(user_id, categories, speaker):
         "created_at": datetime.utcnow(),
         "updated_at": datetime.utcnow(),
         "speaker": speaker,  
-        "conversations": [],
+        "message_count": 0,
         "photos": [],
         "title": "",
         "summary_context": "",
@@ -435,4 +520,5 @@ def update_diary_content(user_id, diary_id, title, summary_context, status=None,
     )
 
     if result.matched_count == 0:
-        raise ValueError("일기를 찾을 수 없거나 수정 권한이 없습니다.")
\ No newline at end of file
+        raise ValueError("일기를 찾을 수 없거나 수정 권한이 없습니다.")
+    search_index.index_diary(diary_id)
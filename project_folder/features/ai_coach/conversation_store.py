@@ -0,0 +1,114 @@
+"""
+일기 대화 기록 저장소 (bucket 패턴).
+
+대화 메시지는 일기 문서에 쌓지 않고 diary_messages 컬렉션에
+버킷 문서 하나당 최대 DIARY_MESSAGES_PER_BUCKET 개씩 나눠 저장합니다.
+한 턴의 메시지(user + ai)는 한 번의 쓰기로 추가하고, 일기 문서에는 message_count 만 올립니다.
+예전처럼 일기 문서의 conversations 배열에 남아 있는 기록은 읽을 때 앞에 이어 붙입니다.
+
+기존 데이터 이전: python -m features.ai_coach.conversation_store
+"""
+from datetime import datetime
+
+from bson.objectid import ObjectId
+
+from config import Config
+from extensions import mongo
+
+
+# 버킷 시간순 (bucket_order 인덱스)
+BUCKET_ORDER = [("first_at", 1), ("_id", 1)]
+
+
+def open_bucket_filter(diary_id):
+    """메시지를 더 넣을 수 있는 버킷"""
+    return {"diary_id": diary_id, "count": {"$lt": Config.DIARY_MESSAGES_PER_BUCKET}}
+
+
+def transcript_filter(diary_id):
+    return {"diary_id": diary_id}
+
+
+def make_message(role, content, photo_filename=None):
+    return {
+        "role": role,
+        "content": content,
+        "photo_url": photo_filename,
+        "created_at": datetime.utcnow(),
+    }
+
+
+def append_messages(diary_id, messages):
+    """메시지들을 아직 덜 찬 버킷에 한 번에 추가합니다. 찬 버킷만 있으면 새 버킷을 만듭니다."""
+    if not messages:
+        return
+    diary_id = ObjectId(diary_id)
+    now = datetime.utcnow()
+    mongo.db.diary_messages.update_one(
+        open_bucket_filter(diary_id),
+        {
+            "$push": {"messages": {"$each": messages}},
+            "$inc": {"count": len(messages)},
+            "$set": {"last_at": now},
+            "$setOnInsert": {"first_at": now},
+        },
+        upsert=True,
+    )
+    mongo.db.diaries.update_one(
+        {"_id": diary_id},
+        {"$inc": {"message_count": len(messages)}, "$set": {"updated_at": now}},
+    )
+
+
+def load_messages(diary_id, legacy=None):
+    """일기의 전체 대화를 시간순으로 반환합니다. legacy 는 일기 문서에 남아 있던 conversations 배열입니다."""
+    buckets = mongo.db.diary_messages.find(
+        transcript_filter(ObjectId(diary_id)), {"messages": 1}
+    ).sort(BUCKET_ORDER)
+    messages = list(legacy or [])
+    for bucket in buckets:
+        messages.extend(bucket.get("messages", []))
+    return messages
+
+
+def load_for_diary(diary):
+    """일기 문서(conversations 필드 포함 여부 무관)의 전체 대화를 반환합니다."""
+    return load_messages(diary["_id"], diary.get("conversations"))
+
+
+def migrate_embedded(batch_size=100):
+    """일기 문서에 embedded 로 남은 conversations 를 버킷으로 옮기고 필드를 지웁니다."""
+    moved = 0
+    cursor = mongo.db.diaries.find(
+        {"conversations.0": {"$exists": True}}, {"conversations": 1}
+    ).batch_size(batch_size)
+    for diary in cursor:
+        conversations = diary["conversations"]
+        existing = mongo.db.diary_messages.find_one({"diary_id": diary["_id"]}, {"_id": 1})
+        documents = []
+        for start in range(0, len(conversations), Config.DIARY_MESSAGES_PER_BUCKET):
+            chunk = conversations[start:start + Config.DIARY_MESSAGES_PER_BUCKET]
+            documents.append({
+                "diary_id": diary["_id"],
+                "messages": chunk,
+                # 이미 버킷이 있는 일기라면 embedded 기록이 그보다 앞서도록 가장 앞 시각으로 두고,
+                # 새 메시지가 이 앞쪽 버킷에 붙지 않도록 찬 것으로 표시합니다.
+                "count": Config.DIARY_MESSAGES_PER_BUCKET if existing else len(chunk),
+                "first_at": datetime.min if existing else chunk[0].get("created_at", datetime.min),
+                "last_at": chunk[-1].get("created_at", datetime.min),
+            })
+        mongo.db.diary_messages.insert_many(documents)
+        mongo.db.diaries.update_one(
+            {"_id": diary["_id"]},
+            {"$unset": {"conversations": ""}, "$inc": {"message_count": len(conversations)}}
+        )
+        moved += 1
+    return moved
+
+
+if __name__ == "__main__":
+    from app import create_app
+
+    app = create_app()
+    with app.app_context():
+        print(f"[CONVERSATION STORE] 일기 {migrate_embedded()}개의 대화 기록을 이전했습니다.")
@@ -0,0 +1,251 @@
+"""
+일기 생성 비동기 작업 큐.
+
+/generate_diary 요청은 diary_jobs 컬렉션에 작업을 넣고 바로 job_id 를 돌려주며,
+웹 워커와 별도로 크기를 정하는 작업 스레드 풀이 LLM 호출을 처리합니다.
+일기 하나당 진행 중인 작업은 하나뿐이며(부분 unique 인덱스), 실패하면 지수 백오프로 재시도합니다.
+작업을 가져간 스레드는 임대 토큰(lease_token)을 받고 실행 중에 임대를 연장합니다.
+임대가 만료되어 다른 워커가 다시 가져간 작업의 결과는 토큰이 맞지 않으므로 기록하지 않습니다.
+
+단독 실행: python -m features.ai_coach.diary_jobs [작업 스레드 수]
+(웹 프로세스에서는 DIARY_JOB_WORKERS=0 으로 끄고 이 프로세스만 따로 띄울 수 있습니다.)
+"""
+import datetime
+import os
+import random
+import sys
+import threading
+
+from bson.objectid import ObjectId
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+
+from config import Config
+from extensions import mongo
+
+STATUS_QUEUED = "queued"
+STATUS_RUNNING = "running"
+STATUS_SUCCEEDED = "succeeded"
+STATUS_FAILED = "failed"
+TERMINAL_STATUSES = (STATUS_SUCCEEDED, STATUS_FAILED)
+
+
+def _now():
+    return datetime.datetime.now(datetime.timezone.utc)
+
+
+def serialize_job(job):
+    return {
+        "job_id": str(job["_id"]),
+        "diary_id": str(job["diary_id"]),
+        "status": job["status"],
+        "attempts": job.get("attempts", 0),
+        "result": job.get("result"),
+        "error": job.get("error"),
+    }
+
+
+def active_job_filter(diary_id):
+    return {"diary_id": diary_id, "active": True}
+
+
+def claimable_filter(now):
+    """실행 시각이 된 queued 작업과 임대가 만료된 running 작업"""
+    return {"$or": [
+        {"status": STATUS_QUEUED, "run_at": {"$lte": now}},
+        {"status": STATUS_RUNNING, "lease_until": {"$lt": now}},
+    ]}
+
+
+CLAIM_ORDER = [("run_at", 1)]
+
+
+def enqueue(user_id, diary_id):
+    """일기 생성 작업을 등록합니다. 같은 일기에 진행 중인 작업이 있으면 그 작업을 그대로 반환합니다."""
+    user_id, diary_id = ObjectId(user_id), ObjectId(diary_id)
+    if not mongo.db.diaries.find_one({"_id": diary_id, "user_id": user_id}, {"_id": 1}):
+        raise ValueError("Diary not found")
+
+    active = mongo.db.diary_jobs.find_one(active_job_filter(diary_id))
+    if active:
+        return active
+
+    now = _now()
+    job = {
+        "diary_id": diary_id,
+        "user_id": user_id,
+        "status": STATUS_QUEUED,
+        "active": True,
+        "attempts": 0,
+        "max_attempts": Config.DIARY_JOB_MAX_ATTEMPTS,
+        "run_at": now,
+        "created_at": now,
+        "updated_at": now,
+    }
+    try:
+        job["_id"] = mongo.db.diary_jobs.insert_one(job).inserted_id
+        return job
+    except DuplicateKeyError:
+        # 동시에 들어온 같은 요청이 먼저 등록한 경우
+        return mongo.db.diary_jobs.find_one(active_job_filter(diary_id))
+
+
+def get_job(user_id, job_id):
+    return mongo.db.diary_jobs.find_one({"_id": ObjectId(job_id), "user_id": ObjectId(user_id)})
+
+
+def _lease_until(now):
+    return now + datetime.timedelta(seconds=Config.DIARY_JOB_LEASE_SEC)
+
+
+def owned_filter(job):
+    """이 워커가 가져간 뒤 다른 워커가 다시 가져가지 않은 경우에만 맞는 조건"""
+    return {"_id": job["_id"], "lease_token": job["lease_token"]}
+
+
+def _claim():
+    """실행할 작업 하나를 원자적으로 가져옵니다. 임대(lease)가 만료된 running 작업도 다시 가져옵니다."""
+    now = _now()
+    return mongo.db.diary_jobs.find_one_and_update(
+        claimable_filter(now),
+        {
+            "$set": {
+                "status": STATUS_RUNNING,
+                "lease_token": ObjectId(),
+                "lease_until": _lease_until(now),
+                "updated_at": now,
+            },
+            "$inc": {"attempts": 1},
+        },
+        sort=CLAIM_ORDER,
+        return_document=ReturnDocument.AFTER,
+    )
+
+
+def _backoff_seconds(attempts):
+    """지수 백오프 + full jitter"""
+    cap = Config.DIARY_JOB_BACKOFF_BASE_SEC * (2 ** (attempts - 1))
+    return random.uniform(0, min(cap, Config.DIARY_JOB_BACKOFF_MAX_SEC))
+
+
+class _LeaseHeartbeat:
+    """작업이 도는 동안 DIARY_JOB_HEARTBEAT_SEC 마다 임대를 연장하는 스레드"""
+
+    def __init__(self, job):
+        self.job = job
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._loop, name=f"diary-job-lease-{job['_id']}", daemon=True)
+
+    def _loop(self):
+        while not self._stop.wait(Config.DIARY_JOB_HEARTBEAT_SEC):
+            now = _now()
+            try:
+                result = mongo.db.diary_jobs.update_one(
+                    owned_filter(self.job), {"$set": {"lease_until": _lease_until(now), "updated_at": now}}
+                )
+            except Exception as e:
+                print(f"[DIARY JOB] {self.job['_id']} 임대 연장 실패: {e}")
+                continue
+            if result.matched_count == 0:
+                print(f"[DIARY JOB] {self.job['_id']} 임대를 잃었습니다. (다른 워커가 가져감)")
+                return
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stop.set()
+        self._thread.join()
+
+
+def _finish(job, update):
+    """임대 토큰이 맞을 때만 결과를 기록합니다. 이미 다른 워커가 가져간 작업이면 버립니다."""
+    result = mongo.db.diary_jobs.update_one(owned_filter(job), update)
+    if result.matched_count == 0:
+        print(f"[DIARY JOB] {job['_id']} 임대가 만료되어 다른 워커가 가져간 작업입니다. 결과를 기록하지 않습니다.")
+    return result.matched_count == 1
+
+
+def _run(job):
+    from features.ai_coach import ai_coach_service
+
+    try:
+        with _LeaseHeartbeat(job):
+            result = ai_coach_service.generate_diary_logic(job["user_id"], job["diary_id"])
+    except Exception as e:
+        retryable = not isinstance(e, ValueError)
+        now = _now()
+        if retryable and job["attempts"] < job.get("max_attempts", Config.DIARY_JOB_MAX_ATTEMPTS):
+            delay = _backoff_seconds(job["attempts"])
+            print(f"[DIARY JOB] {job['_id']} 실패 ({job['attempts']}회), {delay:.1f}초 후 재시도: {e}")
+            update = {"$set": {
+                "status": STATUS_QUEUED, "error": str(e), "updated_at": now,
+                "run_at": now + datetime.timedelta(seconds=delay),
+            }, "$unset": {"lease_until": "", "lease_token": ""}}
+        else:
+            print(f"[DIARY JOB] {job['_id']} 최종 실패: {e}")
+            update = {"$set": {"status": STATUS_FAILED, "error": str(e), "updated_at": now},
+                      "$unset": {"active": "", "lease_until": "", "lease_token": ""}}
+        _finish(job, update)
+        return
+
+    _finish(job, {
+        "$set": {"status": STATUS_SUCCEEDED, "result": result, "error": None, "updated_at": _now()},
+        "$unset": {"active": "", "lease_until": "", "lease_token": ""},
+    })
+
+
+class DiaryJobWorkerPool:
+    def __init__(self, size=None):
+        self.size = size if size is not None else Config.DIARY_JOB_WORKERS
+        self._stop = threading.Event()
+        self._threads = []
+
+    def _loop(self):
+        while not self._stop.is_set():
+            try:
+                job = _claim()
+            except Exception as e:
+                print(f"[DIARY JOB] 작업 조회 실패: {e}")
+                job = None
+            if job is None:
+                self._stop.wait(Config.DIARY_JOB_POLL_SEC)
+                continue
+            _run(job)
+
+    def start(self):
+        for i in range(self.size):
+            thread = threading.Thread(target=self._loop, name=f"diary-job-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self):
+        self._stop.set()
+
+    def wait(self):
+        self._stop.wait()
+
+
+_pool = None
+_pool_pid = None
+
+
+def start_workers(size=None):
+    """현재 프로세스에서 작업 스레드 풀을 시작합니다. (프로세스당 한 번, fork 후에는 자식에서 다시 시작)"""
+    global _pool, _pool_pid
+    if _pool is not None and _pool_pid == os.getpid():
+        return _pool
+    _pool = DiaryJobWorkerPool(size)
+    _pool_pid = os.getpid()
+    if _pool.size > 0:
+        _pool.start()
+        print(f"[DIARY JOB] 작업 스레드 {_pool.size}개 시작 (pid {_pool_pid})")
+    return _pool
+
+
+if __name__ == "__main__":
+    from app import create_app
+
+    create_app()
+    start_workers(int(sys.argv[1]) if len(sys.argv) > 1 else max(Config.DIARY_JOB_WORKERS, 1)).wait()
@@ -0,0 +1,193 @@
+"""
+Gemini 호출 공통 래퍼.
+
+모든 Gemini 호출은 호출 위치(site) 이름과 함께 이곳을 거칩니다.
+site 별 지연 시간 히스토그램, 입력/출력 토큰 수, 오류 종류를 기록하고,
+site 별 타임아웃과 프로세스 공용 재시도 예산 안에서 지터를 준 재시도를 수행합니다.
+"""
+import random
+import threading
+import time
+from collections import defaultdict
+
+from google.api_core import exceptions as google_exceptions
+
+from config import Config
+
+LATENCY_BUCKETS = (0.25, 0.5, 1, 2, 4, 8, 16, 32, 64)
+
+RETRYABLE_ERRORS = (
+    google_exceptions.InternalServerError,
+    google_exceptions.ServiceUnavailable,
+    google_exceptions.DeadlineExceeded,
+    google_exceptions.TooManyRequests,
+    google_exceptions.ResourceExhausted,
+)
+
+
+class RetryBudget:
+    """
+    토큰 버킷 방식의 재시도 예산. 호출마다 ratio 만큼 적립되고 재시도 한 번에 1을 씁니다.
+    장애 시 재시도가 전체 호출의 일정 비율을 넘어 부하를 키우지 않도록 합니다.
+    """
+
+    def __init__(self, ratio, max_tokens):
+        self.ratio = ratio
+        self.max_tokens = max_tokens
+        self._tokens = max_tokens
+        self._lock = threading.Lock()
+
+    def deposit(self):
+        with self._lock:
+            self._tokens = min(self.max_tokens, self._tokens + self.ratio)
+
+    def try_spend(self):
+        with self._lock:
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return True
+            return False
+
+    @property
+    def tokens(self):
+        return self._tokens
+
+
+class _Histogram:
+    def __init__(self):
+        self.counts = [0] * (len(LATENCY_BUCKETS) + 1)
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, seconds):
+        index = next((i for i, bound in enumerate(LATENCY_BUCKETS) if seconds <= bound), len(LATENCY_BUCKETS))
+        self.counts[index] += 1
+        self.total += seconds
+        self.count += 1
+
+    def snapshot(self):
+        buckets = {str(bound): c for bound, c in zip(LATENCY_BUCKETS, self.counts)}
+        buckets["+Inf"] = self.counts[-1]
+        return {
+            "buckets": buckets,
+            "count": self.count,
+            "sum_sec": round(self.total, 4),
+            "avg_sec": round(self.total / self.count, 4) if self.count else 0.0,
+        }
+
+
+class _SiteMetrics:
+    def __init__(self):
+        self.calls = 0
+        self.retries = 0
+        self.input_tokens = 0
+        self.output_tokens = 0
+        self.errors = defaultdict(int)
+        self.latency = _Histogram()
+        self.time_to_first_token = _Histogram()
+
+    def snapshot(self):
+        return {
+            "calls": self.calls,
+            "retries": self.retries,
+            "input_tokens": self.input_tokens,
+            "output_tokens": self.output_tokens,
+            "errors": dict(self.errors),
+            "latency": self.latency.snapshot(),
+            "time_to_first_token": self.time_to_first_token.snapshot(),
+        }
+
+
+_lock = threading.Lock()
+_sites = defaultdict(_SiteMetrics)
+retry_budget = RetryBudget(Config.LLM_RETRY_BUDGET_RATIO, Config.LLM_RETRY_BUDGET_MAX)
+
+
+def _timeout_for(site):
+    return Config.LLM_TIMEOUTS.get(site, Config.LLM_DEFAULT_TIMEOUT_SEC)
+
+
+def _record_usage(site, response):
+    usage = getattr(response, "usage_metadata", None)
+    if not usage:
+        return
+    with _lock:
+        _sites[site].input_tokens += getattr(usage, "prompt_token_count", 0) or 0
+        _sites[site].output_tokens += getattr(usage, "candidates_token_count", 0) or 0
+
+
+def _record_error(site, error):
+    with _lock:
+        _sites[site].errors[type(error).__name__] += 1
+
+
+def _backoff(attempt):
+    return random.uniform(0, min(Config.LLM_RETRY_BACKOFF_MAX_SEC, Config.LLM_RETRY_BACKOFF_BASE_SEC * (2 ** attempt)))
+
+
+def _call_with_retry(site, fn, *args, **kwargs):
+    """fn 을 site 타임아웃으로 호출하고, 재시도 가능한 오류는 예산이 남아 있는 동안 지터 백오프로 재시도합니다."""
+    kwargs.setdefault("request_options", {"timeout": _timeout_for(site)})
+    retry_budget.deposit()
+    attempt = 0
+    while True:
+        try:
+            return fn(*args, **kwargs)
+        except RETRYABLE_ERRORS as e:
+            _record_error(site, e)
+            if attempt + 1 >= Config.LLM_MAX_ATTEMPTS or not retry_budget.try_spend():
+                raise
+            with _lock:
+                _sites[site].retries += 1
+            delay = _backoff(attempt)
+            print(f"[LLM] {site} 재시도 {attempt + 1}회 ({type(e).__name__}), {delay:.2f}초 대기")
+            time.sleep(delay)
+            attempt += 1
+        except Exception as e:
+            _record_error(site, e)
+            raise
+
+
+def generate_content(site, model, contents, **kwargs):
+    """model.generate_content 를 계측/재시도와 함께 호출합니다."""
+    started = time.perf_counter()
+    with _lock:
+        _sites[site].calls += 1
+    response = _call_with_retry(site, model.generate_content, contents, **kwargs)
+    elapsed = time.perf_counter() - started
+    with _lock:
+        # 스트리밍이 아니면 첫 토큰 시각을 알 수 없으므로 time_to_first_token 은 스트리밍 경로에서만 기록합니다.
+        _sites[site].latency.observe(elapsed)
+    _record_usage(site, response)
+    return response
+
+
+def stream_message(site, chat, content, **kwargs):
+    """
+    chat.send_message(stream=True) 의 응답 조각을 그대로 내보내며 계측합니다.
+    첫 조각을 받기 전의 오류만 재시도합니다. (이미 토큰이 나간 뒤에는 재시도하지 않음)
+    """
+    started = time.perf_counter()
+    with _lock:
+        _sites[site].calls += 1
+    response = _call_with_retry(site, chat.send_message, content, stream=True, **kwargs)
+    first = True
+    try:
+        for chunk in response:
+            if first:
+                first = False
+                with _lock:
+                    _sites[site].time_to_first_token.observe(time.perf_counter() - started)
+            yield chunk
+    except Exception as e:
+        _record_error(site, e)
+        raise
+    with _lock:
+        _sites[site].latency.observe(time.perf_counter() - started)
+    _record_usage(site, response)
+
+
+def snapshot():
+    with _lock:
+        sites = {site: metrics.snapshot() for site, metrics in _sites.items()}
+    return {"sites": sites, "retry_budget_tokens": round(retry_budget.tokens, 2)}
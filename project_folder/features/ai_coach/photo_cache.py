@@ -0,0 +1,119 @@
+"""
+사진 대화용 이미지 준비 캐시.
+
+사진 세션이 시작되면 선택된 사진을 GCS 에서 동시에 미리 받아 두고,
+긴 변 기준으로 축소 + EXIF 제거 + JPEG 재인코딩한 결과를 원본 내용 해시로 저장합니다.
+"""
+import hashlib
+import io
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import unquote
+
+import PIL.Image
+import PIL.ImageOps
+
+from config import Config
+from extensions import clients
+
+PREPARED_MIMETYPE = "image/jpeg"
+
+
+def blob_name_from_url(gcs_url):
+    blob_name_encoded = gcs_url.replace(f'https://storage.googleapis.com/{Config.GCS_BUCKET_NAME}/', '', 1)
+    return unquote(blob_name_encoded)
+
+
+def prepare_image(raw_bytes, max_edge=None, quality=None):
+    """긴 변을 max_edge 로 줄이고 EXIF 를 버린 JPEG 바이트를 반환합니다. (회전 정보는 픽셀에 반영)"""
+    max_edge = max_edge or Config.PHOTO_MAX_EDGE
+    quality = quality or Config.PHOTO_JPEG_QUALITY
+    with PIL.Image.open(io.BytesIO(raw_bytes)) as image:
+        image = PIL.ImageOps.exif_transpose(image)
+        image.thumbnail((max_edge, max_edge), PIL.Image.LANCZOS)
+        if image.mode not in ("RGB", "L"):
+            image = image.convert("RGB")
+        output = io.BytesIO()
+        image.save(output, format="JPEG", quality=quality, optimize=True)
+    return output.getvalue()
+
+
+class PhotoPrepCache:
+    def __init__(self, max_bytes=None, workers=None):
+        self.max_bytes = max_bytes or Config.PHOTO_CACHE_MAX_BYTES
+        self._executor = ThreadPoolExecutor(
+            max_workers=workers or Config.PHOTO_PREFETCH_WORKERS, thread_name_prefix="photo-prefetch"
+        )
+        self._lock = threading.Lock()
+        self._inflight = {}                 # url -> Future
+        self._url_hashes = OrderedDict()    # url -> 원본 내용 해시
+        self._prepared = OrderedDict()      # 원본 내용 해시 -> 준비된 JPEG 바이트 (LRU)
+        self._total_bytes = 0
+
+    def _lookup(self, url):
+        digest = self._url_hashes.get(url)
+        if digest is None or digest not in self._prepared:
+            return None
+        self._url_hashes.move_to_end(url)
+        self._prepared.move_to_end(digest)
+        return self._prepared[digest]
+
+    def _store(self, url, digest, prepared):
+        with self._lock:
+            if digest not in self._prepared:
+                self._prepared[digest] = prepared
+                self._total_bytes += len(prepared)
+            self._url_hashes[url] = digest
+            while self._total_bytes > self.max_bytes and len(self._prepared) > 1:
+                _, evicted = self._prepared.popitem(last=False)
+                self._total_bytes -= len(evicted)
+            # 가리키는 이미지가 빠진 url 매핑도 함께 정리합니다.
+            while len(self._url_hashes) > len(self._prepared) * 4:
+                self._url_hashes.popitem(last=False)
+
+    def _load(self, url):
+        try:
+            raw_bytes = clients.bucket().blob(blob_name_from_url(url)).download_as_bytes()
+            digest = hashlib.sha256(raw_bytes).hexdigest()
+            with self._lock:
+                prepared = self._prepared.get(digest)
+            if prepared is None:
+                prepared = prepare_image(raw_bytes)
+                print(f"[PHOTO CACHE] {url}: {len(raw_bytes)} -> {len(prepared)} bytes")
+            self._store(url, digest, prepared)
+            return prepared
+        finally:
+            with self._lock:
+                self._inflight.pop(url, None)
+
+    def _submit(self, url):
+        """이미 캐시에 있으면 None, 아니면 진행 중인(또는 새로 시작한) Future 를 반환합니다."""
+        with self._lock:
+            if self._lookup(url) is not None:
+                return None
+            future = self._inflight.get(url)
+            if future is None:
+                future = self._executor.submit(self._load, url)
+                self._inflight[url] = future
+            return future
+
+    def prefetch(self, urls):
+        """사진 목록을 백그라운드에서 동시에 내려받아 준비해 둡니다."""
+        for url in urls:
+            self._submit(url)
+
+    def get(self, url):
+        """준비된 JPEG 바이트를 반환합니다. 미리 받는 중이면 그 결과를 기다리고, 없으면 바로 받아옵니다."""
+        with self._lock:
+            prepared = self._lookup(url)
+        if prepared is not None:
+            return prepared
+        future = self._submit(url)
+        if future is None:
+            with self._lock:
+                return self._lookup(url)
+        return future.result()
+
+
+photo_cache = PhotoPrepCache()
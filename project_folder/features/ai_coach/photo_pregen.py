@@ -0,0 +1,91 @@
+"""
+사진 세션 질문 미리 생성.
+
+사진 세션이 시작되면 두 번째 사진부터의 첫 질문을 동시성 제한 안에서 미리 만들어
+users.ai_session.pregenerated 에 저장해 두고, next_photo 에서 바로 꺼내 씁니다.
+세션이 바뀌면 photo_session_token 이 달라지므로 늦게 끝난 결과는 저장되지 않고 버려집니다.
+"""
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from bson.objectid import ObjectId
+
+from config import Config
+from extensions import mongo, clients
+from features.ai_coach import llm_metrics
+from features.ai_coach.photo_cache import photo_cache, PREPARED_MIMETYPE
+
+_executor = ThreadPoolExecutor(max_workers=Config.PHOTO_PREGENERATE_CONCURRENCY, thread_name_prefix="photo-pregen")
+_lock = threading.Lock()
+_sessions = {}  # str(user_id) -> (token, {index: Future})
+
+
+def new_token():
+    return uuid.uuid4().hex
+
+
+def _generate(user_id, token, index, url):
+    image = photo_cache.get(url)
+    response = llm_metrics.generate_content(
+        "photo_pregen", clients.gemini_model(),
+        [Config.PHOTO_PROMPT, {"mime_type": PREPARED_MIMETYPE, "data": image}]
+    )
+    text = response.text.strip()
+    # 토큰이 일치할 때만 저장하여, 이미 끝났거나 새로 시작된 세션에는 쓰지 않습니다.
+    mongo.db.users.update_one(
+        {"_id": ObjectId(user_id), "ai_session.photo_session_token": token},
+        {"$set": {f"ai_session.pregenerated.{index}": text}}
+    )
+    return text
+
+
+def start(user_id, token, photo_urls):
+    """첫 사진을 제외한 나머지 사진의 첫 질문 생성을 백그라운드에서 시작합니다."""
+    cancel(user_id, clear_session=False)
+    futures = {
+        index: _executor.submit(_generate, user_id, token, index, url)
+        for index, url in enumerate(photo_urls) if index > 0
+    }
+    with _lock:
+        _sessions[str(user_id)] = (token, futures)
+
+
+def take(user_id, session, index):
+    """
+    index 번째 사진의 미리 생성된 질문을 반환합니다.
+    DB 에 저장된 결과를 먼저 보고, 같은 프로세스에서 생성 중이면 그 결과를 기다립니다. 없거나 실패했으면 None.
+    """
+    token = session.get("photo_session_token")
+    if not token:
+        return None
+    text = (session.get("pregenerated") or {}).get(str(index))
+    if text:
+        return text
+    with _lock:
+        entry = _sessions.get(str(user_id))
+    if not entry or entry[0] != token or index not in entry[1]:
+        return None
+    try:
+        return entry[1][index].result(timeout=Config.PHOTO_PREGENERATE_WAIT_SEC)
+    except Exception as e:
+        print(f"[PHOTO PREGEN] 미리 생성된 질문을 사용할 수 없습니다 (index {index}): {e}")
+        return None
+
+
+# 사진 세션이 끝나면 users.ai_session 에서 지울 필드
+SESSION_FIELDS = ("pregenerated", "photo_session_token")
+
+
+def cancel(user_id, clear_session=True):
+    """아직 시작하지 않은 생성은 취소하고, 세션에 남은 미리 생성 결과도 지웁니다."""
+    with _lock:
+        entry = _sessions.pop(str(user_id), None)
+    if entry:
+        for future in entry[1].values():
+            future.cancel()
+    if clear_session:
+        mongo.db.users.update_one(
+            {"_id": ObjectId(user_id)},
+            {"$unset": {f"ai_session.{key}": "" for key in SESSION_FIELDS}}
+        )
@@ -0,0 +1,197 @@
+"""
+AI 코치 대화 세션 저장소.
+
+users.ai_session 에는 고정 프롬프트(preamble), 오래된 대화의 롤링 요약(summary),
+토큰 예산 안의 최근 대화(window)만 보관합니다. 매 턴에서는 새 턴만 $push 하고,
+예산을 넘으면 밀려난 턴을 요약에 접어 넣기 때문에 대화가 길어져도
+Mongo 쓰기 크기와 Gemini 입력 토큰이 일정하게 유지됩니다.
+"""
+from bson.objectid import ObjectId
+
+from config import Config
+from extensions import mongo, clients
+from features.ai_coach import llm_metrics
+
+PHOTO_PLACEHOLDER = "[사진]"
+SUMMARY_ACK = "응, 앞에서 나눈 이야기 기억하고 있어."
+# 예산을 넘으면 window 를 예산의 이 비율까지 줄여, 요약 호출이 매 턴이 아니라 몇 턴에 한 번만 일어나게 합니다.
+EVICT_TO_RATIO = 0.5
+
+
+def estimate_tokens(text):
+    """Gemini 토큰 수를 대략 추정합니다. (영문/숫자 약 4자당 1토큰, 한글 등은 글자당 1토큰)"""
+    ascii_chars = sum(1 for ch in text if ord(ch) < 128)
+    return (ascii_chars // 4) + (len(text) - ascii_chars) + 1
+
+
+def _part_to_text(part):
+    if isinstance(part, str):
+        return part
+    if isinstance(part, dict):
+        return part.get("text", PHOTO_PLACEHOLDER)
+    if hasattr(part, "_pb") and "text" in part:
+        return part.text
+    return PHOTO_PLACEHOLDER
+
+
+def serialize_turn(turn):
+    """Gemini Content 또는 dict 형태의 턴을 {"role", "parts": [text]} 로 변환합니다. 이미지는 자리표시자로 대체합니다."""
+    if isinstance(turn, dict):
+        role, parts = turn.get("role"), turn.get("parts", [])
+    else:
+        role, parts = turn.role, turn.parts
+    return {"role": role, "parts": [_part_to_text(p) for p in parts]}
+
+
+def _turn_tokens(turn):
+    return sum(estimate_tokens(p) for p in turn["parts"])
+
+
+def _empty_session():
+    return {
+        "preamble": [],
+        "summary": "",
+        "window": [],
+        "window_tokens": 0,
+        "selected_photos": [],
+        "current_photo_index": -1,
+        "current_mode": "idle",
+    }
+
+
+def _from_legacy(ai_session):
+    """전체 history 를 통째로 저장하던 이전 형식의 세션을 현재 형식으로 변환합니다."""
+    session = _empty_session()
+    session.update({k: ai_session[k] for k in ("selected_photos", "current_photo_index", "current_mode") if k in ai_session})
+    history = [serialize_turn(t) for t in ai_session.get("history", [])]
+    if history and history[0]["parts"] and history[0]["parts"][0] == Config.SYSTEM_PROMPT:
+        session["preamble"], history = history[:2], history[2:]
+    session["window"] = history
+    session["window_tokens"] = sum(_turn_tokens(t) for t in history)
+    return session
+
+
+def build_history(session):
+    """Gemini start_chat 에 넘길 history 를 preamble + 요약 + 최근 대화 순서로 구성합니다."""
+    history = list(session["preamble"])
+    if session["summary"]:
+        history.append({"role": "user", "parts": [f"(지금까지 나눈 대화 요약)\n{session['summary']}"]})
+        history.append({"role": "model", "parts": [SUMMARY_ACK]})
+    history.extend(session["window"])
+    return history
+
+
+def get_session(user_id):
+    """DB에서 사용자 세션을 가져오고, Gemini 용 history 를 함께 채워 반환합니다."""
+    user = mongo.db.users.find_one({"_id": ObjectId(user_id)}, {"ai_session": 1})
+    ai_session = (user or {}).get("ai_session")
+    if not ai_session:
+        session = _empty_session()
+    elif "window" not in ai_session:
+        session = _from_legacy(ai_session)
+        mongo.db.users.update_one({"_id": ObjectId(user_id)}, {"$set": {"ai_session": session}})
+    else:
+        session = {**_empty_session(), **ai_session}
+    session["history"] = build_history(session)
+    return session
+
+
+def reset_session(user_id, mode, preamble=(), window=(), selected_photos=(), current_photo_index=-1,
+                  clear=(), **state):
+    """
+    세션을 새로 시작합니다. 요약과 최근 대화가 모두 교체됩니다.
+    필드 단위로 $set 하므로 여기서 넘기지 않은 부가 필드(미리 생성된 사진 질문 등)는 유지되며,
+    지워야 할 부가 필드는 clear 로 넘깁니다. 이전 형식의 history 는 항상 지웁니다.
+    """
+    window = [serialize_turn(t) for t in window]
+    fields = {
+        "preamble": [serialize_turn(t) for t in preamble],
+        "summary": "",
+        "window": window,
+        "window_tokens": sum(_turn_tokens(t) for t in window),
+        "selected_photos": list(selected_photos),
+        "current_photo_index": current_photo_index,
+        "current_mode": mode,
+        **state,
+    }
+    mongo.db.users.update_one(
+        {"_id": ObjectId(user_id)},
+        {
+            "$set": {f"ai_session.{key}": value for key, value in fields.items()},
+            "$unset": {f"ai_session.{key}": "" for key in ("history", *clear)},
+        }
+    )
+    session = {**_empty_session(), **fields}
+    session["history"] = build_history(session)
+    return session
+
+
+def update_session_state(user_id, **fields):
+    """대화 내용은 건드리지 않고 사진 인덱스/모드 등 상태 필드만 갱신합니다."""
+    mongo.db.users.update_one(
+        {"_id": ObjectId(user_id)},
+        {"$set": {f"ai_session.{key}": value for key, value in fields.items()}}
+    )
+
+
+def _summarize(previous_summary, evicted_turns):
+    """밀려난 턴을 기존 요약에 접어 넣은 새 요약을 만듭니다. 실패하면 단순 이어붙이기로 대체합니다."""
+    dialogue = "\n".join(f"{t['role']}: {' '.join(t['parts'])}" for t in evicted_turns)
+    max_chars = Config.AI_SESSION_SUMMARY_MAX_CHARS
+    try:
+        model = clients.gemini_model()
+        prompt = (
+            f"{Config.SESSION_SUMMARY_PROMPT}\n- {max_chars}자 이내로 작성한다.\n\n"
+            f"기존 요약:\n{previous_summary or '(없음)'}\n\n새 대화:\n{dialogue}"
+        )
+        summary = llm_metrics.generate_content("session_summary", model, prompt).text.strip()
+    except Exception as e:
+        print(f"[SESSION STORE] 요약 생성 실패, 이어붙이기로 대체합니다: {e}")
+        summary = f"{previous_summary}\n{dialogue}".strip()
+    return summary[-max_chars:]
+
+
+def append_turns(user_id, session, new_turns):
+    """
+    새 턴만 세션에 추가합니다.
+    최근 대화가 토큰 예산을 넘으면 오래된 턴부터 요약으로 옮기고, 이 경우에만 window 를 다시 씁니다.
+    """
+    new_turns = [serialize_turn(t) for t in new_turns]
+    if not new_turns:
+        return session
+    new_tokens = sum(_turn_tokens(t) for t in new_turns)
+    budget = Config.AI_SESSION_TOKEN_BUDGET
+
+    if session["window_tokens"] + new_tokens <= budget:
+        mongo.db.users.update_one(
+            {"_id": ObjectId(user_id)},
+            {
+                "$push": {"ai_session.window": {"$each": new_turns}},
+                "$inc": {"ai_session.window_tokens": new_tokens},
+            }
+        )
+        session["window"] = session["window"] + new_turns
+        session["window_tokens"] += new_tokens
+    else:
+        window = session["window"] + new_turns
+        tokens = session["window_tokens"] + new_tokens
+        target = int(budget * EVICT_TO_RATIO)
+        cut = 0
+        # user 턴으로 시작하도록 user/model 쌍 단위로 잘라냅니다.
+        while cut < len(window) and (tokens > target or window[cut]["role"] != "user"):
+            tokens -= _turn_tokens(window[cut])
+            cut += 1
+        evicted, window = window[:cut], window[cut:]
+        session["summary"] = _summarize(session["summary"], evicted)
+        session["window"], session["window_tokens"] = window, tokens
+        mongo.db.users.update_one(
+            {"_id": ObjectId(user_id)},
+            {"$set": {
+                "ai_session.summary": session["summary"],
+                "ai_session.window": window,
+                "ai_session.window_tokens": tokens,
+            }}
+        )
+
+    session["history"] = build_history(session)
+    return session
@@ -0,0 +1,188 @@
+"""
+스트리밍 STT 파이프라인.
+
+업로드된 오디오를 ffmpeg 로 16kHz 모노 PCM 으로 바로 디코딩하면서 묵음 기준으로 구간을 나누고,
+각 구간을 교체 가능한 Recognizer 에 동시에 넘깁니다.
+전체 WAV 를 메모리에 만들지 않으므로 녹음이 길어져도 메모리 사용량이 일정합니다.
+"""
+import math
+import subprocess
+import threading
+from array import array
+from concurrent.futures import ThreadPoolExecutor
+
+import speech_recognition as sr
+from pydub import AudioSegment
+from pydub.utils import which
+
+from config import Config
+
+SAMPLE_RATE = 16000
+SAMPLE_WIDTH = 2  # s16le
+FRAME_MS = 30
+FRAME_BYTES = SAMPLE_RATE * SAMPLE_WIDTH * FRAME_MS // 1000
+READ_CHUNK_BYTES = 64 * 1024
+
+try:
+    import audioop
+
+    def _rms(frame):
+        return audioop.rms(frame, SAMPLE_WIDTH)
+except ImportError:  # Python 3.13 이상
+    def _rms(frame):
+        samples = array("h", frame)
+        return math.sqrt(sum(s * s for s in samples) / len(samples)) if samples else 0
+
+
+class AudioDecodeError(Exception):
+    pass
+
+
+class Recognizer:
+    """PCM(16kHz, 16bit, mono) 한 구간을 텍스트로 바꾸는 인터페이스. 인식할 말이 없으면 빈 문자열을 반환합니다."""
+
+    def recognize(self, pcm, sample_rate=SAMPLE_RATE):
+        raise NotImplementedError
+
+
+class GoogleRecognizer(Recognizer):
+    def recognize(self, pcm, sample_rate=SAMPLE_RATE):
+        audio_data = sr.AudioData(pcm, sample_rate, SAMPLE_WIDTH)
+        try:
+            return sr.Recognizer().recognize_google(audio_data, language='ko-KR')
+        except sr.UnknownValueError:
+            return ""
+
+
+class LocalRecognizer(Recognizer):
+    """네트워크 없이 쓰는 대체 백엔드. 구간 길이만 표시하므로 테스트/부하 측정용입니다."""
+
+    def recognize(self, pcm, sample_rate=SAMPLE_RATE):
+        return f"[{len(pcm) / (sample_rate * SAMPLE_WIDTH):.1f}s]"
+
+
+RECOGNIZERS = {
+    "google": GoogleRecognizer,
+    "local": LocalRecognizer,
+}
+
+
+def get_recognizer(name=None):
+    name = name or Config.STT_BACKEND
+    if name not in RECOGNIZERS:
+        raise ValueError(f"알 수 없는 STT 백엔드입니다: {name}")
+    return RECOGNIZERS[name]()
+
+
+def decode_pcm_stream(audio_file):
+    """ffmpeg 로 업로드 스트림을 16kHz 모노 PCM 으로 디코딩하며 조각 단위로 내보냅니다."""
+    ffmpeg = which(AudioSegment.converter) or which("ffmpeg")
+    if not ffmpeg:
+        raise AudioDecodeError("FFmpeg를 찾을 수 없습니다.")
+
+    process = subprocess.Popen(
+        [ffmpeg, "-hide_banner", "-loglevel", "error", "-i", "pipe:0",
+         "-f", "s16le", "-ac", "1", "-ar", str(SAMPLE_RATE), "pipe:1"],
+        stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+    )
+
+    def feed():
+        try:
+            while True:
+                chunk = audio_file.read(READ_CHUNK_BYTES)
+                if not chunk:
+                    break
+                process.stdin.write(chunk)
+        except (BrokenPipeError, ValueError):
+            pass
+        finally:
+            try:
+                process.stdin.close()
+            except BrokenPipeError:
+                pass
+
+    writer = threading.Thread(target=feed, daemon=True)
+    writer.start()
+    stderr_chunks = []
+    reader = threading.Thread(target=lambda: stderr_chunks.append(process.stderr.read()), daemon=True)
+    reader.start()
+    try:
+        while True:
+            chunk = process.stdout.read(READ_CHUNK_BYTES)
+            if not chunk:
+                break
+            yield chunk
+    finally:
+        if process.poll() is None:
+            process.kill()
+        process.wait()
+        writer.join()
+        reader.join()
+
+    if process.returncode != 0:
+        raise AudioDecodeError(b"".join(stderr_chunks).decode(errors="replace").strip())
+
+
+def segment_on_silence(pcm_chunks, silence_rms=None, min_silence_ms=None, max_segment_ms=None):
+    """
+    PCM 조각을 30ms 프레임으로 보고, 묵음이 일정 시간 이어지거나 구간이 최대 길이에 닿으면 잘라 내보냅니다.
+    묵음만 있는 구간은 버립니다.
+    """
+    silence_rms = silence_rms if silence_rms is not None else Config.STT_SILENCE_RMS
+    min_silence_frames = (min_silence_ms or Config.STT_MIN_SILENCE_MS) // FRAME_MS
+    max_segment_frames = (max_segment_ms or Config.STT_MAX_SEGMENT_MS) // FRAME_MS
+
+    pending = b""
+    segment = bytearray()
+    voiced_frames = silent_run = frames = 0
+    for chunk in pcm_chunks:
+        pending += chunk
+        usable = len(pending) - len(pending) % FRAME_BYTES
+        for offset in range(0, usable, FRAME_BYTES):
+            frame = pending[offset:offset + FRAME_BYTES]
+            segment += frame
+            frames += 1
+            if _rms(frame) < silence_rms:
+                silent_run += 1
+            else:
+                silent_run = 0
+                voiced_frames += 1
+            if (voiced_frames and silent_run >= min_silence_frames) or frames >= max_segment_frames:
+                if voiced_frames:
+                    yield bytes(segment)
+                segment = bytearray()
+                voiced_frames = silent_run = frames = 0
+        pending = pending[usable:]
+
+    segment += pending
+    if voiced_frames:
+        yield bytes(segment)
+
+
+_executor = ThreadPoolExecutor(max_workers=Config.STT_WORKERS, thread_name_prefix="stt")
+
+
+def transcribe_stream(audio_file, recognizer=None):
+    """
+    디코딩 → 묵음 분할 → 인식을 파이프라인으로 처리합니다.
+    구간들은 동시에 인식하되 동시에 들고 있는 구간 수를 STT_MAX_INFLIGHT 로 제한해 메모리를 일정하게 유지합니다.
+    """
+    recognizer = recognizer or get_recognizer()
+    inflight = threading.BoundedSemaphore(Config.STT_MAX_INFLIGHT)
+
+    def recognize(segment):
+        try:
+            return recognizer.recognize(segment)
+        finally:
+            inflight.release()
+
+    futures = []
+    for segment in segment_on_silence(decode_pcm_stream(audio_file)):
+        inflight.acquire()
+        futures.append(_executor.submit(recognize, segment))
+
+    texts = [future.result() for future in futures]
+    text = " ".join(t.strip() for t in texts if t and t.strip())
+    if not text:
+        raise sr.UnknownValueError()
+    return text
@@ -0,0 +1,182 @@
+"""
+TTS 오디오 캐시.
+
+(스피커, 정규화된 텍스트, 출력 포맷)의 해시를 키로 합성 결과를 저장합니다.
+1차는 크기 제한이 있는 로컬 디스크 LRU, 2차는 선택적인 공유 저장소(GridFS)입니다.
+"""
+import hashlib
+import os
+import re
+import threading
+import unicodedata
+from collections import OrderedDict
+
+import gridfs
+from gridfs.errors import FileExists
+
+from config import Config
+from extensions import mongo
+
+MIMETYPE_EXTENSIONS = {"audio/mpeg": "mp3", "audio/wav": "wav"}
+EXTENSION_MIMETYPES = {ext: mimetype for mimetype, ext in MIMETYPE_EXTENSIONS.items()}
+
+
+def normalize_text(text):
+    """유니코드 정규화(NFC)와 공백 정리로 같은 문장이 같은 키를 갖도록 합니다."""
+    return re.sub(r"\s+", " ", unicodedata.normalize("NFC", text)).strip()
+
+
+def cache_key(speaker, text, audio_format):
+    raw = f"{speaker}\x00{normalize_text(text)}\x00{audio_format}"
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class TTSCache:
+    def __init__(self, cache_dir=None, max_bytes=None, shared_tier=None):
+        self.cache_dir = cache_dir or Config.TTS_CACHE_DIR
+        self.max_bytes = max_bytes if max_bytes is not None else Config.TTS_CACHE_MAX_BYTES
+        self.shared_tier = shared_tier if shared_tier is not None else Config.TTS_CACHE_SHARED_TIER
+        self._lock = threading.Lock()
+        self._index = None  # key -> (path, size, mimetype), 오래된 것부터
+        self._total_bytes = 0
+        self.stats = {"disk_hits": 0, "shared_hits": 0, "misses": 0, "stores": 0, "evictions": 0}
+
+    def _load_index(self):
+        """디스크에 남아있는 캐시 파일을 mtime 순으로 읽어 LRU 인덱스를 복원합니다."""
+        os.makedirs(self.cache_dir, exist_ok=True)
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            key, _, ext = name.partition(".")
+            if ext not in EXTENSION_MIMETYPES:
+                continue
+            path = os.path.join(self.cache_dir, name)
+            try:
+                st = os.stat(path)
+            except FileNotFoundError:
+                continue
+            entries.append((st.st_mtime, key, path, st.st_size, EXTENSION_MIMETYPES[ext]))
+        self._index = OrderedDict()
+        self._total_bytes = 0
+        for _, key, path, size, mimetype in sorted(entries):
+            self._index[key] = (path, size, mimetype)
+            self._total_bytes += size
+
+    def _ensure_index(self):
+        if self._index is None:
+            self._load_index()
+
+    def _disk_get(self, key):
+        with self._lock:
+            self._ensure_index()
+            entry = self._index.get(key)
+            if not entry:
+                return None
+            self._index.move_to_end(key)
+        path, _, mimetype = entry
+        try:
+            with open(path, "rb") as f:
+                audio = f.read()
+            os.utime(path)
+        except FileNotFoundError:
+            # 다른 워커가 먼저 지운 경우
+            with self._lock:
+                if self._index.pop(key, None):
+                    self._total_bytes -= entry[1]
+            return None
+        return audio, mimetype
+
+    def _disk_put(self, key, audio, mimetype):
+        path = os.path.join(self.cache_dir, f"{key}.{MIMETYPE_EXTENSIONS.get(mimetype, 'bin')}")
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with self._lock:
+            self._ensure_index()
+        with open(tmp_path, "wb") as f:
+            f.write(audio)
+        os.replace(tmp_path, path)
+        with self._lock:
+            previous = self._index.pop(key, None)
+            if previous:
+                self._total_bytes -= previous[1]
+            self._index[key] = (path, len(audio), mimetype)
+            self._total_bytes += len(audio)
+            while self._total_bytes > self.max_bytes and len(self._index) > 1:
+                _, (old_path, old_size, _) = self._index.popitem(last=False)
+                self._total_bytes -= old_size
+                self.stats["evictions"] += 1
+                try:
+                    os.remove(old_path)
+                except FileNotFoundError:
+                    pass
+
+    def _gridfs(self):
+        return gridfs.GridFS(mongo.db, collection="tts_cache")
+
+    def _shared_get(self, key):
+        if self.shared_tier != "gridfs":
+            return None
+        try:
+            grid_out = self._gridfs().find_one({"_id": key})
+            if grid_out is None:
+                return None
+            return grid_out.read(), grid_out.content_type or "application/octet-stream"
+        except Exception as e:
+            print(f"[TTS CACHE] 공유 캐시 조회 실패: {e}")
+            return None
+
+    def _shared_put(self, key, audio, mimetype):
+        if self.shared_tier != "gridfs":
+            return
+        try:
+            self._gridfs().put(audio, _id=key, content_type=mimetype)
+        except FileExists:
+            pass
+        except Exception as e:
+            print(f"[TTS CACHE] 공유 캐시 저장 실패: {e}")
+
+    def get(self, speaker, text, audio_format):
+        """캐시된 (audio, mimetype) 을 반환하고, 없으면 None 을 반환합니다."""
+        key = cache_key(speaker, text, audio_format)
+        cached = self._disk_get(key)
+        if cached:
+            self.stats["disk_hits"] += 1
+            return cached
+        cached = self._shared_get(key)
+        if cached:
+            self.stats["shared_hits"] += 1
+            self._disk_put(key, *cached)
+            return cached
+        self.stats["misses"] += 1
+        return None
+
+    def put(self, speaker, text, audio_format, audio, mimetype):
+        key = cache_key(speaker, text, audio_format)
+        self._disk_put(key, audio, mimetype)
+        self._shared_put(key, audio, mimetype)
+        self.stats["stores"] += 1
+
+    def get_or_synthesize(self, speaker, text, audio_format, synthesize):
+        """캐시에 있으면 바로 반환하고, 없으면 synthesize() 결과를 저장한 뒤 반환합니다."""
+        cached = self.get(speaker, text, audio_format)
+        if cached:
+            return cached
+        audio, mimetype = synthesize()
+        self.put(speaker, text, audio_format, audio, mimetype)
+        return audio, mimetype
+
+    def get_stats(self):
+        with self._lock:
+            self._ensure_index()
+            entries, total_bytes = len(self._index), self._total_bytes
+        lookups = self.stats["disk_hits"] + self.stats["shared_hits"] + self.stats["misses"]
+        hits = lookups - self.stats["misses"]
+        return {
+            **self.stats,
+            "hit_ratio": round(hits / lookups, 4) if lookups else 0.0,
+            "disk_entries": entries,
+            "disk_bytes": total_bytes,
+            "disk_max_bytes": self.max_bytes,
+            "shared_tier": self.shared_tier or None,
+        }
+
+
+tts_cache = TTSCache()
@@ -1,40 +1,97 @@
-from flask import Blueprint, request, jsonify
-from bson.json_util import dumps, loads
+from flask import Blueprint, Response, request, jsonify, stream_with_context
 from flask_jwt_extended import jwt_required, current_user
 from .diaries_service import DiaryService
+from pagination import parse_page_args, decode_cursor, decode_rank_cursor, NEXT_CURSOR_HEADER
+from json_provider import dumps_bytes
 import datetime
+import zlib
 
 diaries_bp = Blueprint('diaries', __name__)
 diary_service = DiaryService()
 
+def _page_response(items, next_cursor):
+    """목록은 그대로 배열로 보내고, 다음 페이지 커서는 헤더로 알려 줍니다."""
+    response = jsonify(items)
+    if next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
+    return response
+
 @diaries_bp.route('/', methods=['GET'])
 @jwt_required()
 def get_diaries():
     try:
         search_term = request.args.get('search')
         date_str = request.args.get('date')
-        user_diaries = diary_service.get_all_diaries(current_user['_id'], search_term, date_str)
-        result = []
-        for diary in user_diaries:
-            diary['_id'] = str(diary['_id'])
-            if 'created_at' in diary and isinstance(diary['created_at'], datetime.datetime):
-                diary['created_at'] = diary['created_at'].isoformat()
-            result.append(diary)
-        return jsonify(result)
+        limit, cursor = parse_page_args(request.args, decode_rank_cursor if search_term else None)
+        user_diaries, next_cursor = diary_service.get_all_diaries(
+            current_user['_id'], search_term, date_str, limit, cursor
+        )
+        return _page_response(user_diaries, next_cursor)
     except ValueError as e:
         return jsonify({"error": str(e)}), 400
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
+@diaries_bp.route('/calendar', methods=['GET'])
+@jwt_required()
+def get_calendar_month():
+    try:
+        calendar = diary_service.get_calendar_month(current_user['_id'], request.args.get('month'))
+        return jsonify(calendar)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@diaries_bp.route('/export', methods=['GET'])
+@jwt_required()
+def export_diaries():
+    """
+    GET /api/diaries/export?gzip=1&cursor=...
+    일기 전체를 NDJSON 한 줄에 하나씩 스트리밍합니다. 중간에 끊기면 마지막으로 받은 줄의 cursor 로 이어서 받을 수 있습니다.
+    """
+    try:
+        cursor = decode_cursor(request.args.get('cursor'))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    use_gzip = request.args.get('gzip', '').lower() in ('1', 'true')
+    user_id = current_user['_id']
+
+    def lines():
+        yield dumps_bytes({
+            "type": "export", "version": 1, "resumed": cursor is not None,
+            "exported_at": datetime.datetime.now(datetime.timezone.utc),
+        }) + b"\n"
+        count = 0
+        for record in diary_service.iter_export(user_id, cursor):
+            count += 1
+            yield dumps_bytes(record) + b"\n"
+        yield dumps_bytes({"type": "end", "count": count}) + b"\n"
+
+    def gzipped(chunks):
+        compressor = zlib.compressobj(wbits=31)  # gzip 헤더 포함
+        for chunk in chunks:
+            data = compressor.compress(chunk)
+            if data:
+                yield data
+        yield compressor.flush()
+
+    body = gzipped(lines()) if use_gzip else lines()
+    filename = "diaries.ndjson.gz" if use_gzip else "diaries.ndjson"
+    return Response(
+        stream_with_context(body),
+        mimetype="application/gzip" if use_gzip else "application/x-ndjson",
+        headers={"Content-Disposition": f'attachment; filename="{filename}"', "X-Accel-Buffering": "no"},
+    )
+
 @diaries_bp.route('/<diary_id>', methods=['GET'])
 @jwt_required()
 def get_diary(diary_id):
     try:
-        diary = diary_service.get_diary_by_id(diary_id, current_user['_id'])
+        include_transcript = request.args.get('transcript', '').lower() in ('1', 'true')
+        diary = diary_service.get_diary_by_id(diary_id, current_user['_id'], include_transcript)
         if diary:
-            if 'created_at' in diary and isinstance(diary['created_at'], datetime.datetime):
-                diary['created_at'] = diary['created_at'].isoformat()
-            return jsonify(loads(dumps(diary)))
+            return jsonify(diary)
         return jsonify({"error": "Diary not found"}), 404
     except Exception as e:
         return jsonify({"error": str(e)}), 500
@@ -43,13 +100,10 @@ def get_diary(diary_id):
 @jwt_required()
 def get_gallery_diaries():
     try:
-        gallery_diaries = diary_service.get_gallery_diaries(current_user['_id'])
-        result = []
-        for diary in gallery_diaries:
-            diary['_id'] = str(diary['_id'])
-            if 'created_at' in diary and isinstance(diary['created_at'], datetime.datetime):
-                diary['created_at'] = diary['created_at'].isoformat()
-            result.append(diary)
-        return jsonify(result)
+        limit, cursor = parse_page_args(request.args)
+        gallery_diaries, next_cursor = diary_service.get_gallery_diaries(current_user['_id'], limit, cursor)
+        return _page_response(gallery_diaries, next_cursor)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
     except Exception as e:
         return jsonify({"error": str(e)}), 500
@@ -2,35 +2,94 @@ from flask import g
 from bson.json_util import dumps
 from bson.objectid import ObjectId
 from extensions import mongo
+from .search_index import search_index
+from pagination import paginate, page_filter, encode_cursor, encode_rank_cursor, SORT_ASCENDING
+from features.ai_coach import conversation_store
+from config import Config
+from zoneinfo import ZoneInfo
 import datetime
 
+# 목록/단건 조회에서는 대화 기록(예전 embedded 필드 포함)을 싣지 않습니다.
+WITHOUT_TRANSCRIPT = {'conversations': 0}
+
+def _local_range(year, month, day=None):
+    """서비스 시간대(KST) 기준 하루(또는 한 달)의 시작/끝을 UTC aware datetime 으로 반환합니다."""
+    tz = ZoneInfo(Config.APP_TIMEZONE)
+    if day is not None:
+        start = datetime.datetime(year, month, day, tzinfo=tz)
+        end = start + datetime.timedelta(days=1)
+    else:
+        start = datetime.datetime(year, month, 1, tzinfo=tz)
+        end = datetime.datetime(year + month // 12, month % 12 + 1, 1, tzinfo=tz)
+    return start.astimezone(datetime.timezone.utc), end.astimezone(datetime.timezone.utc)
+
+# 아래 조건 함수들은 indexes.py 의 쿼리 플랜 점검도 그대로 씁니다.
+def list_filter(user_id, date_str=None):
+    """완성된 일기 목록 조건. date_str(YYYY-MM-DD)이 있으면 그날(KST) 일기만."""
+    query_filter = {'user_id': user_id, 'status': 'completed'}
+    if date_str:
+        try:
+            date = datetime.datetime.strptime(date_str, '%Y-%m-%d')
+            start_date, end_date = _local_range(date.year, date.month, date.day)
+            query_filter['created_at'] = {'$gte': start_date, '$lt': end_date}
+        except ValueError:
+            raise ValueError("Invalid date format. Please use YYYY-MM-DD.")
+    return query_filter
+
+def gallery_filter(user_id):
+    return {
+        'user_id': user_id,
+        'status': 'completed',
+        'photos': {'$exists': True, '$ne': []}
+    }
+
+def created_at_filter(user_id, target_date):
+    """target_date 부터 1초 안에 만들어진 일기"""
+    return {
+        "user_id": user_id,
+        "created_at": {
+            "$gte": target_date,
+            "$lt": target_date + datetime.timedelta(seconds=1)
+        }
+    }
+
+def export_filter(user_id, cursor=None):
+    return page_filter({'user_id': user_id}, cursor, ascending=True)
+
+def photo_media_filter(user_id, urls):
+    return {'user_id': user_id, 'url': {'$in': urls}}
+
 class DiaryService:
-    def get_all_diaries(self, user_id, search_term=None, date_str=None):
-        query_filter = {'user_id': user_id, 'status': 'completed'}
+    def get_all_diaries(self, user_id, search_term=None, date_str=None, limit=None, cursor=None):
+        """
+        (일기 목록, 다음 페이지 커서) 를 반환합니다.
+        검색 결과는 관련도 순이고 커서는 decode_rank_cursor 로 읽은 (점수, created_at, _id) 입니다.
+        """
+        query_filter = list_filter(user_id, date_str)
 
         if search_term:
-            query_filter['$or'] = [
-                {'title': {'$regex': search_term, '$options': 'i'}},
-                {'categories': {'$regex': search_term, '$options': 'i'}}
-            ]
-
-        if date_str:
-            try:
-                start_date = datetime.datetime.strptime(date_str, '%Y-%m-%d')
-                end_date = start_date + datetime.timedelta(days=1)
-                query_filter['created_at'] = {'$gte': start_date, '$lt': end_date}
-            except ValueError:
-                raise ValueError("Invalid date format. Please use YYYY-MM-DD.")
-
-        user_diaries = mongo.db.diaries.find(query_filter)
-        return list(user_diaries)
-
-    def get_diary_by_id(self, diary_id, user_id):
+            # 검색어가 있으면 역색인에서 관련도 순으로 찾은 일기만 그 순서대로 반환합니다.
+            ranked_ids, next_position = search_index.search(
+                user_id, search_term, query_filter.get('created_at'), limit, cursor
+            )
+            query_filter['_id'] = {'$in': ranked_ids}
+            diaries_by_id = {
+                diary['_id']: diary for diary in mongo.db.diaries.find(query_filter, WITHOUT_TRANSCRIPT)
+            }
+            ranked = [diaries_by_id[diary_id] for diary_id in ranked_ids if diary_id in diaries_by_id]
+            return ranked, encode_rank_cursor(next_position) if next_position else None
+
+        return paginate(mongo.db.diaries, query_filter, limit, cursor, WITHOUT_TRANSCRIPT)
+
+    def get_diary_by_id(self, diary_id, user_id, include_transcript=False):
+        """include_transcript 가 참이면 diary_messages 버킷에서 대화 기록을 읽어 conversations 로 붙여 줍니다."""
         try:
             diary = mongo.db.diaries.find_one({
                 "_id": ObjectId(diary_id),
                 "user_id": user_id
-            })
+            }, None if include_transcript else WITHOUT_TRANSCRIPT)
+            if diary and include_transcript:
+                diary['conversations'] = conversation_store.load_for_diary(diary)
             return diary
         except Exception as e:
             print(f"Error fetching diary by id: {e}")
@@ -42,33 +101,99 @@ class DiaryService:
                 created_at_str = created_at_str[:-1] + '+00:00'
             
             target_date = datetime.datetime.fromisoformat(created_at_str)
-            start_date = target_date
-            end_date = target_date + datetime.timedelta(seconds=1)
-
-            diary = mongo.db.diaries.find_one({
-                "user_id": user_id,
-                "created_at": {
-                    "$gte": start_date,
-                    "$lt": end_date
-                }
-            })
+            diary = mongo.db.diaries.find_one(created_at_filter(user_id, target_date))
             return diary
         except (ValueError, TypeError) as e:
             print(f"Error parsing date or fetching diary by created_at: {e}")
             return None
 
-    def get_gallery_diaries(self, user_id):
-        query_filter = {
-            'user_id': user_id,
-            'status': 'completed',
-            'photos': {'$exists': True, '$ne': []}
-        }
+    def get_gallery_diaries(self, user_id, limit, cursor=None):
+        query_filter = gallery_filter(user_id)
         projection = {
             'title': 1,
             'created_at': 1, 
             'photos': 1, 
             '_id': 1
         }
-        diaries_with_photos = mongo.db.diaries.find(query_filter, projection).sort('created_at', -1)
+        return paginate(mongo.db.diaries, query_filter, limit, cursor, projection)
 
-        return list(diaries_with_photos)
+    def get_calendar_month(self, user_id, month_str):
+        """
+        한 달 동안의 완성된 일기를 KST 날짜별로 묶어 개수, 첫 일기 제목/id, 대표 사진을 반환합니다.
+        (user_id, status, created_at) 인덱스를 타는 집계 한 번으로 처리합니다.
+        """
+        try:
+            month = datetime.datetime.strptime(month_str or '', '%Y-%m')
+        except ValueError:
+            raise ValueError("Invalid month format. Please use YYYY-MM.")
+        start_date, end_date = _local_range(month.year, month.month)
+
+        pipeline = [
+            {'$match': {
+                'user_id': user_id,
+                'status': 'completed',
+                'created_at': {'$gte': start_date, '$lt': end_date},
+            }},
+            {'$sort': {'created_at': 1, '_id': 1}},
+            {'$group': {
+                '_id': {'$dateToString': {
+                    'format': '%Y-%m-%d', 'date': '$created_at', 'timezone': Config.APP_TIMEZONE
+                }},
+                'count': {'$sum': 1},
+                'first_title': {'$first': '$title'},
+                'first_diary_id': {'$first': '$_id'},
+                'covers': {'$push': {'$arrayElemAt': ['$photos.url', 0]}},
+            }},
+            {'$project': {
+                '_id': 0,
+                'date': '$_id',
+                'count': 1,
+                'first_title': 1,
+                'first_diary_id': {'$toString': '$first_diary_id'},
+                'cover_url': {'$ifNull': [{'$first': {'$filter': {
+                    'input': '$covers', 'cond': {'$ne': ['$$this', None]}
+                }}}, None]},
+            }},
+            {'$sort': {'date': 1}},
+        ]
+        days = list(mongo.db.diaries.aggregate(pipeline))
+        for day in days:
+            day['day'] = int(day['date'][-2:])
+        return {'month': month.strftime('%Y-%m'), 'timezone': Config.APP_TIMEZONE, 'days': days}
+
+    def iter_export(self, user_id, cursor=None):
+        """
+        사용자의 모든 일기를 오래된 순으로 하나씩 내보냅니다. (서버 측 커서 + 제너레이터라 메모리 사용량이 일정)
+        각 레코드에는 대화 기록과 사진 목록(미디어 정보 포함), 이어 받기용 cursor 가 들어 있습니다.
+        """
+        diaries = mongo.db.diaries.find(export_filter(user_id, cursor), WITHOUT_TRANSCRIPT) \
+            .sort(SORT_ASCENDING) \
+            .batch_size(Config.DIARY_EXPORT_BATCH_SIZE)
+        try:
+            for diary in diaries:
+                diary['conversations'] = conversation_store.load_for_diary(diary)
+                diary['photos'] = self._photo_manifest(user_id, diary.get('photos') or [])
+                yield {'type': 'diary', 'cursor': encode_cursor(diary), 'diary': diary}
+        finally:
+            diaries.close()
+
+    def _photo_manifest(self, user_id, photos):
+        """일기 사진에 media 컬렉션의 id/설명/업로드 시각을 붙입니다."""
+        urls = [photo.get('url') for photo in photos if photo.get('url')]
+        media_by_url = {
+            media['url']: media for media in mongo.db.media.find(
+                photo_media_filter(user_id, urls),
+                {'url': 1, 'description': 1, 'created_at': 1}
+            )
+        } if urls else {}
+        manifest = []
+        for photo in photos:
+            media = media_by_url.get(photo.get('url'), {})
+            manifest.append({
+                'filename': photo.get('filename'),
+                'url': photo.get('url'),
+                'media_id': media.get('_id'),
+                'description': media.get('description'),
+                'uploaded_at': media.get('created_at'),
+            })
+        return manifest
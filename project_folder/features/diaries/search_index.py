@@ -0,0 +1,185 @@
+"""
+일기 검색용 역색인.
+
+제목/본문(summary_context)/카테고리/대화 내용을 한글은 음절 bigram 과 음절 하나씩, 영문/숫자는 단어 단위로 토큰화해
+diary_search_postings 컬렉션에 (user_id, term, diary_id) 단위로 저장합니다.
+음절도 색인하므로 "밥" 같은 한 글자 검색어가 "볶음밥을" 처럼 긴 단어 안에 있어도 찾습니다.
+일기가 완성되거나 수정될 때 해당 일기의 포스팅만 다시 만들고,
+검색은 모든 검색어 토큰을 포함한 일기를 가중치 x idf 합으로 정렬합니다.
+
+기존 데이터 색인: python -m features.diaries.search_index [user_id]
+"""
+import datetime
+import math
+import re
+import sys
+import unicodedata
+from collections import defaultdict
+
+from bson.objectid import ObjectId
+from pymongo import InsertOne, DeleteMany
+
+from config import Config
+from extensions import mongo
+from features.ai_coach import conversation_store
+
+_WORD = re.compile(r"[가-힣]+|[a-z0-9]+")
+_EPOCH = datetime.datetime.fromtimestamp(0, tz=datetime.timezone.utc)
+
+FIELD_WEIGHTS = {
+    "title": 3.0,
+    "categories": 3.0,
+    "summary_context": 1.0,
+    "user_turn": 0.5,
+    "ai_turn": 0.25,
+}
+
+
+def tokenize(text, syllables=False):
+    """
+    한글 음절 bigram(한 글자 단어는 그대로)과 영문/숫자 단어 토큰을 순서대로 반환합니다.
+    syllables 가 참이면(색인할 때) 두 글자 이상 한글 단어의 음절도 하나씩 더합니다.
+    """
+    text = unicodedata.normalize("NFKC", text or "").lower()
+    tokens = []
+    for word in _WORD.findall(text):
+        if "가" <= word[0] <= "힣":
+            if len(word) == 1:
+                tokens.append(word)
+            else:
+                tokens.extend(word[i:i + 2] for i in range(len(word) - 1))
+                if syllables:
+                    tokens.extend(word)
+        else:
+            tokens.append(word)
+    return tokens
+
+
+def _term_weights(diary, conversations):
+    weights = defaultdict(float)
+
+    def add(text, weight):
+        for term in tokenize(text, syllables=True):
+            weights[term] += weight
+
+    add(diary.get("title"), FIELD_WEIGHTS["title"])
+    add(" ".join(diary.get("categories") or []), FIELD_WEIGHTS["categories"])
+    add(diary.get("summary_context"), FIELD_WEIGHTS["summary_context"])
+    for turn in conversations:
+        role = "user_turn" if turn.get("role") == "user" else "ai_turn"
+        add(turn.get("content"), FIELD_WEIGHTS[role])
+    # 같은 단어가 많이 반복되어도 점수가 선형으로 커지지 않도록 로그로 눌러 줍니다.
+    return {term: round(1 + math.log(w), 4) if w > 1 else round(w, 4) for term, w in weights.items()}
+
+
+def term_filter(user_id, term, created_at_range=None, candidates=None):
+    """검색어 토큰 하나의 포스팅 조건. candidates 가 있으면 그 일기들 안에서만."""
+    query_filter = {"user_id": user_id, "term": term}
+    if created_at_range:
+        query_filter["created_at"] = created_at_range
+    if candidates is not None:
+        query_filter["diary_id"] = {"$in": list(candidates)}
+    return query_filter
+
+
+def diary_postings_filter(diary_id):
+    return {"diary_id": diary_id}
+
+
+class DiarySearchIndex:
+    def __init__(self, collection="diary_search_postings"):
+        self.collection_name = collection
+
+    @property
+    def collection(self):
+        return mongo.db[self.collection_name]
+
+    def index_diary(self, diary_id):
+        """일기 하나의 포스팅을 다시 만듭니다. 완성되지 않은 일기는 색인에서 빠집니다."""
+        diary_id = ObjectId(diary_id)
+        diary = mongo.db.diaries.find_one({"_id": diary_id})
+        operations = [DeleteMany(diary_postings_filter(diary_id))]
+        if diary and diary.get("status") == "completed":
+            weights = _term_weights(diary, conversation_store.load_for_diary(diary))
+            operations.extend(
+                InsertOne({
+                    "user_id": diary["user_id"],
+                    "term": term,
+                    "diary_id": diary_id,
+                    "created_at": diary.get("created_at"),
+                    "w": weight,
+                })
+                for term, weight in weights.items()
+            )
+        self.collection.bulk_write(operations, ordered=True)
+        return len(operations) - 1
+
+    def remove_diary(self, diary_id):
+        self.collection.delete_many(diary_postings_filter(ObjectId(diary_id)))
+
+    def search(self, user_id, query, created_at_range=None, limit=None, after=None):
+        """
+        검색어의 모든 토큰을 포함하는 일기 id 를 관련도 순으로 limit 개 반환합니다. 반환값: (id 목록, 다음 위치)
+        순서는 (점수, created_at, _id) 역순이고, 다음 위치를 after 로 넘기면 그 뒤부터 이어서 반환합니다.
+        가장 드문 토큰부터 후보를 좁혀 가므로 흔한 토큰이 섞여 있어도 읽는 포스팅 수가 작게 유지됩니다.
+        """
+        limit = limit or Config.DIARY_SEARCH_MAX_RESULTS
+        terms = list(dict.fromkeys(tokenize(query)))[:Config.DIARY_SEARCH_MAX_TERMS]
+        if not terms:
+            return [], None
+
+        doc_freq = {
+            term: self.collection.count_documents(term_filter(user_id, term, created_at_range)) for term in terms
+        }
+        if not all(doc_freq.values()):
+            return [], None
+        total_docs = max(mongo.db.diaries.count_documents({"user_id": user_id, "status": "completed"}), 1)
+
+        scores = None
+        created = {}
+        for term in sorted(terms, key=doc_freq.get):
+            idf = math.log(1 + total_docs / doc_freq[term])
+            postings = self.collection.find(
+                term_filter(user_id, term, created_at_range, scores), {"diary_id": 1, "w": 1, "created_at": 1, "_id": 0}
+            )
+            next_scores = {}
+            for posting in postings:
+                previous = 0.0 if scores is None else scores[posting["diary_id"]]
+                next_scores[posting["diary_id"]] = previous + posting["w"] * idf
+                created.setdefault(posting["diary_id"], posting.get("created_at") or _EPOCH)
+            scores = next_scores
+            if not scores:
+                return [], None
+
+        ranked = sorted(
+            ((score, created[diary_id], diary_id) for diary_id, score in scores.items()), reverse=True
+        )
+        if after is not None:
+            ranked = [position for position in ranked if position < after]
+        page = ranked[:limit]
+        next_position = page[-1] if len(ranked) > limit else None
+        return [diary_id for _, _, diary_id in page], next_position
+
+    def rebuild(self, user_id=None):
+        """기존 일기를 모두(또는 한 사용자 것만) 다시 색인합니다."""
+        query_filter = {"status": "completed"}
+        if user_id is not None:
+            query_filter["user_id"] = ObjectId(user_id)
+        count = 0
+        for diary in mongo.db.diaries.find(query_filter, {"_id": 1}):
+            self.index_diary(diary["_id"])
+            count += 1
+        return count
+
+
+search_index = DiarySearchIndex()
+
+
+if __name__ == "__main__":
+    from app import create_app
+
+    app = create_app()
+    with app.app_context():
+        started = datetime.datetime.now()
+        indexed = search_index.rebuild(sys.argv[1] if len(sys.argv) > 1 else None)
+        print(f"[SEARCH INDEX] 일기 {indexed}개 색인 완료 ({datetime.datetime.now() - started})")
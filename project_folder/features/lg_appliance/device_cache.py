@@ -0,0 +1,106 @@
+"""
+사용자별 가전 상태 캐시.
+
+대시보드 폴링(GET /api/lg-devices/)마다 user_LG_devices 를 다시 읽지 않도록
+사용자별 가전 목록을 프로세스 안에 버전과 함께 보관합니다.
+가전 상태를 바꾸는 쪽은 쓰기 직후 invalidate 로 공유 버전을 바꾸고,
+읽는 쪽은 공유 버전이 그대로면 캐시를, 바뀌었으면 DB 를 다시 읽습니다.
+버전은 ETag 로도 쓰여 변경이 없으면 304 로 응답할 수 있습니다.
+
+공유 버전 저장소(DEVICE_CACHE_SHARED_TIER)
+- "mongo" (기본): device_state_versions 컬렉션. gunicorn 워커 여러 개가 같은 버전을 봅니다.
+- "local": 프로세스 안에만 보관. 워커가 하나일 때만 쓰세요.
+"""
+import threading
+import time
+import uuid
+
+from config import Config
+from extensions import mongo
+
+INITIAL_VERSION = "0"
+
+
+class LocalVersionStore:
+    def __init__(self):
+        self._versions = {}
+        self._lock = threading.Lock()
+
+    def get(self, user_id):
+        return self._versions.get(user_id, INITIAL_VERSION)
+
+    def bump(self, user_id):
+        version = uuid.uuid4().hex
+        with self._lock:
+            self._versions[user_id] = version
+        return version
+
+
+class MongoVersionStore:
+    """_id 로만 읽고 쓰는 작은 문서라 폴링마다 읽어도 부담이 적습니다."""
+
+    def __init__(self, collection="device_state_versions"):
+        self.collection_name = collection
+
+    def get(self, user_id):
+        doc = mongo.db[self.collection_name].find_one({"_id": user_id}, {"v": 1})
+        return doc["v"] if doc else INITIAL_VERSION
+
+    def bump(self, user_id):
+        # 카운터 대신 임의 값을 써서, 버전 문서가 지워져도 예전 ETag 와 겹치지 않게 합니다.
+        version = uuid.uuid4().hex
+        mongo.db[self.collection_name].update_one({"_id": user_id}, {"$set": {"v": version}}, upsert=True)
+        return version
+
+
+VERSION_STORES = {
+    "local": LocalVersionStore,
+    "mongo": MongoVersionStore,
+}
+
+
+class DeviceStateCache:
+    def __init__(self, shared_tier=None, max_users=None):
+        tier = shared_tier or Config.DEVICE_CACHE_SHARED_TIER
+        if tier not in VERSION_STORES:
+            raise ValueError(f"알 수 없는 가전 캐시 공유 저장소입니다: {tier}")
+        self.versions = VERSION_STORES[tier]()
+        self.max_users = max_users or Config.DEVICE_CACHE_MAX_USERS
+        self._lock = threading.Lock()
+        self._entries = {}  # user_id -> (version, devices, 저장 시각)
+        self.stats = {"hits": 0, "misses": 0, "invalidations": 0}
+
+    def get_version(self, user_id):
+        return self.versions.get(user_id)
+
+    def get(self, user_id, loader):
+        """
+        (버전, 가전 목록) 을 반환합니다. 공유 버전이 캐시와 같으면 DB 를 읽지 않습니다.
+        버전을 먼저 읽고 데이터를 읽으므로, 그 사이에 쓰기가 끼어도 다음 요청에서 다시 읽게 됩니다.
+        """
+        version = self.versions.get(user_id)
+        with self._lock:
+            entry = self._entries.get(user_id)
+        if entry and entry[0] == version:
+            self.stats["hits"] += 1
+            return version, entry[1]
+
+        self.stats["misses"] += 1
+        devices = loader(user_id)
+        with self._lock:
+            if len(self._entries) >= self.max_users and user_id not in self._entries:
+                # 가장 오래전에 채운 항목을 버립니다.
+                oldest = min(self._entries, key=lambda key: self._entries[key][2])
+                self._entries.pop(oldest)
+            self._entries[user_id] = (version, devices, time.monotonic())
+        return version, devices
+
+    def invalidate(self, user_id):
+        """가전 상태를 바꾼 직후 호출합니다. 모든 워커의 캐시가 다음 읽기에서 새로 채워집니다."""
+        with self._lock:
+            self._entries.pop(user_id, None)
+        self.stats["invalidations"] += 1
+        return self.versions.bump(user_id)
+
+
+device_cache = DeviceStateCache()
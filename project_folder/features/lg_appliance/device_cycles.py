@@ -0,0 +1,229 @@
+"""
+가전 동작 사이클(세탁, 건조, 청소 등)의 남은 시간 계산과 자동 완료.
+
+사이클을 시작할 때 끝나는 시각(cycle_due_at = cycle_start_timestamp + total_time)을 함께 저장합니다.
+remaining_time 과 progress 는 DB 에서 줄여 나가지 않고 읽을 때 with_progress 가 현재 시각으로 계산합니다.
+끝난 사이클은 스케줄러 하나가 cycle_due_at 인덱스로 찾아 bulk_write 로 한꺼번에 완료 처리하고,
+run_count / 사용 시간 / 퀘스트 진행도를 올립니다. gunicorn 워커마다 스레드가 있지만
+scheduler_leases 의 임대를 가진 한 곳만 실행하며, 다음 완료 시각까지 잠들어 있으므로 가전별 폴링은 없습니다.
+
+단독 실행: python -m features.lg_appliance.device_cycles
+(cycle_due_at 이 없는 진행 중 사이클을 채운 뒤 스케줄러를 실행합니다.)
+"""
+import datetime
+import os
+import socket
+import threading
+
+from pymongo import ReturnDocument, UpdateOne
+from pymongo.errors import DuplicateKeyError, PyMongoError
+
+from config import Config
+from extensions import mongo
+
+# 사이클이 있는 가전의 진행 중 상태와 끝났을 때의 상태
+RUNNING_STATUSES = {"running": "completed", "cleaning": "docked"}
+LEASE_ID = "device_cycles"
+DUE_ORDER = [("cycle_due_at", 1)]
+
+
+def _now():
+    return datetime.datetime.now(datetime.timezone.utc)
+
+
+def _aware(value):
+    # pymongo 는 UTC naive datetime 을 돌려주므로 UTC 로 간주합니다.
+    if value is not None and value.tzinfo is None:
+        return value.replace(tzinfo=datetime.timezone.utc)
+    return value
+
+
+def due_at(start, total_time):
+    """사이클이 끝나는 시각"""
+    return _aware(start) + datetime.timedelta(seconds=total_time or 0)
+
+
+def with_progress(device, now=None):
+    """진행 중인 사이클의 remaining_time(초)과 progress(0~1)를 현재 시각 기준으로 채운 사본을 반환합니다."""
+    start = device.get("cycle_start_timestamp")
+    total = device.get("total_time") or 0
+    if device.get("status") not in RUNNING_STATUSES or not start or total <= 0:
+        return device
+    elapsed = ((now or _now()) - _aware(start)).total_seconds()
+    remaining = max(0, int(total - elapsed))
+    return {**device, "remaining_time": remaining, "progress": round(min(1.0, max(0.0, elapsed / total)), 3)}
+
+
+def due_filter(now):
+    """끝날 시각이 지난 사이클 (cycle_due 인덱스)"""
+    return {"cycle_due_at": {"$lte": now}}
+
+
+def completion_update(device, finished_at):
+    """사이클 완료 시의 ($set, $inc). 수동 완료(simulate)와 자동 완료가 같이 씁니다."""
+    update_fields = {
+        "status": RUNNING_STATUSES.get(device.get("status"), "completed"),
+        "power": "off",
+        "cycle_start_timestamp": None,
+        "remaining_time": 0,
+    }
+    inc_fields = {"run_count": 1}
+    if device.get("type") != "robot_vacuum":
+        update_fields["power_on_timestamp"] = None
+        power_on_time = _aware(device.get("power_on_timestamp"))
+        if power_on_time:
+            inc_fields["weekly_duration_sec"] = max(0.0, (finished_at - power_on_time).total_seconds())
+    return update_fields, inc_fields
+
+
+def complete_due_cycles(now=None, batch_size=None):
+    """cycle_due_at 이 지난 사이클을 최대 batch_size 개 완료 처리하고 완료한 가전 수를 반환합니다."""
+    from features.lg_appliance import lg_appliance_service, device_telemetry
+    from features.quests.quests_service import QuestsService
+
+    now = now or _now()
+    now = now.replace(microsecond=now.microsecond // 1000 * 1000)  # BSON 날짜는 밀리초까지라 아래 일치 조회를 위해 맞춥니다.
+    due = list(mongo.db.user_LG_devices.find(
+        due_filter(now),
+        {"userId": 1, "name": 1, "type": 1, "status": 1, "power_on_timestamp": 1, "cycle_due_at": 1},
+    ).sort(DUE_ORDER).limit(batch_size or Config.DEVICE_CYCLE_BATCH_SIZE))
+    if not due:
+        return 0
+
+    operations, changes = [], {}
+    for device in due:
+        update_fields, inc_fields = completion_update(device, _aware(device["cycle_due_at"]))
+        operations.append(UpdateOne(
+            # 그 사이 사용자가 직접 끝냈거나 다시 시작했으면 cycle_due_at 이 달라져 건너뜁니다.
+            {"_id": device["_id"], "cycle_due_at": device["cycle_due_at"]},
+            {"$set": {**update_fields, "cycle_completed_at": now}, "$inc": inc_fields, "$unset": {"cycle_due_at": ""}},
+        ))
+        changes[device["_id"]] = (update_fields, inc_fields, _aware(device["cycle_due_at"]))
+    mongo.db.user_LG_devices.bulk_write(operations, ordered=False)
+
+    # 이번 배치에서 실제로 완료된 가전만 다시 읽어 변경분을 보냅니다.
+    completed = list(mongo.db.user_LG_devices.find(
+        {"_id": {"$in": [device["_id"] for device in due]}, "cycle_completed_at": now}
+    ))
+    transitions, completed_by_user = [], {}
+    for device in completed:
+        change = changes.get(device["_id"])
+        if change is None:
+            continue
+        update_fields, inc_fields, finished_at = change
+        lg_appliance_service._state_changed(
+            device["userId"], device["name"], "updated", {key: device.get(key) for key in (*update_fields, *inc_fields)}
+        )
+        transitions.append(device_telemetry.transition_from_update(
+            device["userId"], device, update_fields, inc_fields, finished_at
+        ))
+        completed_by_user.setdefault(device["userId"], []).append(device["name"])
+    device_telemetry.record(transitions)
+
+    quests_service = QuestsService()
+    for user_id, device_names in completed_by_user.items():
+        try:
+            quests_service.update_quests_progress_for_devices(user_id, device_names)
+        except Exception as e:
+            print(f"[DEVICE CYCLES] 퀘스트 진행도 갱신 실패 (user {user_id}): {e}")
+    print(f"[DEVICE CYCLES] 사이클 {len(completed)}개 자동 완료")
+    return len(completed)
+
+
+def backfill_due_times():
+    """cycle_due_at 없이 진행 중인(이 기능 이전에 시작된) 사이클에 끝나는 시각을 채웁니다."""
+    result = mongo.db.user_LG_devices.update_many(
+        {
+            "status": {"$in": list(RUNNING_STATUSES)},
+            "cycle_start_timestamp": {"$type": "date"},
+            "cycle_due_at": {"$exists": False},
+        },
+        [{"$set": {"cycle_due_at": {"$add": [
+            "$cycle_start_timestamp", {"$multiply": [{"$ifNull": ["$total_time", 0]}, 1000]}
+        ]}}}],
+    )
+    return result.modified_count
+
+
+class CycleScheduler:
+    def __init__(self):
+        self.owner = f"{socket.gethostname()}:{os.getpid()}"
+        self._stop = threading.Event()
+        self._thread = None
+        self.stats = {"sweeps": 0, "completed": 0}
+
+    def _acquire_lease(self):
+        """임대를 새로 얻거나 연장하면 True. 다른 프로세스가 가지고 있으면 False."""
+        now = _now()
+        try:
+            lease = mongo.db.scheduler_leases.find_one_and_update(
+                {"_id": LEASE_ID, "$or": [{"owner": self.owner}, {"lease_until": {"$lt": now}}]},
+                {"$set": {"owner": self.owner,
+                          "lease_until": now + datetime.timedelta(seconds=Config.DEVICE_CYCLE_LEASE_SEC)}},
+                upsert=True,
+                return_document=ReturnDocument.AFTER,
+            )
+        except DuplicateKeyError:
+            return False  # 임대 문서가 있고 다른 프로세스 것
+        return lease is not None and lease["owner"] == self.owner
+
+    def _seconds_until_next_due(self):
+        upcoming = mongo.db.user_LG_devices.find_one(
+            {"cycle_due_at": {"$exists": True}}, {"cycle_due_at": 1}, sort=[("cycle_due_at", 1)]
+        )
+        if upcoming is None:
+            return Config.DEVICE_CYCLE_SWEEP_SEC
+        return (_aware(upcoming["cycle_due_at"]) - _now()).total_seconds()
+
+    def _loop(self):
+        while not self._stop.is_set():
+            delay = Config.DEVICE_CYCLE_SWEEP_SEC
+            try:
+                if self._acquire_lease():
+                    completed = complete_due_cycles()
+                    self.stats["sweeps"] += 1
+                    self.stats["completed"] += completed
+                    if completed >= Config.DEVICE_CYCLE_BATCH_SIZE:
+                        continue  # 밀린 사이클이 더 있으므로 바로 다음 배치
+                    # 다음 사이클이 끝날 때까지 자되, 임대가 끊기지 않도록 SWEEP_SEC 보다 오래 자지는 않습니다.
+                    delay = min(delay, max(0.0, self._seconds_until_next_due()))
+            except PyMongoError as e:
+                print(f"[DEVICE CYCLES] 자동 완료 실패: {e}")
+            self._stop.wait(delay)
+
+    def start(self):
+        self._thread = threading.Thread(target=self._loop, name="device-cycles", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def wait(self):
+        self._stop.wait()
+
+
+_scheduler = None
+_scheduler_pid = None
+
+
+def start_scheduler():
+    """현재 프로세스에서 스케줄러 스레드를 시작합니다. (프로세스당 한 번, fork 후에는 자식에서 다시 시작)"""
+    global _scheduler, _scheduler_pid
+    if _scheduler is not None and _scheduler_pid == os.getpid():
+        return _scheduler
+    _scheduler = CycleScheduler()
+    _scheduler_pid = os.getpid()
+    if Config.DEVICE_CYCLE_SCHEDULER:
+        _scheduler.start()
+    return _scheduler
+
+
+if __name__ == "__main__":
+    from app import create_app
+
+    app = create_app()
+    with app.app_context():
+        print(f"[DEVICE CYCLES] 진행 중 사이클 {backfill_due_times()}개에 cycle_due_at 을 채웠습니다.")
+        scheduler = CycleScheduler()
+        scheduler.start()
+        scheduler.wait()
@@ -0,0 +1,188 @@
+"""
+가전 상태 변경 이벤트와 실시간 전달 허브.
+
+가전 상태를 바꾸면 publish 가 device_events (capped 컬렉션)에 변경분(delta)을 순번(seq)과 함께 남깁니다.
+프로세스마다 스레드 하나가 이 컬렉션을 tailable 커서로 따라가며 해당 사용자의 구독자들에게 나눠 주므로,
+어느 gunicorn 워커에서 바뀌었든 모든 워커의 구독자가 받습니다.
+구독자는 각자의 Condition 으로 잠들어 있다가 이벤트가 오거나 heartbeat 시간이 되면 깨어나므로
+쉬는 동안에는 CPU 를 쓰지 않지만, gthread 워커에서는 연결마다 요청 스레드 하나를 계속 잡고 있습니다.
+그래서 프로세스당 구독 수를 DEVICE_EVENTS_MAX_SUBSCRIBERS 로 제한해 나머지 스레드는 REST API 에 남겨 둡니다.
+재연결 시 마지막으로 받은 seq 이후의 이벤트를 다시 보내고, 너무 오래되어 남아 있지 않으면 전체 상태(snapshot)를 보냅니다.
+"""
+import datetime
+import os
+import threading
+import time
+from collections import defaultdict, deque
+
+from pymongo import CursorType, ReturnDocument
+from pymongo.errors import CollectionInvalid, PyMongoError
+
+from config import Config
+from extensions import mongo
+
+COLLECTION = "device_events"
+
+
+def ensure_collection():
+    try:
+        mongo.db.create_collection(COLLECTION, capped=True, size=Config.DEVICE_EVENTS_CAPPED_BYTES)
+    except CollectionInvalid:
+        pass  # 이미 있음
+    except NotImplementedError:
+        # capped 컬렉션을 지원하지 않는 DB(테스트의 mongomock). 이벤트 기록은 되지만 SSE tail 은 동작하지 않습니다.
+        print(f"[DEVICE EVENTS] capped 컬렉션을 만들 수 없어 일반 {COLLECTION} 컬렉션을 씁니다.")
+
+
+def _next_seq():
+    counter = mongo.db.counters.find_one_and_update(
+        {"_id": COLLECTION}, {"$inc": {"seq": 1}}, upsert=True, return_document=ReturnDocument.AFTER
+    )
+    return counter["seq"]
+
+
+def publish(user_id, device_name, kind, delta=None, version=None):
+    """kind: "updated" | "added" | "deleted". delta 는 바뀐 필드만 담습니다."""
+    event = {
+        "seq": _next_seq(),
+        "user_id": user_id,
+        "device": device_name,
+        "kind": kind,
+        "delta": delta or {},
+        "version": version,
+        "at": datetime.datetime.now(datetime.timezone.utc),
+    }
+    mongo.db[COLLECTION].insert_one(event)
+    return event
+
+
+def since_filter(user_id, seq):
+    return {"user_id": user_id, "seq": {"$gt": seq}}
+
+
+def events_since(user_id, seq):
+    """seq 이후의 사용자 이벤트 목록. 그 사이 이벤트가 capped 컬렉션에서 밀려났으면 None."""
+    oldest = mongo.db[COLLECTION].find_one({}, {"seq": 1}, sort=[("$natural", 1)])
+    if oldest is None or oldest["seq"] > seq + 1:
+        return None
+    return list(mongo.db[COLLECTION].find(since_filter(user_id, seq)).sort("seq", 1))
+
+
+class SubscriberLimitError(Exception):
+    """이 프로세스의 동시 구독 수가 DEVICE_EVENTS_MAX_SUBSCRIBERS 에 찼을 때"""
+
+
+class Subscription:
+    def __init__(self, hub, user_id, max_pending):
+        self.hub = hub
+        self.user_id = user_id
+        self.pending = deque()
+        self.max_pending = max_pending
+        self.overflowed = False
+        self.closed = False
+        # 허브 잠금을 공유하는 구독자별 Condition 이라, 이벤트가 오면 해당 사용자의 구독자만 깨웁니다.
+        self.condition = threading.Condition(hub.lock)
+
+    def _push(self, event):
+        # hub.lock 을 잡은 상태에서 호출됩니다.
+        if len(self.pending) >= self.max_pending:
+            # 너무 밀린 구독자는 개별 이벤트 대신 전체 상태를 다시 받게 합니다.
+            self.pending.clear()
+            self.overflowed = True
+        else:
+            self.pending.append(event)
+        self.condition.notify()
+
+    def wait(self, timeout):
+        """이벤트가 올 때까지(최대 timeout 초) 기다렸다가 (밀린 이벤트 목록, overflow 여부)를 반환합니다."""
+        with self.condition:
+            if not self.pending and not self.overflowed:
+                self.condition.wait_for(lambda: self.pending or self.overflowed or self.closed, timeout)
+            events, overflowed = list(self.pending), self.overflowed
+            self.pending.clear()
+            self.overflowed = False
+        return events, overflowed
+
+    def close(self):
+        self.hub.unsubscribe(self)
+
+
+class DeviceEventHub:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self._subscribers = defaultdict(set)
+        self._count = 0
+        self._thread = None
+        self._pid = None
+        self.stats = {"delivered": 0, "tail_restarts": 0, "rejected": 0}
+
+    def subscribe(self, user_id):
+        """구독을 등록합니다. 동시 구독 수가 한도에 찼으면 SubscriberLimitError."""
+        self._ensure_started()
+        subscription = Subscription(self, user_id, Config.DEVICE_EVENTS_MAX_PENDING)
+        with self.lock:
+            if self._count >= Config.DEVICE_EVENTS_MAX_SUBSCRIBERS:
+                self.stats["rejected"] += 1
+                raise SubscriberLimitError()
+            self._subscribers[user_id].add(subscription)
+            self._count += 1
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self.lock:
+            if subscription.closed:
+                return
+            subscription.closed = True
+            self._count -= 1
+            subscribers = self._subscribers.get(subscription.user_id)
+            if subscribers is not None:
+                subscribers.discard(subscription)
+                if not subscribers:
+                    del self._subscribers[subscription.user_id]
+            subscription.condition.notify()
+
+    def subscriber_count(self):
+        with self.lock:
+            return self._count
+
+    def _dispatch(self, event):
+        with self.lock:
+            subscribers = self._subscribers.get(event["user_id"])
+            if not subscribers:
+                return
+            for subscription in subscribers:
+                subscription._push(event)
+            self.stats["delivered"] += len(subscribers)
+
+    def _ensure_started(self):
+        # fork 된 워커에서는 부모의 스레드가 없으므로 워커마다 따로 시작합니다.
+        if self._thread is not None and self._pid == os.getpid():
+            return
+        with self.lock:
+            if self._thread is not None and self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            self._thread = threading.Thread(target=self._tail, name="device-events", daemon=True)
+            self._thread.start()
+
+    def _tail(self):
+        """device_events 를 tailable 커서로 따라갑니다. 이 프로세스가 시작된 뒤의 이벤트부터 나눠 줍니다."""
+        last = mongo.db[COLLECTION].find_one({}, {"seq": 1}, sort=[("$natural", -1)])
+        last_seq = last["seq"] if last else 0
+        while True:
+            try:
+                cursor = mongo.db[COLLECTION].find(
+                    {"seq": {"$gt": last_seq}}, cursor_type=CursorType.TAILABLE_AWAIT
+                ).max_await_time_ms(Config.DEVICE_EVENTS_AWAIT_MS)
+                while cursor.alive:
+                    for event in cursor:
+                        last_seq = max(last_seq, event["seq"])
+                        self._dispatch(event)
+            except PyMongoError as e:
+                print(f"[DEVICE EVENTS] 이벤트 구독 커서 오류: {e}")
+            # 컬렉션이 비어 있으면 tailable 커서가 바로 닫히므로 잠시 후 다시 엽니다.
+            self.stats["tail_restarts"] += 1
+            time.sleep(1)
+
+
+hub = DeviceEventHub()
@@ -0,0 +1,134 @@
+"""
+사용자 기본 가전 일괄 등록.
+
+마스터 카탈로그(메모리)로 가전 템플릿을 한 번에 만들고 insert_many(ordered=False) 한 번으로 넣습니다.
+가전은 (userId, name) unique 인덱스로 사용자마다 이름이 하나뿐이므로, 중복 키 오류가 난 가전은 "exists" 로 알려 줍니다.
+
+기존 사용자 일괄 등록(backfill): python -m features.lg_appliance.device_provisioning [사용자 배치 크기]
+(name 필드가 없는 예전 가전 문서에 이름을 먼저 채웁니다.)
+"""
+import sys
+import time
+
+from pymongo.errors import BulkWriteError
+
+from config import Config
+from extensions import mongo
+from features.lg_appliance import lg_appliance_service
+from features.lg_appliance.device_cache import device_cache
+
+DEFAULT_DEVICE_CONFIGS = [
+    ("LG_REFRIGERATOR_DIOS", "우리집 냉장고"),
+    ("LG_WASHER_AI_DD", "우리집 세탁기"),
+    ("LG_DRYER_DUAL_INVERTER", "우리집 건조기"),
+    ("LG_AC_WHISEN", "거실 에어컨"),
+    ("LG_AIR_PURIFIER_360", "거실 공기청정기"),
+    ("LG_ROBOT_VACUUM_R9", "우리집 로봇청소기"),
+    ("LG_TV_OLED", "거실 TV"),
+    ("LG_STYLER_STEAM", "우리집 스타일러"),
+    ("LG_DISHWASHER_STEAM", "우리집 식기세척기"),
+    ("LG_MASSAGE_CHAIR", "우리집 안마의자"),
+]
+
+DUPLICATE_KEY = 11000
+
+
+def provision_users(user_ids, device_configs=None, notify=True):
+    """
+    여러 사용자에게 가전을 한 번의 insert_many 로 등록합니다.
+    반환값: {user_id: [{"device", "master_device_id", "status", ("message")}, ...]}
+    status: created | exists | error
+    """
+    device_configs = device_configs or DEFAULT_DEVICE_CONFIGS
+    results = {user_id: [] for user_id in user_ids}
+    documents, owners = [], []
+    for user_id in user_ids:
+        for master_device_id, user_defined_name in device_configs:
+            result = {"device": user_defined_name, "master_device_id": master_device_id, "status": "created"}
+            results[user_id].append(result)
+            try:
+                template = lg_appliance_service._get_device_template(master_device_id, user_defined_name)
+            except ValueError as e:
+                result.update(status="error", message=str(e))
+                continue
+            template["userId"] = user_id
+            documents.append(template)
+            owners.append(result)
+    if not documents:
+        return results
+
+    failed = {}
+    try:
+        mongo.db.user_LG_devices.insert_many(documents, ordered=False)
+    except BulkWriteError as e:
+        for error in e.details.get("writeErrors", []):
+            failed[error["index"]] = error
+
+    for index, error in failed.items():
+        if error.get("code") == DUPLICATE_KEY:
+            owners[index]["status"] = "exists"
+        else:
+            owners[index].update(status="error", message=error.get("errmsg"))
+
+    created = {}
+    for index, document in enumerate(documents):
+        if index not in failed:
+            created.setdefault(document["userId"], []).append(document)
+    for user_id, user_documents in created.items():
+        if notify:
+            lg_appliance_service._states_changed(
+                user_id, [(document["name"], "added", document) for document in user_documents]
+            )
+        else:
+            device_cache.invalidate(user_id)
+    return results
+
+
+def provision_devices(user_id, device_configs=None, notify=True):
+    """한 사용자에게 가전을 일괄 등록하고 가전별 결과 목록을 반환합니다."""
+    return provision_users([user_id], device_configs, notify)[user_id]
+
+
+def migrate_device_names():
+    """
+    가전 _id 가 곧 이름이던 예전 문서에 name 을 채웁니다. (user_device_name 인덱스를 만들기 전에 실행)
+    새 문서는 _id 가 ObjectId 이고 이름은 name 에만 있습니다.
+    """
+    result = mongo.db.user_LG_devices.update_many({"name": {"$exists": False}}, [{"$set": {"name": "$_id"}}])
+    return result.modified_count
+
+
+def backfill_default_devices(batch_size=None):
+    """모든 기존 사용자에게 기본 가전을 등록합니다. (이미 있는 가전은 exists 로 건너뜀)"""
+    batch_size = batch_size or Config.DEVICE_PROVISION_BATCH_USERS
+    totals = {"users": 0, "created": 0, "exists": 0, "error": 0}
+    started = time.perf_counter()
+    batch = []
+
+    def flush():
+        for device_results in provision_users(batch, notify=False).values():
+            for result in device_results:
+                totals[result["status"]] += 1
+        totals["users"] += len(batch)
+        batch.clear()
+        elapsed = max(time.perf_counter() - started, 1e-9)
+        print(f"[PROVISION] 사용자 {totals['users']}명, {totals['users'] / elapsed:.1f} users/s "
+              f"(created {totals['created']}, exists {totals['exists']}, error {totals['error']})")
+
+    for user in mongo.db.users.find({}, {"_id": 1}).batch_size(batch_size):
+        batch.append(str(user["_id"]))
+        if len(batch) >= batch_size:
+            flush()
+    if batch:
+        flush()
+    totals["elapsed_sec"] = round(time.perf_counter() - started, 3)
+    totals["users_per_sec"] = round(totals["users"] / max(totals["elapsed_sec"], 1e-9), 1)
+    return totals
+
+
+if __name__ == "__main__":
+    from app import create_app
+
+    app = create_app()  # create_app 에서 migrate_device_names 와 ensure_indexes 가 먼저 실행됩니다.
+    with app.app_context():
+        print(f"[PROVISION] 완료: {backfill_default_devices(int(sys.argv[1]) if len(sys.argv) > 1 else None)}")
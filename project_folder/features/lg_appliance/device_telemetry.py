@@ -0,0 +1,137 @@
+"""
+가전 사용 기록(telemetry)과 사용량 집계.
+
+전원 켜기/끄기, 사이클 시작/완료 같은 상태 전환을 device_telemetry 에 가전별 하루(APP_TIMEZONE 기준) 문서 하나로 모아
+이벤트 배열과 그날의 합계(run_count, duration_sec)를 함께 쌓습니다.
+같은 쓰기에서 device_usage_rollups 의 일별/주별 합계(사용자 + 가전 종류)도 $inc 로 올리므로,
+사용 기록 화면이나 퀘스트 진행도는 가전 문서를 다시 훑지 않고 이 합계만 읽으면 됩니다.
+주별 합계의 주 시작은 퀘스트(start_date)와 같은 UTC 월요일 0시입니다.
+"""
+import datetime
+from zoneinfo import ZoneInfo
+
+from pymongo import UpdateOne
+from pymongo.errors import PyMongoError
+
+from config import Config
+from extensions import mongo
+
+PERIOD_DAY = "day"
+PERIOD_WEEK = "week"
+SERIES_ORDER = [("start", 1), ("device_type", 1)]
+
+
+def _aware(value):
+    if value.tzinfo is None:
+        return value.replace(tzinfo=datetime.timezone.utc)
+    return value
+
+
+def local_day(at):
+    return _aware(at).astimezone(ZoneInfo(Config.APP_TIMEZONE)).strftime("%Y-%m-%d")
+
+
+def week_start(at):
+    """퀘스트와 같은 기준의 주 시작일 (UTC 월요일)"""
+    at = _aware(at).astimezone(datetime.timezone.utc)
+    return (at - datetime.timedelta(days=at.weekday())).strftime("%Y-%m-%d")
+
+
+def transition_from_update(user_id, device, update_fields, inc_fields, at):
+    """
+    가전 문서에 적용한 $set / $inc 로 어떤 상태 전환이었는지 판단합니다. 기록할 전환이 아니면 None.
+    (코스나 온도 변경처럼 전원/사이클과 무관한 제어는 기록하지 않습니다.)
+    """
+    duration_sec = inc_fields.get("weekly_duration_sec", 0)
+    if inc_fields.get("run_count"):
+        kind = "cycle_complete"
+    elif update_fields.get("status") in ("running", "cleaning"):
+        kind = "cycle_start"
+    elif "power" in update_fields:
+        kind = "power_on" if update_fields["power"] == "on" else "power_off"
+    else:
+        return None
+    event = {"kind": kind, "at": at}
+    if duration_sec:
+        event["duration_sec"] = duration_sec
+    for key in ("course", "mode"):
+        if device.get(key):
+            event[key] = device[key]
+    return {
+        "user_id": user_id,
+        "device": device["name"],
+        "device_type": device.get("type"),
+        "event": event,
+        "runs": inc_fields.get("run_count", 0),
+        "duration_sec": duration_sec,
+    }
+
+
+def record(transitions):
+    """상태 전환들을 버킷과 일별/주별 합계에 한 번씩의 bulk_write 로 반영합니다. 실패해도 제어 자체는 막지 않습니다."""
+    transitions = [transition for transition in transitions if transition]
+    if not transitions:
+        return
+    bucket_ops, rollup_ops = [], []
+    for transition in transitions:
+        at = transition["event"]["at"]
+        counters = {"event_count": 1, "run_count": transition["runs"], "duration_sec": transition["duration_sec"]}
+        bucket_ops.append(UpdateOne(
+            {"user_id": transition["user_id"], "device": transition["device"], "day": local_day(at)},
+            {
+                "$push": {"events": {"$each": [transition["event"]],
+                                     "$slice": -Config.DEVICE_TELEMETRY_MAX_EVENTS_PER_BUCKET}},
+                "$inc": counters,
+                "$set": {"device_type": transition["device_type"], "last_at": at},
+                "$setOnInsert": {"first_at": at},
+            },
+            upsert=True,
+        ))
+        for period, start in ((PERIOD_DAY, local_day(at)), (PERIOD_WEEK, week_start(at))):
+            rollup_ops.append(UpdateOne(
+                {"user_id": transition["user_id"], "period": period, "start": start,
+                 "device_type": transition["device_type"]},
+                {"$inc": counters},
+                upsert=True,
+            ))
+    try:
+        mongo.db.device_telemetry.bulk_write(bucket_ops, ordered=False)
+        mongo.db.device_usage_rollups.bulk_write(rollup_ops, ordered=False)
+    except PyMongoError as e:
+        print(f"[TELEMETRY] 사용 기록 저장 실패: {e}")
+
+
+def series_filter(user_id, period, start, end):
+    return {"user_id": user_id, "period": period, "start": {"$gte": start, "$lte": end}}
+
+
+def history_filter(user_id, device_name, start, end):
+    return {"user_id": user_id, "device": device_name, "day": {"$gte": start, "$lte": end}}
+
+
+def weekly_filter(user_id, device_type, at=None):
+    return {"user_id": user_id, "period": PERIOD_WEEK,
+            "start": week_start(at or datetime.datetime.now(datetime.timezone.utc)), "device_type": device_type}
+
+
+def usage_series(user_id, period, start, end):
+    """기간(start~end, YYYY-MM-DD) 안의 일별 또는 주별 합계를 가전 종류별로 반환합니다."""
+    return list(mongo.db.device_usage_rollups.find(
+        series_filter(user_id, period, start, end), {"_id": 0, "user_id": 0},
+    ).sort(SERIES_ORDER))
+
+
+def device_history(user_id, device_name, start, end, include_events=False):
+    """가전 하나의 일별 버킷 (events 배열은 요청할 때만)"""
+    projection = {"_id": 0, "user_id": 0}
+    if not include_events:
+        projection["events"] = 0
+    return list(mongo.db.device_telemetry.find(
+        history_filter(user_id, device_name, start, end), projection
+    ).sort("day", 1))
+
+
+def weekly_duration_sec(user_id, device_type, at=None):
+    """이번 주(퀘스트 기준) 해당 종류 가전의 총 사용 시간(초). 집계 문서가 없으면 None."""
+    rollup = mongo.db.device_usage_rollups.find_one(weekly_filter(user_id, device_type, at), {"duration_sec": 1})
+    return rollup["duration_sec"] if rollup else None
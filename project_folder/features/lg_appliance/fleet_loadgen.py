@@ -0,0 +1,324 @@
+"""
+가상 가정(fleet) 부하 생성기 - 가전 / 퀘스트 경로의 처리량과 지연 측정.
+
+가상 사용자 N 명을 만들고 기본 가전 세트를 등록한 뒤(가전 이름은 사용자마다 유일하므로 모두 기본 이름 그대로),
+하루 사용 일정(세탁 → 건조, 로봇청소기, 공기청정기 가동 시간, TV, 식기세척기 등)을 만들어
+서비스 함수(service) 또는 Flask test client 를 통한 HTTP API(http)로 그대로 재생합니다.
+사이클 시작/완료는 simulate_device_usage 에 일정상의 시각을 넘겨 사용 시간과 퀘스트 진행도가 실제처럼 쌓입니다.
+
+결과: 명령 종류별 처리량, p50/p99 지연(ms), 이벤트당 Mongo 명령 수.
+Mongo 명령 수는 pymongo CommandListener 로 셉니다.
+
+python -m features.lg_appliance.fleet_loadgen --users 1000 --days 1 --workers 8 --target service
+
+MONGO_URI 를 부하 테스트용 MongoDB(로컬 mongod 나 임시 컨테이너)로 두고 돌리세요. --cleanup 이면 만든 데이터를 지웁니다.
+"""
+import argparse
+import datetime
+import json
+import random
+import threading
+import time
+import uuid
+from collections import Counter, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import quote
+
+from bson.objectid import ObjectId
+from pymongo import monitoring
+
+from extensions import mongo
+
+TARGET_SERVICE = "service"
+TARGET_HTTP = "http"
+HOUR = 3600
+
+# (기본 가전 이름, 이 도구에서 부르는 역할)
+FLEET_DEVICES = {
+    "washer": "우리집 세탁기",
+    "dryer": "우리집 건조기",
+    "vacuum": "우리집 로봇청소기",
+    "purifier": "거실 공기청정기",
+    "tv": "거실 TV",
+    "dishwasher": "우리집 식기세척기",
+    "styler": "우리집 스타일러",
+    "massage_chair": "우리집 안마의자",
+}
+
+# 사용자가 데이터에 남기는 컬렉션 (--cleanup 대상)
+USER_COLLECTIONS = {
+    "user_LG_devices": "userId",
+    "device_telemetry": "user_id",
+    "device_usage_rollups": "user_id",
+    "device_events": "user_id",
+}
+
+
+def device_name(role):
+    return FLEET_DEVICES[role]
+
+
+# --- Mongo 명령 수 집계 ---
+
+class CommandCounter(monitoring.CommandListener):
+    """실제 MongoDB 에 보낸 명령 수 (create_app 보다 먼저 등록해야 클라이언트에 붙습니다)"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.counts = Counter()
+
+    def add(self, name):
+        with self._lock:
+            self.counts[name] += 1
+
+    def started(self, event):
+        self.add(event.command_name)
+
+    def succeeded(self, event):
+        pass
+
+    def failed(self, event):
+        pass
+
+    def snapshot(self):
+        with self._lock:
+            return Counter(self.counts)
+
+
+# --- 가상 사용자와 일정 ---
+
+def provision_fleet(user_count):
+    """가상 사용자와 가전을 만들고 주간 퀘스트를 배정합니다. (사용자 id 목록, 초당 사용자 수)"""
+    from features.lg_appliance import device_provisioning
+    from features.quests.quests_service import QuestsService
+
+    run_id = uuid.uuid4().hex[:8]
+    started = time.perf_counter()
+    result = mongo.db.users.insert_many([
+        {"email": f"fleet-{run_id}-{index:05d}@loadgen.local", "password": "", "points": 0,
+         "closet": [], "equipped_items": {}, "loadgen_run": run_id}
+        for index in range(user_count)
+    ])
+    user_ids = [str(user_id) for user_id in result.inserted_ids]
+    results = device_provisioning.provision_users(user_ids, notify=False)
+    conflicts = sum(1 for device_results in results.values() for item in device_results if item["status"] != "created")
+    quests_service = QuestsService()
+    for user_id in user_ids:
+        quests_service.get_user_weekly_quests(user_id)
+    # 공기청정기는 켜진 상태로 등록되므로, 일정의 켜기/끄기 토글과 맞도록 꺼 두고 시작합니다.
+    mongo.db.user_LG_devices.update_many(
+        {"userId": {"$in": user_ids}, "type": "air_purifier"},
+        {"$set": {"power": "off", "power_on_timestamp": None}},
+    )
+    elapsed = time.perf_counter() - started
+    if conflicts:
+        print(f"[LOADGEN] 가전 {conflicts}개를 만들지 못했습니다 (이전 실행의 데이터가 남아 있는지 확인하세요).")
+    return user_ids, user_count / max(elapsed, 1e-9)
+
+
+def _cycle(events, rng, role, start, minutes, reset=True):
+    """사이클 가전: 시작 → (minutes 뒤) 완료 → 대기 상태로 되돌리기"""
+    name = device_name(role)
+    end = start + minutes * 60 * rng.uniform(0.9, 1.1)
+    events.append((start, "simulate", name))
+    events.append((end, "simulate", name))
+    if reset:
+        events.append((end + 60, "simulate", name))
+    return end
+
+
+def daily_schedule(index, days, seed):
+    """가상 가정 하나의 (시각, 명령, 가전 이름) 목록 - 시각은 일정 시작 기준 초"""
+    rng = random.Random(seed * 1_000_003 + index)
+    events = []
+    for day in range(days):
+        base = day * 24 * HOUR
+        if rng.random() < 0.5:
+            washed = _cycle(events, rng, "washer", base + rng.uniform(8, 20) * HOUR, 60)
+            if rng.random() < 0.7:
+                _cycle(events, rng, "dryer", washed + 600, 90)
+        if rng.random() < 0.8:
+            _cycle(events, rng, "vacuum", base + rng.uniform(9, 18) * HOUR, 45, reset=False)
+        # 공기청정기는 켜고 끄는 전원 토글이라 몇 시간 가동이 사용 시간 퀘스트로 쌓입니다.
+        purifier_on = base + rng.uniform(6, 9) * HOUR
+        events.append((purifier_on, "simulate", device_name("purifier")))
+        events.append((purifier_on + rng.uniform(2, 8) * HOUR, "simulate", device_name("purifier")))
+        if rng.random() < 0.7:
+            tv_on = base + rng.uniform(19, 21) * HOUR
+            events.append((tv_on, "power_on", device_name("tv")))
+            events.append((tv_on + rng.uniform(1, 3) * HOUR, "power_off", device_name("tv")))
+        if rng.random() < 0.6:
+            _cycle(events, rng, "dishwasher", base + rng.uniform(19, 22) * HOUR, 90)
+        if rng.random() < 0.3:
+            _cycle(events, rng, "styler", base + rng.uniform(7, 8) * HOUR, 40)
+        if rng.random() < 0.3:
+            _cycle(events, rng, "massage_chair", base + rng.uniform(21, 23) * HOUR, 30)
+    events.sort(key=lambda event: event[0])
+    return events
+
+
+# --- 재생 ---
+
+class ServiceTarget:
+    def __init__(self, app):
+        from features.lg_appliance import lg_appliance_service
+        self.app = app
+        self.service = lg_appliance_service
+
+    def send(self, user_id, kind, name, at):
+        if kind == "simulate":
+            self.service.simulate_device_usage(user_id, name, at.strftime('%Y-%m-%dT%H:%M:%S.%fZ'))
+        else:
+            self.service.control_device(user_id, name, "power", "on" if kind == "power_on" else "off")
+
+
+class HttpTarget:
+    """Flask test client 로 라우트, JWT 확인, JSON 직렬화까지 포함해 측정합니다."""
+
+    def __init__(self, app):
+        from flask_jwt_extended import create_access_token
+        self.app = app
+        self._create_token = create_access_token
+        self._tokens = {}
+        self._local = threading.local()
+
+    def _client(self):
+        if not hasattr(self._local, "client"):
+            self._local.client = self.app.test_client()
+        return self._local.client
+
+    def _token(self, user_id):
+        token = self._tokens.get(user_id)
+        if token is None:
+            with self.app.app_context():
+                token = self._create_token(identity=user_id)
+            self._tokens[user_id] = token
+        return token
+
+    def send(self, user_id, kind, name, at):
+        headers = {"Authorization": f"Bearer {self._token(user_id)}"}
+        if kind == "simulate":
+            path, body = "simulate", {"startTime": at.strftime('%Y-%m-%dT%H:%M:%S.%fZ')}
+        else:
+            path, body = "control", {"command": "power", "value": "on" if kind == "power_on" else "off"}
+        response = self._client().post(f"/api/lg-devices/{quote(name, safe='')}/{path}", json=body, headers=headers)
+        if response.status_code >= 400:
+            raise RuntimeError(f"HTTP {response.status_code}: {response.get_data(as_text=True)[:200]}")
+
+
+def _percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(round(fraction * (len(sorted_values) - 1))))]
+
+
+def replay(target, user_ids, days, workers, seed):
+    """가정마다 일정을 시간순으로 재생합니다. 한 가정은 한 스레드가 맡으므로 가전별 순서가 지켜집니다."""
+    tz = datetime.timezone.utc
+    today = datetime.datetime.now(tz).replace(hour=0, minute=0, second=0, microsecond=0)
+    origin = today - datetime.timedelta(days=days)  # 과거 일정을 재생해 미래 시각의 사이클이 남지 않게 합니다.
+    latencies = defaultdict(list)
+    errors = Counter()
+    lock = threading.Lock()
+
+    def run_shard(shard):
+        local_latencies, local_errors = defaultdict(list), Counter()
+        for index in shard:
+            user_id = user_ids[index]
+            for offset, kind, name in daily_schedule(index, days, seed):
+                at = origin + datetime.timedelta(seconds=offset)
+                started = time.perf_counter()
+                try:
+                    target.send(user_id, kind, name, at)
+                except Exception as e:
+                    local_errors[f"{kind}: {type(e).__name__}"] += 1
+                local_latencies[kind].append((time.perf_counter() - started) * 1000)
+        with lock:
+            for kind, values in local_latencies.items():
+                latencies[kind].extend(values)
+            errors.update(local_errors)
+
+    shards = [range(worker, len(user_ids), workers) for worker in range(workers)]
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        list(pool.map(run_shard, shards))
+    return latencies, errors, time.perf_counter() - started
+
+
+def summarize(latencies, errors, elapsed, ops):
+    total_events = sum(len(values) for values in latencies.values())
+    total_ops = sum(ops.values())
+    rows = {}
+    for kind, values in sorted(latencies.items()) + [("all", [v for vs in latencies.values() for v in vs])]:
+        values = sorted(values)
+        rows[kind] = {
+            "events": len(values),
+            "events_per_sec": round(len(values) / max(elapsed, 1e-9), 1),
+            "p50_ms": round(_percentile(values, 0.50), 2),
+            "p99_ms": round(_percentile(values, 0.99), 2),
+        }
+    return {
+        "elapsed_sec": round(elapsed, 3),
+        "by_kind": rows,
+        "errors": dict(errors),
+        "mongo_ops": total_ops,
+        "mongo_ops_per_event": round(total_ops / max(total_events, 1), 2),
+        "mongo_ops_by_command": dict(ops.most_common()),
+    }
+
+
+def cleanup(user_ids):
+    """이번 실행에서 만든 사용자와 그 가전/기록/퀘스트를 지웁니다."""
+    user_oids = [ObjectId(user_id) for user_id in user_ids]
+    for collection, field in USER_COLLECTIONS.items():
+        mongo.db[collection].delete_many({field: {"$in": user_ids}})
+    mongo.db.user_quests.delete_many({"user_id": {"$in": user_oids}})
+    mongo.db.device_state_versions.delete_many({"_id": {"$in": user_ids}})
+    mongo.db.users.delete_many({"_id": {"$in": user_oids}})
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="가상 가정 부하 생성기")
+    parser.add_argument("--users", type=int, default=100)
+    parser.add_argument("--days", type=int, default=1)
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--target", choices=[TARGET_SERVICE, TARGET_HTTP], default=TARGET_SERVICE)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--cleanup", action="store_true", help="끝나고 만든 사용자와 가전 데이터를 지웁니다")
+    parser.add_argument("--json", dest="json_path", help="결과를 JSON 파일로도 저장")
+    args = parser.parse_args(argv)
+
+    counter = CommandCounter()
+    monitoring.register(counter)
+
+    from app import create_app
+
+    app = create_app()
+    with app.app_context():
+        user_ids, provision_rate = provision_fleet(args.users)
+        print(f"[LOADGEN] 가상 사용자 {len(user_ids)}명 준비 ({provision_rate:.1f} users/s)")
+
+        target = (HttpTarget if args.target == TARGET_HTTP else ServiceTarget)(app)
+        before = counter.snapshot()
+        latencies, errors, elapsed = replay(target, user_ids, args.days, args.workers, args.seed)
+        ops = counter.snapshot() - before
+
+        report = summarize(latencies, errors, elapsed, ops)
+        report.update(users=len(user_ids), days=args.days, workers=args.workers, target=args.target,
+                      provision_users_per_sec=round(provision_rate, 1))
+        for kind, row in report["by_kind"].items():
+            print(f"[LOADGEN] {kind:10} {row['events']:8d} events  {row['events_per_sec']:9.1f}/s  "
+                  f"p50 {row['p50_ms']:7.2f}ms  p99 {row['p99_ms']:7.2f}ms")
+        print(f"[LOADGEN] Mongo 명령 {report['mongo_ops']}개, 이벤트당 {report['mongo_ops_per_event']}개")
+        if errors:
+            print(f"[LOADGEN] 오류: {dict(errors)}")
+        if args.json_path:
+            with open(args.json_path, "w", encoding="utf-8") as f:
+                json.dump(report, f, ensure_ascii=False, indent=2)
+        if args.cleanup:
+            cleanup(user_ids)
+    return report
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,8 @@
-from flask import Blueprint, jsonify, request
+from flask import Blueprint, Response, jsonify, request, stream_with_context
 from flask_jwt_extended import jwt_required, current_user
-from . import lg_appliance_service
+from . import lg_appliance_service, device_events
+from config import Config
+from json_provider import dumps_bytes
 import traceback
 
 lg_appliance_bp = Blueprint('lg_appliance', __name__)
@@ -10,9 +12,122 @@ lg_appliance_bp = Blueprint('lg_appliance', __name__)
 def get_all_devices():
     user_id = str(current_user['_id'])
     try:
-        statuses = lg_appliance_service.get_all_statuses(user_id)
-        print(statuses)
-        return jsonify({"status": "success", "devices": statuses})
+        # 폴링하는 클라이언트가 가진 응답이 최신이면 본문 없이 304 로 응답합니다.
+        # (버전이 같으면 캐시에서 읽으므로 DB 는 버전 문서만 읽습니다.)
+        version, statuses = lg_appliance_service.get_all_statuses_with_version(user_id)
+        etag = lg_appliance_service.device_state_etag(version, statuses)
+        if request.if_none_match.contains(etag):
+            response = Response(status=304)
+            response.set_etag(etag)
+            return response
+        response = jsonify({"status": "success", "devices": statuses, "version": version})
+        response.set_etag(etag)
+        response.headers["Cache-Control"] = "no-cache"
+        return response
+    except Exception as e:
+        traceback.print_exc()
+        return jsonify({"status": "error", "message": str(e)}), 500
+
+def _sse(event, payload, event_id=None):
+    head = f"id: {event_id}\n" if event_id is not None else ""
+    return f"{head}event: {event}\ndata: ".encode() + dumps_bytes(payload) + b"\n\n"
+
+@lg_appliance_bp.route('/events', methods=['GET'])
+@jwt_required(locations=["headers", "query_string"])
+def subscribe_device_events():
+    """
+    GET /api/lg-devices/events (Server-Sent Events)
+    처음에는 전체 상태(snapshot)를, 이후에는 가전별 변경분(device)을 보냅니다.
+    재연결 시 Last-Event-ID(또는 ?since=)로 마지막 seq 를 주면 그 뒤의 변경분부터 이어 받습니다.
+    EventSource 처럼 헤더를 못 넣는 클라이언트는 ?jwt=<access token> 을 쓸 수 있습니다.
+    연결마다 요청 스레드를 하나 잡으므로 프로세스당 DEVICE_EVENTS_MAX_SUBSCRIBERS 개까지만 받고,
+    넘으면 503(Retry-After)을 돌려줍니다. 그동안 클라이언트는 GET / 의 ETag 폴링을 쓰면 됩니다.
+    """
+    user_id = str(current_user['_id'])
+    try:
+        since = request.headers.get("Last-Event-ID") or request.args.get("since")
+        since = int(since) if since else None
+    except ValueError:
+        return jsonify({"status": "error", "message": "Invalid Last-Event-ID"}), 400
+
+    def snapshot():
+        version, statuses = lg_appliance_service.get_all_statuses_with_version(user_id)
+        return _sse("snapshot", {"version": version, "devices": statuses})
+
+    # 구독을 먼저 걸어 두고 snapshot/재전송을 보내야 그 사이의 변경을 놓치지 않습니다.
+    try:
+        subscription = device_events.hub.subscribe(user_id)
+    except device_events.SubscriberLimitError:
+        response = jsonify({"status": "error", "message": "Too many event subscribers, retry later"})
+        response.status_code = 503
+        response.headers["Retry-After"] = str(Config.DEVICE_EVENTS_RETRY_MS // 1000)
+        return response
+
+    def generate():
+        last_seq = since or 0
+        try:
+            yield f"retry: {Config.DEVICE_EVENTS_RETRY_MS}\n\n".encode()
+            replay = device_events.events_since(user_id, since) if since is not None else None
+            if replay is None:
+                yield snapshot()
+            else:
+                for event in replay:
+                    last_seq = max(last_seq, event["seq"])
+                    yield _sse("device", event, event["seq"])
+            while True:
+                events, overflowed = subscription.wait(Config.DEVICE_EVENTS_HEARTBEAT_SEC)
+                if overflowed:
+                    yield snapshot()
+                elif not events:
+                    yield b": heartbeat\n\n"
+                for event in events:
+                    if event["seq"] <= last_seq:
+                        continue
+                    last_seq = event["seq"]
+                    yield _sse("device", event, event["seq"])
+        finally:
+            subscription.close()
+
+    response = Response(
+        stream_with_context(generate()),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+    # 스트림을 시작하기 전에 연결이 끊겨도 구독 자리를 돌려줍니다.
+    response.call_on_close(subscription.close)
+    return response
+
+@lg_appliance_bp.route('/usage', methods=['GET'])
+@jwt_required()
+def get_usage():
+    """
+    GET /api/lg-devices/usage?period=day|week&from=YYYY-MM-DD&to=YYYY-MM-DD
+    가전 종류별 사용 횟수(run_count)와 사용 시간(duration_sec) 합계
+    """
+    user_id = str(current_user['_id'])
+    period = request.args.get('period', 'day')
+    try:
+        series = lg_appliance_service.get_usage_series(user_id, period, request.args.get('from'), request.args.get('to'))
+        return jsonify({"status": "success", "period": period, "usage": series})
+    except ValueError as e:
+        return jsonify({"status": "error", "message": str(e)}), 400
+    except Exception as e:
+        traceback.print_exc()
+        return jsonify({"status": "error", "message": str(e)}), 500
+
+@lg_appliance_bp.route('/<device_name>/history', methods=['GET'])
+@jwt_required()
+def get_device_history(device_name):
+    """GET /api/lg-devices/<name>/history?from=&to=&events=1 (events=1 이면 전환 이벤트 목록 포함)"""
+    user_id = str(current_user['_id'])
+    try:
+        history = lg_appliance_service.get_device_history(
+            user_id, device_name, request.args.get('from'), request.args.get('to'),
+            include_events=request.args.get('events') == '1'
+        )
+        return jsonify({"status": "success", "device": device_name, "history": history})
+    except ValueError as e:
+        return jsonify({"status": "error", "message": str(e)}), 400
     except Exception as e:
         traceback.print_exc()
         return jsonify({"status": "error", "message": str(e)}), 500
@@ -44,6 +159,30 @@ def control_device(device_name):
     except ValueError as e: return jsonify({"status": "error", "message": str(e)}), 404
     except Exception as e: return jsonify({"status": "error", "message": str(e)}), 500
 
+@lg_appliance_bp.route('/control:batch', methods=['POST'])
+@jwt_required()
+def control_devices_batch():
+    """
+    POST /api/lg-devices/control:batch
+    body: {"commands": [{"device": "거실 TV", "command": "power", "value": "off"}, ...]}
+    잘못된 명령이 하나라도 있으면 아무것도 적용하지 않고 명령별 오류(errors)를 400 으로 돌려줍니다.
+    처리 중 삭제된 가전은 missing 에 이름으로 담깁니다.
+    """
+    user_id = str(current_user['_id'])
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict) or not data:
+        return jsonify({"status": "error", "message": "요청 본문(body)이 비어있습니다."}), 400
+    try:
+        devices, missing = lg_appliance_service.control_devices(user_id, data.get('commands'))
+        return jsonify({"status": "success", "devices": devices, "missing": missing})
+    except lg_appliance_service.InvalidCommandsError as e:
+        return jsonify({"status": "error", "message": str(e), "errors": e.errors}), 400
+    except ValueError as e:
+        return jsonify({"status": "error", "message": str(e)}), 400
+    except Exception as e:
+        traceback.print_exc()
+        return jsonify({"status": "error", "message": str(e)}), 500
+
 @lg_appliance_bp.route('/<device_name>/simulate', methods=['POST'])
 @jwt_required()
 def simulate_device(device_name):
@@ -83,6 +222,31 @@ def add_new_device():
         traceback.print_exc()
         return jsonify({"status": "error", "message": "Failed to add device."}), 500
 
+@lg_appliance_bp.route('/provision', methods=['POST'])
+@jwt_required()
+def provision_devices():
+    """
+    POST /api/lg-devices/provision
+    body(선택): {"devices": [{"master_device_id": ..., "user_defined_name": ...}, ...]} - 없으면 기본 가전 10종
+    가전별 결과(created / exists / conflict / error)를 돌려줍니다.
+    """
+    user_id = str(current_user['_id'])
+    data = request.get_json(silent=True) or {}
+    device_configs = None
+    if isinstance(data, dict) and data.get('devices'):
+        devices = data['devices']
+        if not isinstance(devices, list) or len(devices) > Config.DEVICE_BATCH_MAX_COMMANDS or not all(
+            isinstance(d, dict) and d.get('master_device_id') and d.get('user_defined_name') for d in devices
+        ):
+            return jsonify({"status": "error", "message": "Each device needs master_device_id and user_defined_name."}), 400
+        device_configs = [(d['master_device_id'], d['user_defined_name']) for d in devices]
+    try:
+        results = lg_appliance_service.initialize_user_devices(user_id, device_configs)
+        return jsonify({"status": "success", "results": results})
+    except Exception as e:
+        traceback.print_exc()
+        return jsonify({"status": "error", "message": "Failed to provision devices."}), 500
+
 @lg_appliance_bp.route('/<device_name>', methods=['DELETE'])
 @jwt_required()
 def delete_existing_device(device_name):
@@ -96,12 +260,22 @@ def delete_existing_device(device_name):
         traceback.print_exc()
         return jsonify({"status": "error", "message": "Failed to delete device."}), 500
 
+def _catalog_response(snapshot, body):
+    # 카탈로그 버전이 그대로면 304 로 본문 없이 응답합니다.
+    if request.if_none_match.contains(snapshot.version):
+        response = Response(status=304)
+    else:
+        response = Response(body, mimetype="application/json")
+    response.set_etag(snapshot.version)
+    response.headers["Cache-Control"] = "no-cache"
+    return response
+
 @lg_appliance_bp.route('/master', methods=['GET'])
 @jwt_required()
 def get_master_devices_route():
     try:
-        master_devices = lg_appliance_service.get_master_devices()
-        return jsonify({"status": "success", "master_devices": master_devices})
+        snapshot = lg_appliance_service.get_master_catalog()
+        return _catalog_response(snapshot, snapshot.master_devices_json)
     except Exception as e:
         traceback.print_exc()
         return jsonify({"status": "error", "message": str(e)}), 500
@@ -110,8 +284,8 @@ def get_master_devices_route():
 @jwt_required()
 def get_master_categories_route():
     try:
-        categories = lg_appliance_service.get_available_categories()
-        return jsonify({"status": "success", "categories": categories})
+        snapshot = lg_appliance_service.get_master_catalog()
+        return _catalog_response(snapshot, snapshot.categories_json)
     except Exception as e:
         traceback.print_exc()
         return jsonify({"status": "error", "message": str(e)}), 500
\ No newline at end of file
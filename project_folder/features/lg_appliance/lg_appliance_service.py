@@ -1,9 +1,15 @@
 import datetime
-from datetime import timezone
+import zlib
 from zoneinfo import ZoneInfo
 from extensions import mongo
+from config import Config
 from bson.objectid import ObjectId
 from features.quests.quests_service import QuestsService 
+from features.lg_appliance.device_cache import device_cache
+from features.lg_appliance import device_events, device_cycles, device_telemetry
+from features.lg_appliance.master_catalog import catalog as master_catalog, bump_version as bump_master_catalog_version
+from pymongo import UpdateOne
+from pymongo.errors import DuplicateKeyError, PyMongoError
 
 KST = ZoneInfo("Asia/Seoul")
 
@@ -527,6 +533,7 @@ def initialize_master_devices_db():
         ]
         
         mongo.db.LG_devices.insert_many(master_devices)
+        bump_master_catalog_version()
         print(f"LG ThinQ 마스터 가전 DB 초기화 완료 ({len(master_devices)}개 제품)")
     else:
         print("LG_devices 컬렉션에 이미 데이터가 존재합니다. 초기화 건너뜀.")
@@ -534,14 +541,14 @@ def initialize_master_devices_db():
 
 def _get_device_template(master_device_id, user_defined_name):
     """마스터 가전 템플릿으로부터 사용자 가전 인스턴스 생성"""
-    master_device = mongo.db.LG_devices.find_one({"_id": master_device_id})
+    master_device = master_catalog.get(master_device_id)
     if not master_device:
         raise ValueError(f"마스터 가전 ID '{master_device_id}'를 찾을 수 없습니다.")
 
     base_template = master_device.get("default_settings", {}).copy()
 
     base_template.update({
-        "_id": user_defined_name,
+        "name": user_defined_name,
         "master_device_id": master_device_id,
         "type": master_device["type"],
         "category": master_device.get("category", "기타"),
@@ -581,73 +588,112 @@ def _get_device_template(master_device_id, user_defined_name):
     return base_template
 
 
-def initialize_user_devices(user_id):
-    """사용자별 기본 가전 초기화"""
-    default_device_configs = [
-        ("LG_REFRIGERATOR_DIOS", "우리집 냉장고"),
-        ("LG_WASHER_AI_DD", "우리집 세탁기"),
-        ("LG_DRYER_DUAL_INVERTER", "우리집 건조기"),
-        ("LG_AC_WHISEN", "거실 에어컨"),
-        ("LG_AIR_PURIFIER_360", "거실 공기청정기"),
-        ("LG_ROBOT_VACUUM_R9", "우리집 로봇청소기"),
-        ("LG_TV_OLED", "거실 TV"),
-        ("LG_STYLER_STEAM", "우리집 스타일러"),
-        ("LG_DISHWASHER_STEAM", "우리집 식기세척기"),
-        ("LG_MASSAGE_CHAIR", "우리집 안마의자"),
-    ]
-    
-    for master_device_id, user_defined_name in default_device_configs:
+def initialize_user_devices(user_id, device_configs=None):
+    """사용자별 기본 가전 초기화 (한 번의 insert_many 로 등록하고 가전별 결과를 반환)"""
+    from features.lg_appliance import device_provisioning
+
+    results = device_provisioning.provision_devices(user_id, device_configs)
+    for result in results:
+        if result["status"] == "created":
+            print(f"✅ 사용자 {user_id} - '{result['device']}' 초기화 완료")
+        elif result["status"] == "exists":
+            print(f"⏭️  사용자 {user_id} - '{result['device']}' 이미 존재")
+        else:
+            print(f"❌ 초기화 오류: {result.get('message')}")
+    return results
+
+
+def _state_changed(user_id, device_name, kind, delta=None):
+    """가전 상태를 바꾼 직후 호출: 상태 캐시 버전을 올리고 구독 중인 클라이언트에 변경분을 보냅니다."""
+    return _states_changed(user_id, [(device_name, kind, delta)])
+
+
+def _states_changed(user_id, changes):
+    """여러 가전을 한꺼번에 바꾼 경우. 캐시 버전은 한 번만 올립니다. changes: [(가전 이름, kind, delta)]"""
+    version = device_cache.invalidate(user_id)
+    for device_name, kind, delta in changes:
         try:
-            if not mongo.db.user_LG_devices.find_one({"_id": user_defined_name, "userId": user_id}):
-                add_device(user_id, master_device_id, user_defined_name)
-                print(f"✅ 사용자 {user_id} - '{user_defined_name}' 초기화 완료")
-            else:
-                print(f"⏭️  사용자 {user_id} - '{user_defined_name}' 이미 존재")
-        except ValueError as e:
-            print(f"❌ 초기화 오류: {e}")
+            device_events.publish(user_id, device_name, kind, delta, version)
+        except PyMongoError as e:
+            # 이벤트를 못 보내도 상태 변경 자체는 성공이며, 클라이언트는 버전이 바뀐 것으로 다시 맞춥니다.
+            print(f"[DEVICE EVENTS] 이벤트 발행 실패 ({device_name}): {e}")
+    return version
 
 
-def _format_device_dates(device):
-    """datetime 객체를 KST ISO 문자열로 변환"""
-    if not device:
-        return None
-    
-    if '_id' in device and not isinstance(device['_id'], str):
-        device['_id'] = str(device['_id'])
-    
-    kst = ZoneInfo("Asia/Seoul")
-    for key, value in device.items():
-        if isinstance(value, datetime.datetime):
-            if value.tzinfo is None:
-                value = value.replace(tzinfo=timezone.utc)
-            kst_time = value.astimezone(kst)
-            device[key] = kst_time.isoformat()
-    
-    return device
+def user_devices_filter(user_id):
+    return {"userId": user_id}
+
+
+def user_device_filter(user_id, device_name):
+    # 가전 이름(name)은 사용자마다 따로 정하므로 (userId, name) 으로 찾습니다. (user_device_name unique 인덱스)
+    return {"userId": user_id, "name": device_name}
+
+
+def user_devices_named_filter(user_id, device_names):
+    return {"userId": user_id, "name": {"$in": list(device_names)}}
+
+
+def _load_all_statuses(user_id):
+    devices_cursor = mongo.db.user_LG_devices.find(user_devices_filter(user_id))
+    return {device["name"]: device for device in devices_cursor}
 
 
 def get_all_statuses(user_id):
-    """사용자의 모든 가전 상태 조회"""
-    devices_cursor = mongo.db.user_LG_devices.find({"userId": user_id})
-    devices_dict = {}
-    for device in devices_cursor:
-        devices_dict[device["_id"]] = _format_device_dates(device)
-    return devices_dict
+    """사용자의 모든 가전 상태 조회 (캐시 사용)"""
+    return get_all_statuses_with_version(user_id)[1]
+
+
+def get_all_statuses_with_version(user_id):
+    """
+    (상태 버전, 모든 가전 상태) 조회. 버전은 가전 상태가 바뀔 때마다 달라집니다.
+    진행 중인 사이클의 remaining_time / progress 는 캐시와 무관하게 읽을 때마다 계산합니다.
+    """
+    version, statuses = device_cache.get(user_id, _load_all_statuses)
+    now = datetime.datetime.now(datetime.timezone.utc)
+    return version, {name: device_cycles.with_progress(device, now) for name, device in statuses.items()}
+
+
+def device_state_etag(version, statuses):
+    """
+    가전 목록 응답의 ETag. 진행 중인 사이클이 없으면 상태 버전 그대로이고,
+    있으면 읽을 때 계산한 remaining_time / progress 를 함께 묶어 남은 시간이 바뀌면 304 가 나가지 않게 합니다.
+    """
+    running = sorted(
+        (name, device.get("remaining_time"), device.get("progress"))
+        for name, device in statuses.items()
+        if "progress" in device and device.get("status") in device_cycles.RUNNING_STATUSES
+    )
+    if not running:
+        return version
+    return f"{version}-{zlib.crc32(repr(running).encode()):08x}"
 
 
 def get_device_status(user_id, device_name):
     """특정 가전 상태 조회"""
-    device = mongo.db.user_LG_devices.find_one({"_id": device_name, "userId": user_id})
+    device = mongo.db.user_LG_devices.find_one(user_device_filter(user_id, device_name))
     if not device:
         raise ValueError(f"가전 '{device_name}'을(를) 찾을 수 없습니다.")
-    return _format_device_dates(device)
+    return device_cycles.with_progress(device)
 
 
-def control_device(user_id, device_name, command, value=None):
-    """가전 제어"""
-    device = mongo.db.user_LG_devices.find_one({"_id": device_name, "userId": user_id})
-    if not device: raise ValueError(f"가전 '{device_name}'을(를) 찾을 수 없습니다.")
-    
+def _validate_command(device, command, value):
+    """가전이 지원하지 않는 명령이면 오류 메시지, 적용할 수 있으면 None"""
+    if command == "power":
+        return None if value in ["on", "off"] else "power 는 on 또는 off 입니다."
+    if command == "temperature":
+        if "temperature" not in device and "fridge_temp" not in device:
+            return "온도를 조절할 수 없는 가전입니다."
+        return None if isinstance(value, (int, float)) and not isinstance(value, bool) else "온도는 숫자여야 합니다."
+    options_key = {"mode": "modes", "course": "courses", "fan_speed": "fan_speeds"}.get(command)
+    if options_key is None:
+        return f"알 수 없는 명령입니다: {command}"
+    if options_key not in device:
+        return f"'{command}' 명령을 지원하지 않는 가전입니다."
+    return None if value in device[options_key] else f"지원하지 않는 {command} 값입니다: {value}"
+
+
+def _control_fields(device, command, value, now):
+    """가전에 명령 하나를 적용할 때의 ($set, $inc). 바뀌는 것이 없으면 둘 다 비어 있습니다."""
     update_fields = {}
     inc_fields = {}
     
@@ -655,13 +701,13 @@ def control_device(user_id, device_name, command, value=None):
         if device["power"] != value:
             update_fields["power"] = value
             if value == "on":
-                update_fields["power_on_timestamp"] = datetime.datetime.now(KST)
+                update_fields["power_on_timestamp"] = now
             else: # Turning off
                 update_fields["power_on_timestamp"] = None
                 power_on_time = device.get("power_on_timestamp")
                 if power_on_time:
                     if power_on_time.tzinfo is None: power_on_time = power_on_time.replace(tzinfo=datetime.timezone.utc)
-                    duration = datetime.datetime.now(KST) - power_on_time
+                    duration = now - power_on_time
                     inc_fields["weekly_duration_sec"] = duration.total_seconds()
     
     elif command == "temperature" and value is not None:
@@ -673,7 +719,7 @@ def control_device(user_id, device_name, command, value=None):
         if device.get("type") == "oven":
             course_times = device.get("course_times")
             if not course_times and device.get("master_device_id"):
-                 master_device = mongo.db.LG_devices.find_one({"_id": device.get("master_device_id")})
+                 master_device = master_catalog.get(device.get("master_device_id"))
                  if master_device:
                      master_settings = master_device.get("default_settings", {})
                      course_times = master_settings.get("course_times")
@@ -697,23 +743,133 @@ def control_device(user_id, device_name, command, value=None):
     elif command == "fan_speed" and value and "fan_speeds" in device and value in device["fan_speeds"]:
         update_fields["fan_speed"] = value
 
+    # 사이클 도중 코스를 바꾸면 끝나는 시각도 새 코스 시간에 맞춥니다.
+    if "total_time" in update_fields and device.get("status") in device_cycles.RUNNING_STATUSES and device.get("cycle_start_timestamp"):
+        update_fields["cycle_due_at"] = device_cycles.due_at(device["cycle_start_timestamp"], update_fields["total_time"])
+
+    return update_fields, inc_fields
+
+
+def control_device(user_id, device_name, command, value=None):
+    """가전 제어"""
+    device = mongo.db.user_LG_devices.find_one(user_device_filter(user_id, device_name))
+    if not device: raise ValueError(f"가전 '{device_name}'을(를) 찾을 수 없습니다.")
+    
+    now = datetime.datetime.now(KST)
+    update_fields, inc_fields = _control_fields(device, command, value, now)
+
     update_payload = {}
     if update_fields: update_payload["$set"] = update_fields
     if inc_fields: update_payload["$inc"] = inc_fields
 
     if update_payload:
-        mongo.db.user_LG_devices.update_one({"_id": device_name, "userId": user_id}, update_payload)
+        mongo.db.user_LG_devices.update_one(user_device_filter(user_id, device_name), update_payload)
+        device = get_device_status(user_id, device_name)
+        _state_changed(user_id, device_name, "updated", {key: device.get(key) for key in (*update_fields, *inc_fields)})
+        device_telemetry.record([device_telemetry.transition_from_update(
+            user_id, device, update_fields, inc_fields, now
+        )])
         
         if inc_fields.get("weekly_duration_sec", 0) > 0:
             quests_service = QuestsService()
             quests_service.update_all_user_quests_progress(user_id, device_name)
+        return device
         
     return get_device_status(user_id, device_name)
 
 
+class InvalidCommandsError(ValueError):
+    """일괄 제어 명령 중 잘못된 것이 있을 때. errors 에 명령별 오류가 담깁니다."""
+
+    def __init__(self, errors):
+        super().__init__("잘못된 제어 명령이 있습니다.")
+        self.errors = errors
+
+
+def control_devices(user_id, commands):
+    """
+    여러 가전을 한 번에 제어합니다. (예: 외출 - TV 끄기, 에어컨 끄기, 공기청정기 켜기)
+    commands: [{"device": 이름, "command": 명령, "value": 값}, ...]
+    모든 명령을 먼저 검증하고 하나라도 잘못되면 아무것도 적용하지 않습니다.
+    가전별 변경은 bulk_write 한 번으로 쓰고, 퀘스트 진행도는 일괄로 한 번만 갱신합니다.
+    반환값: ({가전 이름: 제어 후 상태}, 검증 뒤 그 사이 삭제되어 제어하지 못한 가전 이름 목록)
+    """
+    if not isinstance(commands, list) or not commands:
+        raise ValueError("'commands' 목록이 필요합니다.")
+    if len(commands) > Config.DEVICE_BATCH_MAX_COMMANDS:
+        raise ValueError(f"한 번에 최대 {Config.DEVICE_BATCH_MAX_COMMANDS}개 명령까지 보낼 수 있습니다.")
+
+    names = list(dict.fromkeys(entry.get("device") for entry in commands if isinstance(entry, dict)))
+    devices = {
+        device["name"]: device
+        for device in mongo.db.user_LG_devices.find(user_devices_named_filter(user_id, names))
+    }
+
+    errors = []
+    for index, entry in enumerate(commands):
+        if not isinstance(entry, dict) or not entry.get("device") or not entry.get("command"):
+            errors.append({"index": index, "message": "'device' 와 'command' 가 필요합니다."})
+            continue
+        device = devices.get(entry["device"])
+        message = (f"가전 '{entry['device']}'을(를) 찾을 수 없습니다." if device is None
+                   else _validate_command(device, entry["command"], entry.get("value")))
+        if message:
+            errors.append({"index": index, "device": entry["device"], "message": message})
+    if errors:
+        raise InvalidCommandsError(errors)
+
+    # 같은 가전에 여러 명령이 있으면 앞 명령을 반영한 상태에서 다음 명령을 계산해 하나의 업데이트로 합칩니다.
+    now = datetime.datetime.now(KST)
+    working = {name: dict(device) for name, device in devices.items()}
+    changes = {}
+    for entry in commands:
+        name = entry["device"]
+        update_fields, inc_fields = _control_fields(working[name], entry["command"], entry.get("value"), now)
+        if not update_fields and not inc_fields:
+            continue
+        working[name].update(update_fields)
+        pending_fields, pending_inc = changes.setdefault(name, ({}, {}))
+        pending_fields.update(update_fields)
+        for key, amount in inc_fields.items():
+            pending_inc[key] = pending_inc.get(key, 0) + amount
+
+    if changes:
+        operations = []
+        for name, (update_fields, inc_fields) in changes.items():
+            update_payload = {}
+            if update_fields: update_payload["$set"] = update_fields
+            if inc_fields: update_payload["$inc"] = inc_fields
+            operations.append(UpdateOne(user_device_filter(user_id, name), update_payload))
+        write_result = mongo.db.user_LG_devices.bulk_write(operations, ordered=False)
+        if write_result.matched_count < len(operations):
+            print(f"[LG BATCH] 가전 {len(operations) - write_result.matched_count}개가 제어 중 삭제되어 "
+                  f"변경을 적용하지 못했습니다. (user={user_id})")
+
+    results = {
+        device["name"]: device_cycles.with_progress(device)
+        for device in mongo.db.user_LG_devices.find(user_devices_named_filter(user_id, names))
+    }
+    # 검증과 쓰기 사이에 삭제된 가전은 결과에서 빼고 따로 알려 줍니다. (이벤트/기록/퀘스트도 남기지 않음)
+    missing = [name for name in names if name not in results]
+    changes = {name: change for name, change in changes.items() if name in results}
+    if changes:
+        _states_changed(user_id, [
+            (name, "updated", {key: results[name].get(key) for key in (*update_fields, *inc_fields)})
+            for name, (update_fields, inc_fields) in changes.items()
+        ])
+        device_telemetry.record([
+            device_telemetry.transition_from_update(user_id, results[name], update_fields, inc_fields, now)
+            for name, (update_fields, inc_fields) in changes.items()
+        ])
+        used = [name for name, (_, inc_fields) in changes.items() if inc_fields.get("weekly_duration_sec", 0) > 0]
+        if used:
+            QuestsService().update_quests_progress_for_devices(user_id, used)
+    return results, missing
+
+
 def simulate_device_usage(user_id, device_name, start_time_iso=None):
     """가전 사용 시뮬레이션 (시작/완료 토글)"""
-    device = mongo.db.user_LG_devices.find_one({"_id": device_name, "userId": user_id})
+    device = mongo.db.user_LG_devices.find_one(user_device_filter(user_id, device_name))
     if not device: raise ValueError(f"가전 '{device_name}'을(를) 찾을 수 없습니다.")
     
     start_time_kst = datetime.datetime.now(KST) if not start_time_iso else datetime.datetime.strptime(
@@ -721,7 +877,7 @@ def simulate_device_usage(user_id, device_name, start_time_iso=None):
     ).replace(tzinfo=datetime.timezone.utc).astimezone(KST)
 
     device_type = device.get("type")
-    update_fields, inc_fields = {}, {}
+    update_fields, inc_fields, unset_fields = {}, {}, {}
 
     if device_type in ["washer", "dryer", "dishwasher", "styler", "shoe_care", "oven", "massage_chair"]:
         current_status = device.get("status")
@@ -734,7 +890,7 @@ def simulate_device_usage(user_id, device_name, start_time_iso=None):
 
             if not course_times and device.get("master_device_id"):
                 print(f"[Simulate Debug] User device lacks course_times. Fetching from master: {device.get('master_device_id')}")
-                master_device = mongo.db.LG_devices.find_one({"_id": device.get("master_device_id")})
+                master_device = master_catalog.get(device.get("master_device_id"))
                 if master_device:
                     master_settings = master_device.get("default_settings", {})
                     course_times = master_settings.get("course_times")
@@ -757,27 +913,29 @@ def simulate_device_usage(user_id, device_name, start_time_iso=None):
                 "cycle_start_timestamp": start_time_kst, 
                 "power_on_timestamp": start_time_kst, 
                 "total_time": total_time_for_course,      
-                "remaining_time": total_time_for_course   
+                "remaining_time": total_time_for_course,
+                "cycle_due_at": device_cycles.due_at(start_time_kst, total_time_for_course)
             })
         
         elif current_status == "running":
-            update_fields.update({"status": "completed", "cycle_start_timestamp": None, "remaining_time": 0, "power": "off", "power_on_timestamp": None})
-            inc_fields["run_count"] = 1
-            power_on_time = device.get("power_on_timestamp")
-            if power_on_time:
-                if power_on_time.tzinfo is None: power_on_time = power_on_time.replace(tzinfo=datetime.timezone.utc)
-                duration = start_time_kst - power_on_time
-                inc_fields["weekly_duration_sec"] = duration.total_seconds()
+            # 끝나기 전에 직접 완료 (시간이 다 되면 device_cycles 스케줄러가 같은 방식으로 완료합니다)
+            completion_fields, completion_inc = device_cycles.completion_update(device, start_time_kst)
+            update_fields.update(completion_fields)
+            inc_fields.update(completion_inc)
+            unset_fields["cycle_due_at"] = ""
         elif current_status == "completed":
             update_fields["status"] = "waiting"
 
     elif device_type == "robot_vacuum":
         current_status = device.get("status", "docked")
         if current_status in ["docked", "completed"]:
-            update_fields.update({"status": "cleaning", "power": "on", "cycle_start_timestamp": start_time_kst, "last_run_timestamp": start_time_kst, "remaining_time": device.get("total_time", 60)})
+            update_fields.update({"status": "cleaning", "power": "on", "cycle_start_timestamp": start_time_kst, "last_run_timestamp": start_time_kst, "remaining_time": device.get("total_time", 60),
+                                  "cycle_due_at": device_cycles.due_at(start_time_kst, device.get("total_time", 60))})
         elif current_status == "cleaning":
-            update_fields.update({"status": "docked", "power": "off", "cycle_start_timestamp": None, "remaining_time": 0})
-            inc_fields["run_count"] = 1
+            completion_fields, completion_inc = device_cycles.completion_update(device, start_time_kst)
+            update_fields.update(completion_fields)
+            inc_fields.update(completion_inc)
+            unset_fields["cycle_due_at"] = ""
 
     elif device_type in ["tv", "air_conditioner", "air_purifier", "refrigerator", "aero_tower", "dehumidifier"]:
         is_on = device["power"] == "on"
@@ -795,13 +953,20 @@ def simulate_device_usage(user_id, device_name, start_time_iso=None):
     update_payload = {}
     if update_fields: update_payload["$set"] = update_fields
     if inc_fields: update_payload["$inc"] = inc_fields
+    if unset_fields: update_payload["$unset"] = unset_fields
 
     if update_payload:
-        mongo.db.user_LG_devices.update_one({"_id": device_name, "userId": user_id}, update_payload)
+        mongo.db.user_LG_devices.update_one(user_device_filter(user_id, device_name), update_payload)
+        device = get_device_status(user_id, device_name)
+        _state_changed(user_id, device_name, "updated", {key: device.get(key) for key in (*update_fields, *inc_fields, *unset_fields)})
+        device_telemetry.record([device_telemetry.transition_from_update(
+            user_id, device, update_fields, inc_fields, start_time_kst
+        )])
         
         if inc_fields.get("run_count", 0) > 0 or inc_fields.get("weekly_duration_sec", 0) > 0:
             quests_service = QuestsService()
             quests_service.update_all_user_quests_progress(user_id, device_name)
+        return device
         
     return get_device_status(user_id, device_name)
 
@@ -811,53 +976,78 @@ def add_device(user_id, master_device_id, user_defined_name):
     if not user_defined_name or not master_device_id:
         raise ValueError("사용자 정의 이름과 마스터 가전 ID가 필요합니다.")
     
-    if mongo.db.user_LG_devices.find_one({"_id": user_defined_name, "userId": user_id}):
+    if mongo.db.user_LG_devices.find_one(user_device_filter(user_id, user_defined_name), {"_id": 1}):
         raise ValueError(f"가전 이름 '{user_defined_name}'이(가) 이미 존재합니다.")
     
     device_template = _get_device_template(master_device_id, user_defined_name)
     device_template["userId"] = user_id
     
-    mongo.db.user_LG_devices.insert_one(device_template)
-    return _format_device_dates(device_template)
+    try:
+        mongo.db.user_LG_devices.insert_one(device_template)
+    except DuplicateKeyError:
+        # 같은 이름으로 동시에 들어온 요청이 먼저 추가한 경우
+        raise ValueError(f"가전 이름 '{user_defined_name}'이(가) 이미 존재합니다.")
+    _state_changed(user_id, user_defined_name, "added", device_template)
+    return device_template
 
 
 def delete_device(user_id, device_name):
     """사용자 가전 삭제"""
-    result = mongo.db.user_LG_devices.delete_one({"_id": device_name, "userId": user_id})
+    result = mongo.db.user_LG_devices.delete_one(user_device_filter(user_id, device_name))
     if result.deleted_count == 0:
         raise ValueError(f"가전 '{device_name}'을(를) 찾을 수 없습니다.")
+    _state_changed(user_id, device_name, "deleted")
     return {"message": f"가전 '{device_name}'이(가) 삭제되었습니다."}
 
 
+def _usage_range(start, end, default_days):
+    """YYYY-MM-DD 기간 검증. 없으면 오늘(APP_TIMEZONE)까지 default_days 일."""
+    try:
+        end_date = datetime.date.fromisoformat(end) if end else datetime.datetime.now(KST).date()
+        start_date = datetime.date.fromisoformat(start) if start else end_date - datetime.timedelta(days=default_days - 1)
+    except ValueError:
+        raise ValueError("날짜는 YYYY-MM-DD 형식이어야 합니다.")
+    if start_date > end_date:
+        raise ValueError("시작일이 종료일보다 늦습니다.")
+    if (end_date - start_date).days >= Config.DEVICE_USAGE_MAX_DAYS:
+        raise ValueError(f"조회 기간은 최대 {Config.DEVICE_USAGE_MAX_DAYS}일입니다.")
+    return start_date.isoformat(), end_date.isoformat()
+
+
+def get_usage_series(user_id, period, start=None, end=None):
+    """일별(day) / 주별(week) 가전 종류별 사용량 합계"""
+    if period not in (device_telemetry.PERIOD_DAY, device_telemetry.PERIOD_WEEK):
+        raise ValueError("period 는 day 또는 week 입니다.")
+    start, end = _usage_range(start, end, 7 if period == device_telemetry.PERIOD_DAY else 56)
+    if period == device_telemetry.PERIOD_WEEK:
+        start = device_telemetry.week_start(datetime.datetime.fromisoformat(start))
+    return device_telemetry.usage_series(user_id, period, start, end)
+
+
+def get_device_history(user_id, device_name, start=None, end=None, include_events=False):
+    """가전 하나의 일별 사용 기록"""
+    start, end = _usage_range(start, end, 7)
+    return device_telemetry.device_history(user_id, device_name, start, end, include_events)
+
+
+def get_master_catalog():
+    """마스터 가전 카탈로그 (버전, 조회용 구조, 목록 응답 JSON)"""
+    return master_catalog.snapshot()
+
+
 def get_master_devices():
     """마스터 가전 목록 조회"""
-    master_devices_cursor = mongo.db.LG_devices.find({})
-    master_devices_list = []
-    
-    for device in master_devices_cursor:
-        if '_id' in device and isinstance(device['_id'], ObjectId):
-            device['_id'] = str(device['_id'])
-        master_devices_list.append(device)
-    
-    return master_devices_list
+    return master_catalog.snapshot().devices()
 
 
 def get_devices_by_category(category=None):
     """카테고리별 마스터 가전 조회"""
+    snapshot = master_catalog.snapshot()
     if category:
-        query = {"category": category}
-    else:
-        query = {}
-    
-    devices = list(mongo.db.LG_devices.find(query))
-    for device in devices:
-        if isinstance(device.get('_id'), ObjectId):
-            device['_id'] = str(device['_id'])
-    
-    return devices
+        return snapshot.devices(snapshot.by_category.get(category, ()))
+    return snapshot.devices()
 
 
 def get_available_categories():
     """사용 가능한 카테고리 목록"""
-    categories = mongo.db.LG_devices.distinct("category")
-    return sorted(categories)
\ No newline at end of file
+    return list(master_catalog.snapshot().categories)
\ No newline at end of file
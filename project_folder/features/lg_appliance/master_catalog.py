@@ -0,0 +1,117 @@
+"""
+마스터 가전 카탈로그 (LG_devices) 메모리 캐시.
+
+LG_devices 는 거의 바뀌지 않으므로 한 번 읽어 id / 카테고리 / 종류별 조회용 구조와
+목록 응답 JSON 을 미리 만들어 두고, 가전 추가나 코스 시간 조회, 마스터 목록 API 가 모두 이것을 씁니다.
+catalog_versions 의 버전 문서가 바뀌면 (CATALOG_VERSION_CHECK_SEC 마다 확인) 다시 읽습니다.
+버전은 마스터 목록 응답의 ETag 로도 쓰입니다.
+
+LG_devices 를 직접 고친 뒤에는 버전을 올려 주세요: python -m features.lg_appliance.master_catalog bump
+"""
+import copy
+import sys
+import threading
+import time
+import uuid
+from types import MappingProxyType
+
+from config import Config
+from extensions import mongo
+from json_provider import dumps_bytes
+
+VERSION_ID = "LG_devices"
+
+
+def bump_version():
+    """LG_devices 내용이 바뀌었음을 알립니다. 모든 프로세스가 다음 확인 때 카탈로그를 다시 읽습니다."""
+    version = uuid.uuid4().hex
+    mongo.db.catalog_versions.update_one({"_id": VERSION_ID}, {"$set": {"v": version}}, upsert=True)
+    return version
+
+
+def _current_version():
+    doc = mongo.db.catalog_versions.find_one({"_id": VERSION_ID}, {"v": 1})
+    if doc:
+        return doc["v"]
+    # 버전 문서가 없던 기존 DB: 지금 내용을 첫 버전으로 삼습니다.
+    mongo.db.catalog_versions.update_one(
+        {"_id": VERSION_ID}, {"$setOnInsert": {"v": uuid.uuid4().hex}}, upsert=True
+    )
+    return mongo.db.catalog_versions.find_one({"_id": VERSION_ID}, {"v": 1})["v"]
+
+
+class CatalogSnapshot:
+    """한 버전의 카탈로그. 만든 뒤에는 바꾸지 않으며, 밖으로 내보낼 때는 사본을 줍니다."""
+
+    def __init__(self, version, devices):
+        self.version = version
+        by_category, by_type = {}, {}
+        for device in devices:
+            by_category.setdefault(device.get("category"), []).append(device["_id"])
+            by_type.setdefault(device.get("type"), []).append(device["_id"])
+        self.ids = tuple(device["_id"] for device in devices)
+        self.by_id = MappingProxyType({device["_id"]: device for device in devices})
+        self.by_category = MappingProxyType({key: tuple(ids) for key, ids in by_category.items()})
+        self.by_type = MappingProxyType({key: tuple(ids) for key, ids in by_type.items()})
+        self.categories = tuple(sorted(category for category in by_category if category is not None))
+        # 마스터 목록 API 응답 본문
+        self.master_devices_json = dumps_bytes({"status": "success", "master_devices": devices})
+        self.categories_json = dumps_bytes({"status": "success", "categories": list(self.categories)})
+
+    def get(self, master_device_id):
+        device = self.by_id.get(master_device_id)
+        return copy.deepcopy(device) if device is not None else None
+
+    def devices(self, ids=None):
+        return [copy.deepcopy(self.by_id[device_id]) for device_id in (self.ids if ids is None else ids)]
+
+
+class MasterCatalog:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._snapshot = None
+        self._checked_at = 0.0
+        self.stats = {"loads": 0, "version_checks": 0}
+
+    def load(self, version=None):
+        version = version or _current_version()
+        devices = list(mongo.db.LG_devices.find({}).sort("_id", 1))
+        snapshot = CatalogSnapshot(version, devices)
+        with self._lock:
+            self._snapshot = snapshot
+            self._checked_at = time.monotonic()
+        self.stats["loads"] += 1
+        print(f"[MASTER CATALOG] 마스터 가전 {len(devices)}개 로드 (버전 {version[:8]})")
+        return snapshot
+
+    def snapshot(self):
+        """현재 카탈로그. 확인 주기가 지났으면 버전만 읽어 보고 바뀌었을 때만 다시 로드합니다."""
+        snapshot = self._snapshot
+        if snapshot is None:
+            return self.load()
+        if time.monotonic() - self._checked_at < Config.CATALOG_VERSION_CHECK_SEC:
+            return snapshot
+        self._checked_at = time.monotonic()
+        self.stats["version_checks"] += 1
+        version = _current_version()
+        if version != snapshot.version:
+            return self.load(version)
+        return snapshot
+
+    def get(self, master_device_id):
+        return self.snapshot().get(master_device_id)
+
+
+catalog = MasterCatalog()
+
+
+if __name__ == "__main__":
+    from app import create_app
+
+    app = create_app()
+    with app.app_context():
+        if len(sys.argv) > 1 and sys.argv[1] == "bump":
+            print(f"[MASTER CATALOG] 새 버전: {bump_version()}")
+        else:
+            snapshot = catalog.load()
+            print(f"[MASTER CATALOG] 카테고리 {len(snapshot.categories)}개, 종류 {len(snapshot.by_type)}개")
@@ -1,7 +1,7 @@
 from flask import Blueprint, request, jsonify
-from bson.json_util import dumps
 from flask_jwt_extended import jwt_required, current_user
 from .media_service import MediaService
+from pagination import parse_page_args, NEXT_CURSOR_HEADER
 
 media_bp = Blueprint('media', __name__, url_prefix='/api/media')
 media_service = MediaService()
@@ -10,14 +10,16 @@ media_service = MediaService()
 @media_bp.route('/', methods=['GET'])
 @jwt_required()
 def get_all_user_media():
-    """현재 로그인된 사용자의 모든 미디어를 가져옵니다."""
+    """현재 로그인된 사용자의 미디어를 최신순으로 가져옵니다. (limit/cursor 를 주면 limit 개씩, 다음 페이지 커서는 X-Next-Cursor 헤더)"""
     try:
-        user_media = media_service.get_all_media(current_user['_id'])
-        media_list = list(user_media)  
-        for item in media_list:
-            item["_id"] = str(item["_id"])
-            item["user_id"] = str(item["user_id"])
-        return jsonify(media_list)
+        limit, cursor = parse_page_args(request.args)
+        media_list, next_cursor = media_service.get_all_media(current_user['_id'], limit, cursor)
+        response = jsonify(media_list)
+        if next_cursor:
+            response.headers[NEXT_CURSOR_HEADER] = next_cursor
+        return response
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
@@ -30,10 +32,7 @@ def get_single_media_item(media_id):
         media_item = media_service.get_single_media(media_id, current_user['_id'])
         if not media_item:
             return jsonify({"error": "Media not found or you don't have permission"}), 404
-        
-        media_item["_id"] = str(media_item["_id"])
-        media_item["user_id"] = str(media_item["user_id"])
-        return jsonify(media_item)  
+        return jsonify(media_item)
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
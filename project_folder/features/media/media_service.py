@@ -1,23 +1,26 @@
-from extensions import mongo
+from extensions import mongo, clients
 from bson.objectid import ObjectId
-from google.cloud import storage
 from config import Config
+from pagination import paginate
 import datetime
 
+def list_filter(user_id):
+    return {'user_id': ObjectId(user_id), 'status': 'completed'}
+
 class MediaService:
-    def __init__(self):
+    @property
+    def bucket(self):
+        """프로세스 공용 GCS 클라이언트의 버킷 (extensions.clients 에서 재사용). 초기화에 실패하면 None."""
         try:
-            self.storage_client = storage.Client() 
-            self.bucket = self.storage_client.bucket(Config.GCS_BUCKET_NAME)
-            
+            return clients.bucket()
         except Exception as e:
             print(f"WARNING: GCS Client 초기화 실패. {e}")
             print("cloud.json 파일 경로와 .env 설정을 확인하세요.")
-            self.storage_client = None
-            self.bucket = None
+            return None
 
-    def get_all_media(self, user_id):
-        return list(mongo.db.media.find({'user_id': ObjectId(user_id), 'status': 'completed'}))
+    def get_all_media(self, user_id, limit, cursor=None):
+        """(미디어 목록, 다음 페이지 커서) 를 최신순으로 반환합니다."""
+        return paginate(mongo.db.media, list_filter(user_id), limit, cursor)
 
     def get_single_media(self, media_id, user_id):
         return mongo.db.media.find_one({"_id": ObjectId(media_id), 'user_id': ObjectId(user_id), 'status': 'completed'})
@@ -1,4 +1,6 @@
 from extensions import mongo
+from features.lg_appliance.device_cache import device_cache
+from features.lg_appliance import device_telemetry
 from bson.objectid import ObjectId
 import datetime
 import logging
@@ -17,6 +19,23 @@ QUEST_TYPE_WEEKLY = "weekly"
 GOAL_TYPE_COUNT = "count"
 GOAL_TYPE_DURATION_HOURS = "duration_hours"
 
+# Query filters (also used by the query-plan check in indexes.py)
+def weekly_quests_filter(start_of_week):
+    return {"type": QUEST_TYPE_WEEKLY, "start_date": start_of_week}
+
+def count_quests_filter(related_appliance, start_of_week):
+    return {"related_appliance": related_appliance, "type": QUEST_TYPE_WEEKLY,
+            "start_date": start_of_week, "goal_type": GOAL_TYPE_COUNT}
+
+def user_quest_filter(user_object_id, quest_id):
+    return {"user_id": user_object_id, "quest_id": quest_id}
+
+def stale_user_quests_filter(user_object_id, start_of_week):
+    return {"user_id": user_object_id, "assigned_date": {"$lt": start_of_week}}
+
+def devices_of_type_filter(user_id, device_type):
+    return {"userId": user_id, "type": device_type}
+
 class QuestsService:
     def __init__(self):
         self.quests = mongo.db.quests
@@ -38,7 +57,7 @@ class QuestsService:
             raise ValueError("Quest not found")
         
         # 2. 사용자 퀘스트 진행 상태 조회 및 확인
-        user_quest = self.user_quests.find_one({"user_id": user_object_id, "quest_id": ObjectId(quest_id)})
+        user_quest = self.user_quests.find_one(user_quest_filter(user_object_id, ObjectId(quest_id)))
         
         if not user_quest:
             raise ValueError("User quest record not found")
@@ -65,14 +84,14 @@ class QuestsService:
         start_of_week = start_of_week.replace(hour=0, minute=0, second=0, microsecond=0)
         logging.info(f"Calculated start_of_week: {start_of_week!r}")
 
-        weekly_quests = list(self.quests.find({"type": QUEST_TYPE_WEEKLY, "start_date": start_of_week}))
+        weekly_quests = list(self.quests.find(weekly_quests_filter(start_of_week)))
         logging.info(f"Found {len(weekly_quests)} weekly quests for start_of_week {start_of_week!r}")
         for quest in weekly_quests:
             logging.info(f"  Quest ID: {quest.get('_id')}, Stored Start Date: {quest.get('start_date')!r}")
 
         if len(weekly_quests) != 10:
             logging.info(f"Expected 10 weekly quests but found {len(weekly_quests)}. Re-initializing weekly quests.")
-            self.quests.delete_many({"type": QUEST_TYPE_WEEKLY, "start_date": start_of_week})
+            self.quests.delete_many(weekly_quests_filter(start_of_week))
             new_quests = [
                 {"title": "세탁기: 주 2회 돌리기", "description": "일주일 동안 LG 세탁기를 2번 이상 사용하세요.", "reward": 100, "type": QUEST_TYPE_WEEKLY, "goal_type": GOAL_TYPE_COUNT, "goal": 2, "related_appliance": "Washing Machine", "start_date": start_of_week},
                 {"title": "스타일러: 주 3회 돌리기", "description": "일주일 동안 LG 스타일러를 3번 이상 사용하세요.", "reward": 100, "type": QUEST_TYPE_WEEKLY, "goal_type": GOAL_TYPE_COUNT, "goal": 3, "related_appliance": "Styler", "start_date": start_of_week},
@@ -97,17 +116,27 @@ class QuestsService:
         start_of_week = now - datetime.timedelta(days=now.weekday())
         start_of_week = start_of_week.replace(hour=0, minute=0, second=0, microsecond=0)
 
-        self.user_quests.delete_many({
-            "user_id": user_id,
-            "assigned_date": {"$lt": start_of_week}
-        })
+        self.user_quests.delete_many(stale_user_quests_filter(user_id, start_of_week))
 
-        mongo.db.user_LG_devices.update_many(
+        result = mongo.db.user_LG_devices.update_many(
             {"userId": str(user_id)},
             {"$set": {"weekly_duration_sec": 0}}
         )
+        if result.modified_count:
+            device_cache.invalidate(str(user_id))
         logging.info(f"Cleaned up old quests and reset weekly duration for user {user_id}")
 
+    def _weekly_duration_sec(self, user_id, device_type):
+        """
+        이번 주 해당 종류 가전의 사용 시간(초). 주별 사용량 집계와 가전 문서의 weekly_duration_sec 합계 중 큰 값입니다.
+        (집계를 쓰기 시작한 주에는 그 전의 사용 시간이 가전 문서에만 있으므로 집계만 보면 진행도가 줄어듭니다.)
+        """
+        user_devices_of_type = mongo.db.user_LG_devices.find(
+            devices_of_type_filter(user_id, device_type), {"weekly_duration_sec": 1}
+        )
+        legacy_duration = sum(d.get("weekly_duration_sec", 0) for d in user_devices_of_type)
+        return max(device_telemetry.weekly_duration_sec(user_id, device_type) or 0, legacy_duration)
+
     def get_user_weekly_quests(self, user_id):
         """Gets the weekly quests for a specific user, creating user-quest associations if they don't exist."""
         user_object_id = ObjectId(user_id)
@@ -126,7 +155,7 @@ class QuestsService:
 
         result_quests = []
         for quest in filtered_weekly_quests:
-            user_quest = self.user_quests.find_one({"user_id": user_object_id, "quest_id": quest['_id']})
+            user_quest = self.user_quests.find_one(user_quest_filter(user_object_id, quest['_id']))
 
             if not user_quest:
                 user_quest = {
@@ -139,8 +168,7 @@ class QuestsService:
                 reverse_appliance_map = {v: k for k, v in self.appliance_type_map.items()}
                 device_type = reverse_appliance_map.get(quest["related_appliance"])
                 if device_type:
-                    user_devices_of_type = mongo.db.user_LG_devices.find({"userId": user_id, "type": device_type})
-                    total_duration_sec = sum(d.get("weekly_duration_sec", 0) for d in user_devices_of_type)
+                    total_duration_sec = self._weekly_duration_sec(user_id, device_type)
                     progress_hours = total_duration_sec / 3600
                     
                     user_quest['progress'] = min(progress_hours, quest['goal'])
@@ -161,7 +189,7 @@ class QuestsService:
     def update_quest_progress(self, user_id, user_defined_device_name):
         """Updates a user's count-based quest progress for a given device."""
         user_object_id = ObjectId(user_id)
-        device = mongo.db.user_LG_devices.find_one({"_id": user_defined_device_name, "userId": user_id})
+        device = mongo.db.user_LG_devices.find_one({"userId": user_id, "name": user_defined_device_name})
         if not device: return
 
         device_type = device.get("type")
@@ -174,15 +202,10 @@ class QuestsService:
         start_of_week = now - datetime.timedelta(days=now.weekday())
         start_of_week = start_of_week.replace(hour=0, minute=0, second=0, microsecond=0)
         
-        quests_for_device = self.quests.find({
-            "related_appliance": related_appliance_name, 
-            "type": QUEST_TYPE_WEEKLY, 
-            "start_date": start_of_week,
-            "goal_type": GOAL_TYPE_COUNT 
-        })
+        quests_for_device = self.quests.find(count_quests_filter(related_appliance_name, start_of_week))
 
         for quest in quests_for_device:
-            user_quest = self.user_quests.find_one({"user_id": user_object_id, "quest_id": quest['_id']})
+            user_quest = self.user_quests.find_one(user_quest_filter(user_object_id, quest['_id']))
             if user_quest and user_quest['status'] == 'in_progress':
                 new_progress = user_quest['progress'] + 1
                 update_data = {"progress": new_progress}
@@ -196,25 +219,48 @@ class QuestsService:
 
     def update_all_user_quests_progress(self, user_id, device_name):
         """Updates progress for all active quests related to a given device, for both count and duration types."""
+        self.update_quests_progress_for_devices(user_id, [device_name])
+
+    def update_quests_progress_for_devices(self, user_id, device_names):
+        """
+        Updates quest progress once for several devices used together (batch control, auto-completed cycles).
+        Count quests advance by one per device; duration quests are recomputed once per appliance type.
+        """
         user_object_id = ObjectId(user_id)
         
         now = datetime.datetime.now(datetime.timezone.utc)
         start_of_week = now - datetime.timedelta(days=now.weekday())
         start_of_week = start_of_week.replace(hour=0, minute=0, second=0, microsecond=0)
 
-        quests_for_device = self.quests.find({
-            "related_appliance": self.appliance_type_map.get(mongo.db.user_LG_devices.find_one({"_id": device_name, "userId": user_id}).get("type")),
+        devices = mongo.db.user_LG_devices.find({"userId": user_id, "name": {"$in": list(device_names)}}, {"type": 1})
+        uses_per_appliance = {}
+        for device in devices:
+            appliance = self.appliance_type_map.get(device.get("type"))
+            if appliance:
+                uses_per_appliance[appliance] = uses_per_appliance.get(appliance, 0) + 1
+        if not uses_per_appliance:
+            return
+
+        quests_for_devices = list(self.quests.find({
+            "related_appliance": {"$in": list(uses_per_appliance)},
             "type": QUEST_TYPE_WEEKLY,
             "start_date": start_of_week
-        })
+        }))
+        user_quests = {
+            user_quest["quest_id"]: user_quest
+            for user_quest in self.user_quests.find({
+                "user_id": user_object_id, "quest_id": {"$in": [quest["_id"] for quest in quests_for_devices]}
+            })
+        }
+        reverse_appliance_map = {v: k for k, v in self.appliance_type_map.items()}
 
-        for quest in quests_for_device:
-            user_quest = self.user_quests.find_one({"user_id": user_object_id, "quest_id": quest['_id']})
+        for quest in quests_for_devices:
+            user_quest = user_quests.get(quest['_id'])
             if not user_quest or user_quest['status'] != 'in_progress':
                 continue 
 
             if quest.get("goal_type") == GOAL_TYPE_COUNT:
-                new_progress = user_quest['progress'] + 1
+                new_progress = user_quest['progress'] + uses_per_appliance[quest["related_appliance"]]
                 update_data = {"progress": new_progress}
                 if new_progress >= quest['goal']:
                     update_data["status"] = "completed"
@@ -224,11 +270,9 @@ class QuestsService:
                 logging.info(f"User {user_id} progressed in count-based quest: {quest['title']}")
 
             elif quest.get("goal_type") == GOAL_TYPE_DURATION_HOURS:
-                reverse_appliance_map = {v: k for k, v in self.appliance_type_map.items()}
                 device_type = reverse_appliance_map.get(quest["related_appliance"])
                 if device_type:
-                    user_devices_of_type = mongo.db.user_LG_devices.find({"userId": user_id, "type": device_type})
-                    total_duration_sec = sum(d.get("weekly_duration_sec", 0) for d in user_devices_of_type)
+                    total_duration_sec = self._weekly_duration_sec(user_id, device_type)
                     progress_hours = total_duration_sec / 3600
                     
                     new_progress = min(progress_hours, quest['goal'])
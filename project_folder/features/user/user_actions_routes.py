@@ -1,5 +1,4 @@
 from flask import Blueprint, request, jsonify
-from bson.json_util import dumps
 from .user_service import UserService 
 from flask_jwt_extended import jwt_required 
 
@@ -15,7 +14,8 @@ def purchase_item_route(user_id):
         return jsonify({"error": "item_id is required"}), 400
     try:
         updated_user = user_service.purchase_item(user_id, item_id)
-        return jsonify({"status": "success", "user": dumps(updated_user)}), 200
+        updated_user.pop('password', None)
+        return jsonify({"status": "success", "user": updated_user}), 200
     except ValueError as e:
         return jsonify({"error": str(e)}), 400
     except Exception as e:
@@ -31,7 +31,8 @@ def equip_item_route(user_id):
         return jsonify({"error": "item_id is required"}), 400
     try:
         updated_user = user_service.equip_item(user_id, item_id)
-        return jsonify({"status": "success", "user": dumps(updated_user)}), 200
+        updated_user.pop('password', None)
+        return jsonify({"status": "success", "user": updated_user}), 200
     except ValueError as e:
         return jsonify({"error": str(e)}), 400
     except Exception as e:
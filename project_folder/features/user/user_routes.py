@@ -1,5 +1,4 @@
 from flask import Blueprint, request, jsonify
-from bson.json_util import dumps
 from .user_service import UserService 
 from flask_jwt_extended import jwt_required, current_user, get_jwt_identity, create_access_token 
 
@@ -56,7 +55,7 @@ def login():
 def get_users():
     try:
         users = user_service.get_all_users()
-        return dumps(users)
+        return jsonify(users)
     except Exception as e:
         return jsonify({"error": "An unexpected error occurred"}), 500
 
@@ -66,7 +65,7 @@ def get_user(id):
         user = user_service.get_user_by_id(id)
         if not user:
             return jsonify({"error": "User not found"}), 404
-        return dumps(user)
+        return jsonify(user)
     except Exception as e:
         return jsonify({"error": "An unexpected error occurred"}), 500
 
@@ -8,12 +8,15 @@ from config import Config # For JWT_SECRET_KEY
 from features.lg_appliance import lg_appliance_service # Import lg_appliance_service
 from features.shop import shop_service # New: Import shop_service
 
+def email_filter(email):
+    return {"email": email}
+
 class UserService:
     def register_user(self, email, password):
         if not email or not password:
             raise ValueError("Email and password are required")
 
-        if mongo.db.users.find_one({"email": email}):
+        if mongo.db.users.find_one(email_filter(email)):
             raise ValueError("Email already exists")
 
         hashed_password = generate_password_hash(password)
@@ -30,7 +33,7 @@ class UserService:
         if not email or not password:
             raise ValueError("Email and password are required")
 
-        user = mongo.db.users.find_one({"email": email})
+        user = mongo.db.users.find_one(email_filter(email))
         pw_hash = user.get('password') if user else None
 
         if pw_hash and check_password_hash(pw_hash, password):
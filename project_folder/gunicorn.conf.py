@@ -0,0 +1,27 @@
+# gunicorn -c gunicorn.conf.py "app:create_app()"
+import os
+
+bind = os.getenv("GUNICORN_BIND", "0.0.0.0:5001")
+workers = int(os.getenv("GUNICORN_WORKERS", "2"))
+threads = int(os.getenv("GUNICORN_THREADS", "8"))
+# SSE 구독(/api/lg-devices/events)은 연결이 열려 있는 동안 스레드 하나를 잡습니다.
+# 워커당 동시 구독은 DEVICE_EVENTS_MAX_SUBSCRIBERS(기본 threads // 2)까지만 받고 넘으면 503 을 돌려주므로,
+# 기본 설정(2 workers x 8 threads)에서는 전체 8개 연결까지 SSE 를 받고 나머지 8개 스레드는 REST API 에 남습니다.
+# 동시 구독이 더 필요하면 GUNICORN_THREADS 와 DEVICE_EVENTS_MAX_SUBSCRIBERS 를 함께 늘리세요.
+# (쉬는 구독 스레드는 CPU 를 쓰지 않고 스택 메모리만 차지합니다.)
+worker_class = os.getenv("GUNICORN_WORKER_CLASS", "gthread")
+preload_app = True
+
+
+def post_fork(server, worker):
+    # preload 된 마스터의 gRPC/TLS 연결은 자식에서 쓸 수 없으므로, 워커마다 외부 클라이언트를 새로 만들어 둡니다.
+    from extensions import clients
+    clients.warm()
+
+    # 일기 생성 작업 스레드는 fork 후 워커 안에서 시작해야 합니다. (DIARY_JOB_WORKERS=0 이면 별도 프로세스에서 실행)
+    from features.ai_coach import diary_jobs
+    diary_jobs.start_workers()
+
+    # 사이클 자동 완료 스케줄러도 워커마다 띄우지만, 임대를 가진 한 곳에서만 실행됩니다.
+    from features.lg_appliance import device_cycles
+    device_cycles.start_scheduler()
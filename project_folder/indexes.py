@@ -0,0 +1,202 @@
+# indexes.py
+"""
+MongoDB 인덱스 선언 목록과 쿼리 플랜 점검.
+
+모든 컬렉션의 인덱스를 이곳 INDEXES 에 모아 두고 create_app 에서 ensure_indexes 로 적용합니다.
+(이미 있으면 아무 일도 하지 않으므로 매번 실행해도 안전합니다.)
+_query_plans 는 서비스 모듈의 조건/정렬 함수로 자주 쓰는 쿼리를 만들고, check_query_plans 는 각각을 explain 해서
+COLLSCAN 으로 떨어지는 쿼리를 찾아 냅니다.
+
+python indexes.py apply   # 인덱스 적용
+python indexes.py check   # 인덱스 적용 후 쿼리 플랜 점검 (COLLSCAN 이 있으면 종료 코드 1)
+같은 점검을 tests/test_query_plans.py 가 pytest 로 돌립니다.
+"""
+import datetime
+import sys
+
+from bson.objectid import ObjectId
+from pymongo import ASCENDING, DESCENDING, IndexModel
+from pymongo.errors import OperationFailure
+
+INDEXES = {
+    "users": [
+        IndexModel([("email", ASCENDING)], name="email_unique", unique=True),
+    ],
+    "diaries": [
+        # 목록/갤러리/달력 (user_id, status 일치 + created_at, _id 역순 keyset)
+        IndexModel([("user_id", ASCENDING), ("status", ASCENDING), ("created_at", DESCENDING), ("_id", DESCENDING)],
+                   name="user_status_created"),
+        # 전체 내보내기, created_at 으로 일기 찾기 (상태 무관)
+        IndexModel([("user_id", ASCENDING), ("created_at", ASCENDING), ("_id", ASCENDING)], name="user_created"),
+    ],
+    "diary_messages": [
+        IndexModel([("diary_id", ASCENDING), ("count", ASCENDING)], name="open_bucket"),
+        IndexModel([("diary_id", ASCENDING), ("first_at", ASCENDING), ("_id", ASCENDING)], name="bucket_order"),
+    ],
+    "diary_jobs": [
+        IndexModel([("diary_id", ASCENDING)], name="one_active_job_per_diary", unique=True,
+                   partialFilterExpression={"active": True}),
+        IndexModel([("status", ASCENDING), ("run_at", ASCENDING)], name="job_claim"),
+    ],
+    "diary_search_postings": [
+        IndexModel([("user_id", ASCENDING), ("term", ASCENDING), ("created_at", DESCENDING)], name="term_by_date"),
+        IndexModel([("user_id", ASCENDING), ("term", ASCENDING), ("diary_id", ASCENDING)], name="term_by_diary"),
+        IndexModel([("diary_id", ASCENDING)], name="postings_by_diary"),
+    ],
+    "media": [
+        IndexModel([("user_id", ASCENDING), ("status", ASCENDING), ("created_at", DESCENDING), ("_id", DESCENDING)],
+                   name="user_status_created"),
+        IndexModel([("user_id", ASCENDING), ("url", ASCENDING)], name="user_url"),
+    ],
+    "user_LG_devices": [
+        # 가전 이름은 사용자마다 유일합니다. (다른 사용자와는 같은 이름을 써도 됨)
+        IndexModel([("userId", ASCENDING), ("name", ASCENDING)], name="user_device_name", unique=True),
+        IndexModel([("userId", ASCENDING), ("type", ASCENDING)], name="user_devices_by_type"),
+        # 진행 중인 사이클만 cycle_due_at 을 가지므로 sparse 로 작게 유지합니다.
+        IndexModel([("cycle_due_at", ASCENDING)], name="cycle_due", sparse=True),
+    ],
+    "device_telemetry": [
+        IndexModel([("user_id", ASCENDING), ("device", ASCENDING), ("day", ASCENDING)], name="device_day", unique=True),
+    ],
+    "device_usage_rollups": [
+        IndexModel([("user_id", ASCENDING), ("period", ASCENDING), ("start", ASCENDING), ("device_type", ASCENDING)],
+                   name="user_period_start", unique=True),
+    ],
+    # capped 컬렉션이라 create_app 에서 device_events.ensure_collection() 이 먼저 만듭니다.
+    "device_events": [
+        IndexModel([("user_id", ASCENDING), ("seq", ASCENDING)], name="user_seq"),
+    ],
+    "LG_devices": [
+        IndexModel([("category", ASCENDING)], name="category"),
+    ],
+    "quests": [
+        IndexModel([("type", ASCENDING), ("start_date", ASCENDING), ("related_appliance", ASCENDING)],
+                   name="type_week_appliance"),
+    ],
+    "user_quests": [
+        IndexModel([("user_id", ASCENDING), ("quest_id", ASCENDING)], name="user_quest"),
+        IndexModel([("user_id", ASCENDING), ("assigned_date", ASCENDING)], name="user_assigned"),
+    ],
+}
+
+
+def ensure_indexes(db):
+    """INDEXES 를 적용합니다. 기존 데이터 때문에 만들 수 없는 인덱스는 건너뛰고 이름을 반환합니다."""
+    failed = []
+    for collection, models in INDEXES.items():
+        for model in models:
+            try:
+                db[collection].create_indexes([model])
+            except OperationFailure as e:
+                name = model.document["name"]
+                print(f"[INDEXES] {collection}.{name} 생성 실패: {e}")
+                failed.append(f"{collection}.{name}")
+    return failed
+
+
+def _query_plans():
+    """
+    (이름, 컬렉션, 필터, 정렬) - 서비스 코드가 실제로 쓰는 조건/정렬 함수로 만들므로
+    서비스 쿼리가 바뀌면 점검 대상도 함께 바뀝니다.
+    """
+    from pagination import SORT, SORT_ASCENDING, page_filter
+    from features.user import user_service
+    from features.diaries import diaries_service, search_index
+    from features.media import media_service
+    from features.ai_coach import conversation_store, diary_jobs
+    from features.lg_appliance import lg_appliance_service, device_cycles, device_telemetry, device_events
+    from features.quests import quests_service
+
+    user_oid, diary_id, quest_id = ObjectId(), ObjectId(), ObjectId()
+    user_id = str(user_oid)
+    now = datetime.datetime.now(datetime.timezone.utc)
+    cursor = (now, diary_id)
+    day_range = {"$gte": now - datetime.timedelta(days=1), "$lt": now}
+    return [
+        ("users.by_email", "users", user_service.email_filter("user@example.com"), None),
+        ("diaries.list", "diaries", diaries_service.list_filter(user_oid), SORT),
+        ("diaries.list_next_page", "diaries", page_filter(diaries_service.list_filter(user_oid), cursor), SORT),
+        ("diaries.list_by_date", "diaries", diaries_service.list_filter(user_oid, now.strftime("%Y-%m-%d")), SORT),
+        ("diaries.gallery", "diaries", diaries_service.gallery_filter(user_oid), SORT),
+        ("diaries.by_created_at", "diaries", diaries_service.created_at_filter(user_oid, now), None),
+        ("diaries.export", "diaries", diaries_service.export_filter(user_oid), SORT_ASCENDING),
+        ("diaries.export_resume", "diaries", diaries_service.export_filter(user_oid, cursor), SORT_ASCENDING),
+        ("diaries.photo_media", "media", diaries_service.photo_media_filter(user_oid, ["https://example.com/a.jpg"]), None),
+        ("diary_messages.open_bucket", "diary_messages", conversation_store.open_bucket_filter(diary_id), None),
+        ("diary_messages.transcript", "diary_messages", conversation_store.transcript_filter(diary_id),
+         conversation_store.BUCKET_ORDER),
+        ("diary_jobs.active", "diary_jobs", diary_jobs.active_job_filter(diary_id), None),
+        ("diary_jobs.claim", "diary_jobs", diary_jobs.claimable_filter(now), diary_jobs.CLAIM_ORDER),
+        ("search.term", "diary_search_postings", search_index.term_filter(user_oid, "여행"), None),
+        ("search.term_in_range", "diary_search_postings", search_index.term_filter(user_oid, "여행", day_range), None),
+        ("search.term_in_candidates", "diary_search_postings",
+         search_index.term_filter(user_oid, "여행", candidates=[diary_id]), None),
+        ("search.postings_of_diary", "diary_search_postings", search_index.diary_postings_filter(diary_id), None),
+        ("media.list", "media", media_service.list_filter(user_oid), SORT),
+        ("devices.all", "user_LG_devices", lg_appliance_service.user_devices_filter(user_id), None),
+        ("devices.one", "user_LG_devices", lg_appliance_service.user_device_filter(user_id, "거실 에어컨"), None),
+        ("devices.named", "user_LG_devices",
+         lg_appliance_service.user_devices_named_filter(user_id, ["거실 에어컨", "거실 TV"]), None),
+        ("devices.by_type", "user_LG_devices", quests_service.devices_of_type_filter(user_id, "washer"), None),
+        ("devices.cycles_due", "user_LG_devices", device_cycles.due_filter(now), device_cycles.DUE_ORDER),
+        ("telemetry.device_history", "device_telemetry",
+         device_telemetry.history_filter(user_id, "거실 에어컨", "2025-01-01", "2025-01-07"), [("day", 1)]),
+        ("rollups.series", "device_usage_rollups",
+         device_telemetry.series_filter(user_id, device_telemetry.PERIOD_DAY, "2025-01-01", "2025-01-07"),
+         device_telemetry.SERIES_ORDER),
+        ("rollups.weekly_duration", "device_usage_rollups",
+         device_telemetry.weekly_filter(user_id, "air_purifier", now), None),
+        ("device_events.since", "device_events", device_events.since_filter(user_id, 0), [("seq", 1)]),
+        ("quests.weekly", "quests", quests_service.weekly_quests_filter(now), None),
+        ("quests.weekly_for_appliance", "quests", quests_service.count_quests_filter("Washing Machine", now), None),
+        ("user_quests.one", "user_quests", quests_service.user_quest_filter(user_oid, quest_id), None),
+        ("user_quests.cleanup", "user_quests", quests_service.stale_user_quests_filter(user_oid, now), None),
+    ]
+
+
+def _stages(plan):
+    yield plan.get("stage")
+    for child_key in ("inputStage", "queryPlan"):
+        if child_key in plan:
+            yield from _stages(plan[child_key])
+    for child in plan.get("inputStages", []):
+        yield from _stages(child)
+
+
+def plan_stages(db, collection, query_filter, sort=None):
+    """쿼리를 explain 해서 winning plan 의 단계 이름을 위에서부터 반환합니다."""
+    cursor = db[collection].find(query_filter)
+    if sort:
+        cursor = cursor.sort(sort)
+    winning_plan = cursor.explain()["queryPlanner"]["winningPlan"]
+    return [stage for stage in _stages(winning_plan) if stage]
+
+
+def check_query_plans(db):
+    """각 쿼리의 winning plan 을 확인해 COLLSCAN 을 쓰는 쿼리 이름과 플랜 단계 목록을 반환합니다."""
+    failures = []
+    for name, collection, query_filter, sort in _query_plans():
+        stages = plan_stages(db, collection, query_filter, sort)
+        status = "COLLSCAN" if "COLLSCAN" in stages else "ok"
+        print(f"[INDEXES] {status:8} {name}: {' <- '.join(stages)}")
+        if status != "ok":
+            failures.append((name, stages))
+    return failures
+
+
+if __name__ == "__main__":
+    from app import create_app
+    from extensions import mongo
+
+    command = sys.argv[1] if len(sys.argv) > 1 else "check"
+    app = create_app()  # create_app 에서 ensure_indexes 가 한 번 실행됩니다.
+    with app.app_context():
+        if command == "apply":
+            sys.exit(1 if ensure_indexes(mongo.db) else 0)
+        elif command == "check":
+            failures = check_query_plans(mongo.db)
+            print(f"[INDEXES] {len(failures)}개 쿼리가 COLLSCAN 을 사용합니다." if failures else "[INDEXES] 모든 쿼리가 인덱스를 사용합니다.")
+            sys.exit(1 if failures else 0)
+        else:
+            print("사용법: python indexes.py [apply|check]")
+            sys.exit(2)
@@ -0,0 +1,161 @@
+# json_provider.py
+"""
+BSON 타입을 바로 직렬화하는 Flask JSON provider.
+
+ObjectId 는 문자열로, datetime 은 APP_TIMEZONE(KST) ISO 문자열로, Decimal128 은 숫자로 바꿔
+중첩 구조 전체를 한 번에 직렬화합니다. orjson 이 설치되어 있으면 orjson 을, 없으면 표준 json 을 씁니다.
+라우트에서 str(_id) 루프나 loads(dumps(...)) 변환을 할 필요가 없습니다.
+SSE 응답(ai_coach, lg_appliance)과 내보내기 스트림도 dumps_bytes 로 같은 형식을 씁니다.
+
+datetime 은 예전처럼 라우트마다 다르던 형식(UTC isoformat, HTTP date, 가전은 KST isoformat) 대신
+모두 오프셋이 붙은 KST ISO 문자열입니다. 프런트엔드는 날짜를 new Date()/Date.parse 로만 읽으므로 같은 시각으로 해석됩니다.
+
+벤치마크: python json_provider.py [문서 수]
+"""
+import base64
+import datetime
+import json
+import uuid
+from decimal import Decimal
+from zoneinfo import ZoneInfo
+
+from bson import Binary, Decimal128, ObjectId, Timestamp
+from flask.json.provider import JSONProvider
+
+from config import Config
+
+try:
+    import orjson
+except ImportError:  # 선택 의존성
+    orjson = None
+
+_TZ = ZoneInfo(Config.APP_TIMEZONE)
+
+
+def _to_local_iso(value):
+    # DB 에 naive 로 저장된 값은 UTC 로 간주합니다.
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=datetime.timezone.utc)
+    return value.astimezone(_TZ).isoformat()
+
+
+def bson_default(obj):
+    """표준 JSON 으로 표현되지 않는 BSON/파이썬 타입 변환"""
+    if isinstance(obj, ObjectId):
+        return str(obj)
+    if isinstance(obj, datetime.datetime):
+        return _to_local_iso(obj)
+    if isinstance(obj, datetime.date):
+        return obj.isoformat()
+    if isinstance(obj, Decimal128):
+        obj = obj.to_decimal()
+    if isinstance(obj, Decimal):
+        return int(obj) if obj == obj.to_integral_value() else float(obj)
+    if isinstance(obj, Timestamp):
+        return _to_local_iso(obj.as_datetime())
+    if isinstance(obj, (Binary, bytes)):
+        return base64.b64encode(obj).decode()
+    if isinstance(obj, uuid.UUID):
+        return str(obj)
+    if isinstance(obj, (set, frozenset, tuple)):
+        return list(obj)
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+if orjson is not None:
+    _ORJSON_OPTIONS = orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS
+
+    def dumps_bytes(obj):
+        return orjson.dumps(obj, default=bson_default, option=_ORJSON_OPTIONS)
+
+    def _loads(s):
+        return orjson.loads(s)
+else:
+    def dumps_bytes(obj):
+        return json.dumps(obj, default=bson_default, ensure_ascii=False, separators=(",", ":")).encode()
+
+    def _loads(s):
+        return json.loads(s)
+
+
+class BSONJSONProvider(JSONProvider):
+    mimetype = "application/json"
+
+    def dumps(self, obj, **kwargs):
+        if kwargs:
+            kwargs.setdefault("default", bson_default)
+            kwargs.setdefault("ensure_ascii", False)
+            return json.dumps(obj, **kwargs)
+        return dumps_bytes(obj).decode()
+
+    def loads(self, s, **kwargs):
+        if kwargs:
+            return json.loads(s, **kwargs)
+        return _loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(dumps_bytes(obj) + b"\n", mimetype=self.mimetype)
+
+
+def _benchmark(count):
+    """기존 방식(라우트별 변환 + 기본 JSON provider / bson.json_util 왕복)과 비교합니다."""
+    import copy
+    import timeit
+
+    from bson.json_util import dumps as bson_dumps, loads as bson_loads
+    from flask import Flask
+
+    now = datetime.datetime.now(datetime.timezone.utc)
+    docs = [{
+        "_id": ObjectId(),
+        "user_id": ObjectId(),
+        "title": f"오늘의 일기 {i}",
+        "summary_context": "오늘은 친구와 바닷가에 가서 산책을 하고 맛있는 저녁을 먹었다. " * 8,
+        "categories": ["여행", "친구", "바다"],
+        "photos": [{"filename": f"{i}_{n}.jpg", "url": f"https://storage.googleapis.com/b/{i}_{n}.jpg"} for n in range(3)],
+        "status": "completed",
+        "message_count": 12,
+        "created_at": now,
+        "updated_at": now,
+    } for i in range(count)]
+
+    legacy_app = Flask("legacy")
+    app = Flask("bson")
+    app.json = BSONJSONProvider(app)
+
+    def legacy_list():
+        result = []
+        for diary in copy.copy(docs):
+            diary = dict(diary)
+            diary["_id"] = str(diary["_id"])
+            diary["user_id"] = str(diary["user_id"])
+            diary["created_at"] = diary["created_at"].isoformat()
+            diary["updated_at"] = diary["updated_at"].isoformat()
+            result.append(diary)
+        return legacy_app.json.dumps(result)
+
+    def legacy_roundtrip():
+        return legacy_app.json.dumps(bson_loads(bson_dumps(docs)), default=str)
+
+    def provider():
+        return dumps_bytes(docs)
+
+    number = 20
+    with legacy_app.app_context():
+        legacy_list_sec = timeit.timeit(legacy_list, number=number) / number
+        legacy_roundtrip_sec = timeit.timeit(legacy_roundtrip, number=number) / number
+    with app.app_context():
+        provider_sec = timeit.timeit(provider, number=number) / number
+
+    print(f"문서 {count}개, {number}회 평균 (encoder: {'orjson' if orjson else 'json'})")
+    print(f"  라우트 루프 + 기본 provider : {legacy_list_sec * 1000:8.2f} ms")
+    print(f"  json_util 왕복             : {legacy_roundtrip_sec * 1000:8.2f} ms")
+    print(f"  BSONJSONProvider           : {provider_sec * 1000:8.2f} ms "
+          f"(x{legacy_list_sec / provider_sec:.1f}, x{legacy_roundtrip_sec / provider_sec:.1f})")
+
+
+if __name__ == "__main__":
+    import sys
+
+    _benchmark(int(sys.argv[1]) if len(sys.argv) > 1 else 1000)
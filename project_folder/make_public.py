@@ -1,13 +1,12 @@
-from google.cloud import storage
 from pymongo import MongoClient
 from bson.objectid import ObjectId
 from config import Config
+from extensions import clients
 
 client = MongoClient(Config.MONGO_URI)  
 db = client["momentbox"]
 
-storage_client = storage.Client.from_service_account_json(Config.SERVICE_ACCOUNT_FILE)
-bucket = storage_client.bucket(Config.GCS_BUCKET_NAME)
+bucket = clients.bucket()
 
 def make_all_media_public():
     medias = db.media.find({"status": "completed"})
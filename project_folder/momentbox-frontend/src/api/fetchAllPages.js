@@ -0,0 +1,14 @@
+import axiosInstance from "./axiosInstance";
+
+// 목록 API(일기, 갤러리, 사진)는 요청마다 limit 개까지만 보내고 다음 페이지 커서를 X-Next-Cursor 헤더로 알려 줍니다.
+// 커서가 없어질 때까지 따라가며 모든 페이지를 이어 붙여 반환합니다.
+export default async function fetchAllPages(url, params = {}) {
+  const items = [];
+  let cursor = null;
+  do {
+    const response = await axiosInstance.get(url, { params: cursor ? { ...params, cursor } : params });
+    items.push(...(response.data || []));
+    cursor = response.headers["x-next-cursor"];
+  } while (cursor);
+  return items;
+}
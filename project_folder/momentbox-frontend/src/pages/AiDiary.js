@@ -2,6 +2,7 @@ import React, { useState, useEffect, useRef, useCallback } from "react";
 import { useNavigate } from "react-router-dom";
 import styles from "./AiDiary.module.css";
 import axios from "../api/axiosInstance";
+import fetchAllPages from "../api/fetchAllPages";
 
 // 사용 리소스만 유지 (monitor, keyboard, tablet)
 import monitor from "../assets/monitor.png";
@@ -106,8 +107,7 @@ export default function AiDiary() {
 
   const fetchPhotos = useCallback(async () => {
     try {
-      const res = await axios.get("/api/media/");
-      setPhotos(res.data);
+      setPhotos(await fetchAllPages("/api/media/"));
     } catch (err) {
       console.error("사진 목록 불러오기 실패:", err);
     }
@@ -2,6 +2,7 @@ import React, { useState, useEffect, useRef, useMemo } from "react";
 import { useParams, useNavigate } from "react-router-dom";
 import styles from "./AiDiaryEdit.module.css";
 import axios from "../api/axiosInstance";
+import fetchAllPages from "../api/fetchAllPages";
 
 import book1 from "../assets/book1.png";
 import book2 from "../assets/book2.png";
@@ -73,8 +74,7 @@ export default function AiDiaryEdit() {
   useEffect(() => {
     const fetchPhotos = async () => {
       try {
-        const res = await axios.get("/api/media/");
-        setAllAvailablePhotos(res.data || []);
+        setAllAvailablePhotos(await fetchAllPages("/api/media/"));
       } catch (err) {
         console.error("사진 목록 불러오기 실패:", err);
       }
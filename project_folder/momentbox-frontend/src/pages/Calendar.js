@@ -1,7 +1,7 @@
 import React, { useMemo, useState, useEffect } from "react";
 import { useNavigate } from "react-router-dom"; // ★ 추가
 import "./Calendar.css";
-import axios from "../api/axiosInstance";
+import fetchAllPages from "../api/fetchAllPages";
 
 const buildIndex = (byMonth) => {
   const out = [];
@@ -52,8 +52,7 @@ export default function Calendar() {
   useEffect(() => {
     const fetchDiaries = async () => {
       try {
-        const response = await axios.get("/api/diaries/");
-        const diaries = response.data;
+        const diaries = await fetchAllPages("/api/diaries/");
         const events = {};
         diaries.forEach((diary) => {
           const date = new Date(diary.created_at);
@@ -194,9 +194,9 @@ const DeviceManagement = () => {
                 ) : (
                     <ul className="device-list">
                         {devices.map((device) => (
-                            <li key={device._id} className="device-list-item">
-                                <span>{device._id} ({device.model_name} - {device.category})</span>
-                                <button onClick={() => handleDeleteDevice(device._id)} className="delete-button">삭제</button>
+                            <li key={device.name} className="device-list-item">
+                                <span>{device.name} ({device.model_name} - {device.category})</span>
+                                <button onClick={() => handleDeleteDevice(device.name)} className="delete-button">삭제</button>
                             </li>
                         ))}
                     </ul>
@@ -1,5 +1,5 @@
 import React, { useEffect, useState } from "react";
-import axios from "../api/axiosInstance";
+import fetchAllPages from "../api/fetchAllPages";
 import Gallery from "./Gallery";   
 
 export default function GalleryPage() {
@@ -9,8 +9,7 @@ export default function GalleryPage() {
   useEffect(() => {
     const fetchGalleryItems = async () => {
       try {
-        const response = await axios.get("/api/diaries/gallery");
-        const diaries = response.data;
+        const diaries = await fetchAllPages("/api/diaries/gallery");
         
         const formattedItems = diaries.map(diary => {
           if (!diary.photos || diary.photos.length === 0) {
@@ -2,6 +2,7 @@ import React, { useState, useEffect, useRef, useCallback } from 'react';
 import './Main.css';
 import { useNavigate, useLocation } from 'react-router-dom';
 import axiosInstance from '../api/axiosInstance'; // API 인스턴스
+import fetchAllPages from '../api/fetchAllPages';
 
 // 소품 / 기타 이미지
 import calendarPng from '../assets/calendar.png';
@@ -40,9 +41,9 @@ export default function Main() {
   const location = useLocation();
   const fetchPhotos = useCallback(async () => {
     try {
-      const res = await axiosInstance.get("/api/media/");
-      setPhotos(res.data || []); // 받아온 데이터로 상태 업데이트
-      console.log('Photos fetched in Main.js:', res.data); // 디버깅 로그
+      const photos = await fetchAllPages("/api/media/");
+      setPhotos(photos); // 받아온 데이터로 상태 업데이트
+      console.log('Photos fetched in Main.js:', photos); // 디버깅 로그
     } catch (err) {
       console.error("Main.js: 사진 목록 불러오기 실패:", err);
       setPhotos([]); // 오류 발생 시 빈 배열로 설정
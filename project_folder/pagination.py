@@ -0,0 +1,111 @@
+# pagination.py
+"""
+(created_at, _id) 기준 keyset 페이지네이션 공통 함수.
+
+목록 API 는 최신순으로 limit 개(기본 PAGE_DEFAULT_LIMIT, 최대 PAGE_MAX_LIMIT)만 반환하고, 다음 페이지가 있으면
+X-Next-Cursor 헤더로 커서를 알려 줍니다. 클라이언트는 그 값을 ?cursor= 로 다시 보내면 이어서 받을 수 있습니다.
+(프런트엔드는 api/fetchAllPages.js 로 커서를 따라갑니다.)
+관련도 순인 검색 결과는 (점수, created_at, _id) 커서를 씁니다.
+"""
+import base64
+import datetime
+
+from bson.objectid import ObjectId
+from bson.errors import InvalidId
+
+from config import Config
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+SORT = [("created_at", -1), ("_id", -1)]
+SORT_ASCENDING = [("created_at", 1), ("_id", 1)]
+
+
+def parse_page_args(args, decode=None):
+    """
+    요청 인자에서 (limit, cursor) 를 읽습니다. limit 은 기본값/최댓값 안으로 맞춥니다.
+    decode 는 커서 해석 함수입니다. (기본 decode_cursor, 검색은 decode_rank_cursor)
+    """
+    try:
+        limit = int(args.get("limit", Config.PAGE_DEFAULT_LIMIT))
+    except (TypeError, ValueError):
+        raise ValueError("limit must be an integer.")
+    limit = max(1, min(limit, Config.PAGE_MAX_LIMIT))
+    return limit, (decode or decode_cursor)(args.get("cursor"))
+
+
+def _millis(created_at):
+    if created_at.tzinfo is None:
+        created_at = created_at.replace(tzinfo=datetime.timezone.utc)
+    return int(created_at.timestamp() * 1000)
+
+
+def _from_millis(millis):
+    return datetime.datetime.fromtimestamp(int(millis) / 1000, tz=datetime.timezone.utc)
+
+
+def _encode(raw):
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def _decode(token):
+    return base64.urlsafe_b64decode(token + "=" * (-len(token) % 4)).decode()
+
+
+def encode_cursor(doc):
+    return _encode(f"{_millis(doc['created_at'])}:{doc['_id']}")
+
+
+def decode_cursor(token):
+    if not token:
+        return None
+    try:
+        millis, object_id = _decode(token).split(":", 1)
+        return _from_millis(millis), ObjectId(object_id)
+    except (ValueError, InvalidId, UnicodeDecodeError):
+        raise ValueError("Invalid cursor.")
+
+
+def encode_rank_cursor(position):
+    """관련도 순 목록의 커서. position: (점수, created_at, _id)"""
+    score, created_at, object_id = position
+    return _encode(f"{score!r}:{_millis(created_at)}:{object_id}")
+
+
+def decode_rank_cursor(token):
+    if not token:
+        return None
+    try:
+        score, millis, object_id = _decode(token).split(":", 2)
+        return float(score), _from_millis(millis), ObjectId(object_id)
+    except (ValueError, InvalidId, UnicodeDecodeError):
+        raise ValueError("Invalid cursor.")
+
+
+def keyset_filter(cursor, ascending=False):
+    """커서 위치 다음 문서만 고르는 조건 (기본은 더 오래된 쪽, ascending 이면 더 최근 쪽)"""
+    created_at, object_id = cursor
+    op = "$gt" if ascending else "$lt"
+    return {"$or": [
+        {"created_at": {op: created_at}},
+        {"created_at": created_at, "_id": {op: object_id}},
+    ]}
+
+
+def page_filter(query_filter, cursor, ascending=False):
+    """query_filter 에 커서 위치 조건을 더합니다. 커서가 없으면 그대로 반환합니다."""
+    if cursor is None:
+        return query_filter
+    return {"$and": [query_filter, keyset_filter(cursor, ascending)]}
+
+
+def paginate(collection, query_filter, limit, cursor=None, projection=None):
+    """
+    query_filter 에 맞는 문서를 최신순으로 limit 개 읽어 (문서 목록, 다음 커서) 를 반환합니다.
+    다음 페이지가 없으면 다음 커서는 None 입니다.
+    """
+    query_filter = page_filter(query_filter, cursor)
+    docs = list(collection.find(query_filter, projection).sort(SORT).limit(limit + 1))
+    if len(docs) <= limit:
+        return docs, None
+    docs = docs[:limit]
+    return docs, encode_cursor(docs[-1])
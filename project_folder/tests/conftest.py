@@ -0,0 +1,66 @@
+"""
+테스트 공용 fixture.
+
+DB 를 쓰는 테스트는 mongomock(requirements-dev.txt) 으로 띄운 메모리 DB 를 mongo.db 에 붙여 돌립니다.
+실행: project_folder 에서 python -m pytest -q
+"""
+import os
+import sys
+
+import mongomock
+import pytest
+from mongomock.collection import BulkOperationBuilder
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from extensions import clients, mongo  # noqa: E402
+
+
+class _BulkOperationBuilder(BulkOperationBuilder):
+    """mongomock 4.3 은 pymongo 4.14 의 UpdateOne/ReplaceOne 이 넘기는 sort 인자를 받지 못하므로 버립니다."""
+
+    def add_update(self, *args, sort=None, **kwargs):
+        return super().add_update(*args, **kwargs)
+
+    def add_replace(self, *args, sort=None, **kwargs):
+        return super().add_replace(*args, **kwargs)
+
+
+@pytest.fixture
+def db(monkeypatch):
+    """테스트마다 비어 있는 메모리 DB"""
+    monkeypatch.setattr(mongomock.collection, "BulkOperationBuilder", _BulkOperationBuilder)
+    client = mongomock.MongoClient(tz_aware=True)
+    database = client["momentbox_test"]
+    monkeypatch.setattr(mongo, "cx", client, raising=False)
+    monkeypatch.setattr(mongo, "db", database, raising=False)
+    return database
+
+
+@pytest.fixture
+def app(db, monkeypatch):
+    """메모리 DB 에 붙인 앱 (인덱스, 마스터 가전 초기화까지 create_app 그대로)"""
+    def init_app(flask_app, *args, **kwargs):
+        mongo.cx = db.client
+        mongo.db = db
+
+    monkeypatch.setattr(mongo, "init_app", init_app)
+    # 외부 클라이언트(Gemini, GCS, TTS)는 쓰지 않으므로 시작 시 미리 만들지 않습니다. (자격 증명 없이 수 초씩 걸림)
+    monkeypatch.setattr(clients, "warm", lambda: None)
+    from app import create_app
+    flask_app = create_app()
+    flask_app.config["TESTING"] = True
+    return flask_app
+
+
+@pytest.fixture
+def user_id(db):
+    return str(db.users.insert_one({"email": "tester@momentbox.local", "password": "", "points": 0,
+                                    "closet": [], "equipped_items": {}}).inserted_id)
+
+
+@pytest.fixture
+def auth_headers(app, user_id):
+    from flask_jwt_extended import create_access_token
+    with app.app_context():
+        return {"Authorization": f"Bearer {create_access_token(identity=user_id)}"}
@@ -0,0 +1,69 @@
+import datetime
+
+import pytest
+
+from config import Config
+from features.ai_coach import conversation_store
+
+START = datetime.datetime(2025, 3, 1, 9, 0)
+
+
+@pytest.fixture(autouse=True)
+def small_buckets(monkeypatch):
+    monkeypatch.setattr(Config, "DIARY_MESSAGES_PER_BUCKET", 4)
+
+
+def _messages(count, prefix, start=START):
+    return [
+        {"role": "user" if i % 2 == 0 else "ai", "content": f"{prefix} {i}",
+         "created_at": start + datetime.timedelta(minutes=i)}
+        for i in range(count)
+    ]
+
+
+def _contents(messages):
+    return [message["content"] for message in messages]
+
+
+def test_append_fills_buckets_in_order(db):
+    diary_id = db.diaries.insert_one({"message_count": 0}).inserted_id
+    for i in range(5):
+        conversation_store.append_messages(diary_id, _messages(2, f"턴{i}"))
+
+    buckets = list(db.diary_messages.find({"diary_id": diary_id}))
+    assert [bucket["count"] for bucket in buckets] == [4, 4, 2]
+    assert db.diaries.find_one({"_id": diary_id})["message_count"] == 10
+    assert len(conversation_store.load_messages(diary_id)) == 10
+
+
+def test_migrate_embedded_moves_conversations_into_buckets(db):
+    legacy = _messages(10, "예전")
+    diary_id = db.diaries.insert_one({"conversations": legacy, "message_count": 0}).inserted_id
+
+    assert conversation_store.migrate_embedded() == 1
+
+    diary = db.diaries.find_one({"_id": diary_id})
+    assert "conversations" not in diary
+    assert diary["message_count"] == 10
+    assert [bucket["count"] for bucket in db.diary_messages.find({"diary_id": diary_id})] == [4, 4, 2]
+    assert _contents(conversation_store.load_for_diary(diary)) == _contents(legacy)
+    assert conversation_store.migrate_embedded() == 0
+
+
+def test_migrate_keeps_embedded_history_before_existing_buckets(db):
+    legacy = _messages(3, "예전")
+    diary_id = db.diaries.insert_one({"conversations": legacy, "message_count": 0}).inserted_id
+    # 이전하기 전에 버킷 저장소로 이미 새 대화가 쌓인 일기
+    conversation_store.append_messages(diary_id, _messages(2, "새", START + datetime.timedelta(days=1)))
+    assert _contents(conversation_store.load_for_diary(db.diaries.find_one({"_id": diary_id}))) == \
+        ["예전 0", "예전 1", "예전 2", "새 0", "새 1"]
+
+    conversation_store.migrate_embedded()
+    # 이전한 앞쪽 버킷은 찬 것으로 표시되어 이후 메시지는 기존 버킷 뒤로 붙습니다.
+    conversation_store.append_messages(diary_id, _messages(1, "다음", START + datetime.timedelta(days=2)))
+
+    diary = db.diaries.find_one({"_id": diary_id})
+    assert "conversations" not in diary
+    assert diary["message_count"] == 6
+    assert _contents(conversation_store.load_for_diary(diary)) == \
+        ["예전 0", "예전 1", "예전 2", "새 0", "새 1", "다음 0"]
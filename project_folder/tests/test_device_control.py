@@ -0,0 +1,85 @@
+import pytest
+
+from features.lg_appliance import device_provisioning, lg_appliance_service
+
+TV = {"power": "off", "volume": 10}
+WASHER = {"power": "off", "courses": ["표준", "울/섬세"], "modes": ["세탁"]}
+AC = {"power": "off", "temperature": 24, "modes": ["냉방", "제습"], "fan_speeds": ["약", "강"]}
+
+
+@pytest.mark.parametrize("device, command, value", [
+    (TV, "power", "on"),
+    (TV, "power", "off"),
+    (AC, "temperature", 22),
+    (AC, "temperature", 22.5),
+    (AC, "mode", "제습"),
+    (AC, "fan_speed", "강"),
+    (WASHER, "course", "울/섬세"),
+])
+def test_validate_command_accepts(device, command, value):
+    assert lg_appliance_service._validate_command(device, command, value) is None
+
+
+@pytest.mark.parametrize("device, command, value, message", [
+    (TV, "power", "toggle", "power 는 on 또는 off 입니다."),
+    (TV, "temperature", 20, "온도를 조절할 수 없는 가전입니다."),
+    (AC, "temperature", "20", "온도는 숫자여야 합니다."),
+    (AC, "temperature", True, "온도는 숫자여야 합니다."),
+    (TV, "course", "표준", "'course' 명령을 지원하지 않는 가전입니다."),
+    (WASHER, "course", "이불", "지원하지 않는 course 값입니다: 이불"),
+    (TV, "channel", 7, "알 수 없는 명령입니다: channel"),
+])
+def test_validate_command_rejects(device, command, value, message):
+    assert lg_appliance_service._validate_command(device, command, value) == message
+
+
+@pytest.fixture
+def devices(app, user_id):
+    with app.app_context():
+        device_provisioning.provision_devices(user_id, notify=False)
+        yield
+
+
+def test_control_devices_applies_all_commands(app, db, user_id, devices):
+    with app.app_context():
+        results, missing = lg_appliance_service.control_devices(user_id, [
+            {"device": "거실 TV", "command": "power", "value": "on"},
+            {"device": "거실 에어컨", "command": "power", "value": "on"},
+            {"device": "거실 에어컨", "command": "temperature", "value": 22},
+        ])
+
+    assert missing == []
+    assert results["거실 TV"]["power"] == "on"
+    assert results["거실 에어컨"]["power"] == "on"
+    assert results["거실 에어컨"]["temperature"] == 22
+
+
+def test_control_devices_rejects_whole_batch(app, db, user_id, devices):
+    with app.app_context(), pytest.raises(lg_appliance_service.InvalidCommandsError) as raised:
+        lg_appliance_service.control_devices(user_id, [
+            {"device": "거실 TV", "command": "power", "value": "on"},
+            {"device": "없는 가전", "command": "power", "value": "on"},
+        ])
+
+    assert [error["index"] for error in raised.value.errors] == [1]
+    assert db.user_LG_devices.find_one(lg_appliance_service.user_device_filter(user_id, "거실 TV"))["power"] == "off"
+
+
+def test_control_devices_reports_device_deleted_during_batch(app, db, user_id, devices, monkeypatch):
+    control_fields = lg_appliance_service._control_fields
+
+    def delete_tv_then_control(device, command, value, now):
+        # 검증이 끝난 뒤 쓰기 전에 다른 요청이 TV 를 삭제한 상황
+        db.user_LG_devices.delete_one(lg_appliance_service.user_device_filter(user_id, "거실 TV"))
+        return control_fields(device, command, value, now)
+
+    monkeypatch.setattr(lg_appliance_service, "_control_fields", delete_tv_then_control)
+    with app.app_context():
+        results, missing = lg_appliance_service.control_devices(user_id, [
+            {"device": "거실 TV", "command": "power", "value": "on"},
+            {"device": "거실 에어컨", "command": "power", "value": "on"},
+        ])
+
+    assert missing == ["거실 TV"]
+    assert list(results) == ["거실 에어컨"]
+    assert results["거실 에어컨"]["power"] == "on"
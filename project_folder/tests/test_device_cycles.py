@@ -0,0 +1,93 @@
+import datetime
+
+import pytest
+
+from features.lg_appliance import device_cycles, device_provisioning, lg_appliance_service
+
+NOW = datetime.datetime.now(datetime.timezone.utc).replace(microsecond=0)
+WASHER, DRYER, VACUUM = "우리집 세탁기", "우리집 건조기", "우리집 로봇청소기"
+
+
+def _iso(at):
+    return at.strftime('%Y-%m-%dT%H:%M:%S.%fZ')
+
+
+@pytest.fixture
+def devices(app, user_id):
+    with app.app_context():
+        device_provisioning.provision_devices(user_id, notify=False)
+        yield
+
+
+def _device(db, user_id, name):
+    return db.user_LG_devices.find_one(lg_appliance_service.user_device_filter(user_id, name))
+
+
+def _start(user_id, name, started_at):
+    lg_appliance_service.simulate_device_usage(user_id, name, _iso(started_at))
+
+
+def test_with_progress_is_derived_from_start_time():
+    device = {"status": "running", "cycle_start_timestamp": NOW - datetime.timedelta(seconds=900), "total_time": 3600}
+    progressed = device_cycles.with_progress(device, NOW)
+
+    assert progressed["remaining_time"] == 2700
+    assert progressed["progress"] == 0.25
+    assert "remaining_time" not in device
+    assert device_cycles.with_progress({"status": "waiting"}, NOW) == {"status": "waiting"}
+
+
+def test_completes_only_due_cycles(app, db, user_id, devices):
+    with app.app_context():
+        _start(user_id, WASHER, NOW - datetime.timedelta(hours=5))
+        _start(user_id, DRYER, NOW - datetime.timedelta(seconds=10))
+        washer = _device(db, user_id, WASHER)
+
+        assert device_cycles.complete_due_cycles(NOW) == 1
+
+    completed = _device(db, user_id, WASHER)
+    assert completed["status"] == "completed"
+    assert completed["power"] == "off"
+    assert completed["run_count"] == washer.get("run_count", 0) + 1
+    assert "cycle_due_at" not in completed
+    # 사용 시간은 완료 시각(cycle_due_at)까지만 셉니다.
+    assert completed["weekly_duration_sec"] == pytest.approx(washer["total_time"])
+    assert _device(db, user_id, DRYER)["status"] == "running"
+
+
+def test_robot_vacuum_docks(app, db, user_id, devices):
+    with app.app_context():
+        _start(user_id, VACUUM, NOW - datetime.timedelta(hours=5))
+        assert device_cycles.complete_due_cycles(NOW) == 1
+
+    assert _device(db, user_id, VACUUM)["status"] == "docked"
+
+
+def test_skips_cycle_restarted_since_it_was_read(app, db, user_id, devices, monkeypatch):
+    restarted_due = NOW + datetime.timedelta(hours=1)
+    completion_update = device_cycles.completion_update
+
+    def restart_then_complete(device, finished_at):
+        # 만료된 사이클을 읽은 뒤 쓰기 전에 사용자가 끝내고 다시 시작해 cycle_due_at 이 바뀐 상황
+        db.user_LG_devices.update_one({"_id": device["_id"]}, {"$set": {"cycle_due_at": restarted_due}})
+        return completion_update(device, finished_at)
+
+    with app.app_context():
+        _start(user_id, WASHER, NOW - datetime.timedelta(hours=5))
+        monkeypatch.setattr(device_cycles, "completion_update", restart_then_complete)
+        assert device_cycles.complete_due_cycles(NOW) == 0
+
+    washer = _device(db, user_id, WASHER)
+    assert washer["status"] == "running"
+    assert device_cycles._aware(washer["cycle_due_at"]) == restarted_due
+
+
+def test_batch_size_limits_one_sweep(app, db, user_id, devices):
+    with app.app_context():
+        for minutes, name in enumerate((WASHER, DRYER, VACUUM)):
+            _start(user_id, name, NOW - datetime.timedelta(hours=5, minutes=minutes))
+
+        assert device_cycles.complete_due_cycles(NOW, batch_size=2) == 2
+        assert device_cycles.complete_due_cycles(NOW, batch_size=2) == 1
+        assert device_cycles.complete_due_cycles(NOW, batch_size=2) == 0
+
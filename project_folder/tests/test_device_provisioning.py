@@ -0,0 +1,45 @@
+from features.lg_appliance import device_provisioning, lg_appliance_service
+
+DEVICE_COUNT = len(device_provisioning.DEFAULT_DEVICE_CONFIGS)
+
+
+def _statuses(results):
+    return {result["status"] for result in results}
+
+
+def test_users_share_default_device_names(app, db):
+    with app.app_context():
+        results = device_provisioning.provision_users(["user-a", "user-b"], notify=False)
+
+    assert all(_statuses(device_results) == {"created"} for device_results in results.values())
+    assert db.user_LG_devices.count_documents({"name": "거실 TV"}) == 2
+
+
+def test_second_provision_reports_exists(app, db, user_id):
+    with app.app_context():
+        device_provisioning.provision_devices(user_id, notify=False)
+        again = device_provisioning.provision_devices(user_id, notify=False)
+
+    assert _statuses(again) == {"exists"}
+    assert db.user_LG_devices.count_documents(lg_appliance_service.user_devices_filter(user_id)) == DEVICE_COUNT
+
+
+def test_backfill_counts_users_in_batches(app, db, user_id, capsys):
+    db.users.insert_many([{"email": f"user-{index}@momentbox.local"} for index in range(4)])
+    with app.app_context():
+        device_provisioning.provision_devices(user_id, notify=False)
+        totals = device_provisioning.backfill_default_devices(batch_size=2)
+
+    assert totals["users"] == 5
+    assert totals["created"] == 4 * DEVICE_COUNT
+    assert totals["exists"] == DEVICE_COUNT
+    assert totals["error"] == 0
+    assert totals["users_per_sec"] > 0
+    assert capsys.readouterr().out.count("users/s") == 3
+
+
+def test_migrate_device_names_fills_legacy_documents(app, db, user_id):
+    db.user_LG_devices.insert_one({"_id": "거실 TV", "userId": user_id, "power": "off"})
+    with app.app_context():
+        assert device_provisioning.migrate_device_names() == 1
+        assert lg_appliance_service.get_device_status(user_id, "거실 TV")["power"] == "off"
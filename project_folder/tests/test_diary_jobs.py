@@ -0,0 +1,64 @@
+import datetime
+import time
+
+from bson.objectid import ObjectId
+
+from config import Config
+from features.ai_coach import ai_coach_service, diary_jobs
+
+
+def _enqueue(db):
+    user_id = db.users.insert_one({"email": "diary@momentbox.local"}).inserted_id
+    diary_id = db.diaries.insert_one({"user_id": user_id, "status": "in_progress"}).inserted_id
+    return diary_jobs.enqueue(user_id, diary_id)
+
+
+def test_run_records_result_with_lease_token(db, monkeypatch):
+    monkeypatch.setattr(ai_coach_service, "generate_diary_logic", lambda user_id, diary_id: {"title": "하루"})
+    _enqueue(db)
+
+    job = diary_jobs._claim()
+    assert isinstance(job["lease_token"], ObjectId)
+    diary_jobs._run(job)
+
+    stored = db.diary_jobs.find_one({"_id": job["_id"]})
+    assert stored["status"] == diary_jobs.STATUS_SUCCEEDED
+    assert stored["result"] == {"title": "하루"}
+    assert "lease_token" not in stored and "active" not in stored
+
+
+def test_expired_worker_does_not_overwrite_new_owner(db, monkeypatch):
+    monkeypatch.setattr(ai_coach_service, "generate_diary_logic", lambda user_id, diary_id: {"title": "늦은 결과"})
+    _enqueue(db)
+    stale = diary_jobs._claim()
+    # 임대가 만료되어 다른 워커가 다시 가져간 상황
+    db.diary_jobs.update_one({"_id": stale["_id"]}, {"$set": {
+        "lease_until": datetime.datetime.now(datetime.timezone.utc) - datetime.timedelta(seconds=1)}})
+    owner = diary_jobs._claim()
+    assert owner["_id"] == stale["_id"] and owner["lease_token"] != stale["lease_token"]
+
+    diary_jobs._run(stale)
+
+    stored = db.diary_jobs.find_one({"_id": owner["_id"]})
+    assert stored["status"] == diary_jobs.STATUS_RUNNING
+    assert stored["lease_token"] == owner["lease_token"]
+    assert "result" not in stored
+
+
+def test_heartbeat_extends_lease_while_running(db, monkeypatch):
+    monkeypatch.setattr(Config, "DIARY_JOB_HEARTBEAT_SEC", 0.02)
+    _enqueue(db)
+    job = diary_jobs._claim()
+    leases = []
+
+    def slow_generate(user_id, diary_id):
+        for _ in range(3):
+            time.sleep(0.05)
+            leases.append(db.diary_jobs.find_one({"_id": job["_id"]})["lease_until"])
+        return {"title": "하루"}
+
+    monkeypatch.setattr(ai_coach_service, "generate_diary_logic", slow_generate)
+    diary_jobs._run(job)
+
+    assert leases[-1] > job["lease_until"]
+    assert db.diary_jobs.find_one({"_id": job["_id"]})["status"] == diary_jobs.STATUS_SUCCEEDED
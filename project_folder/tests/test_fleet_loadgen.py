@@ -0,0 +1,20 @@
+from features.lg_appliance import device_provisioning, fleet_loadgen
+
+
+def test_replay_small_fleet_without_errors(app, db):
+    with app.app_context():
+        user_ids, _ = fleet_loadgen.provision_fleet(3)
+        latencies, errors, _ = fleet_loadgen.replay(fleet_loadgen.ServiceTarget(app), user_ids, days=1, workers=2, seed=1)
+
+    assert not errors
+    assert sum(len(values) for values in latencies.values()) > 0
+    assert db.user_LG_devices.count_documents({"userId": {"$in": user_ids}}) == 3 * len(device_provisioning.DEFAULT_DEVICE_CONFIGS)
+
+
+def test_http_target_goes_through_routes(app, db):
+    with app.app_context():
+        user_ids, _ = fleet_loadgen.provision_fleet(1)
+        target = fleet_loadgen.HttpTarget(app)
+        _, errors, _ = fleet_loadgen.replay(target, user_ids, days=1, workers=1, seed=2)
+
+    assert not errors
@@ -0,0 +1,32 @@
+import datetime
+import json
+
+from bson import ObjectId
+
+import json_provider
+from features.ai_coach import ai_coach_routes
+
+
+def test_datetimes_are_kst_iso_strings_of_the_same_instant():
+    utc = datetime.datetime(2025, 3, 1, 15, 30, tzinfo=datetime.timezone.utc)
+    encoded = json.loads(json_provider.dumps_bytes({"aware": utc, "naive": utc.replace(tzinfo=None)}))
+
+    assert encoded["aware"] == "2025-03-02T00:30:00+09:00"
+    assert encoded["naive"] == encoded["aware"]
+    assert datetime.datetime.fromisoformat(encoded["aware"]) == utc
+
+
+def test_bson_types():
+    oid = ObjectId()
+    encoded = json.loads(json_provider.dumps_bytes({"_id": oid, "tags": ("여행", "바다"), "day": datetime.date(2025, 3, 2)}))
+
+    assert encoded == {"_id": str(oid), "tags": ["여행", "바다"], "day": "2025-03-02"}
+
+
+def test_sse_event_uses_the_rest_encoder():
+    payload = {"job_id": ObjectId(), "updated_at": datetime.datetime(2025, 3, 1, tzinfo=datetime.timezone.utc),
+               "message": "완료"}
+    event = ai_coach_routes._sse_event("succeeded", payload)
+
+    assert event == b"event: succeeded\ndata: " + json_provider.dumps_bytes(payload) + b"\n\n"
+    assert "완료" in event.decode()
@@ -0,0 +1,24 @@
+from types import SimpleNamespace
+
+from features.ai_coach import llm_metrics
+
+
+class _Model:
+    def generate_content(self, contents, **kwargs):
+        return SimpleNamespace(usage_metadata=None, text=contents)
+
+
+class _Chat:
+    def send_message(self, content, stream=False, **kwargs):
+        return iter([SimpleNamespace(text=part) for part in content.split()])
+
+
+def test_time_to_first_token_only_recorded_for_streaming():
+    llm_metrics.generate_content("test_plain", _Model(), "안녕")
+    chunks = list(llm_metrics.stream_message("test_stream", _Chat(), "안녕 하세요"))
+
+    sites = llm_metrics.snapshot()["sites"]
+    assert len(chunks) == 2
+    assert sites["test_plain"]["latency"]["count"] == 1
+    assert sites["test_plain"]["time_to_first_token"]["count"] == 0
+    assert sites["test_stream"]["time_to_first_token"]["count"] == 1
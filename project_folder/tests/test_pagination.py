@@ -0,0 +1,100 @@
+import datetime
+
+import pytest
+from bson.objectid import ObjectId
+
+import pagination
+from config import Config
+from features.diaries.search_index import search_index
+
+NOW = datetime.datetime(2025, 3, 1, 12, 0, 0, 123000, tzinfo=datetime.timezone.utc)
+
+
+def test_cursor_round_trip():
+    doc = {"_id": ObjectId(), "created_at": NOW}
+    assert pagination.decode_cursor(pagination.encode_cursor(doc)) == (NOW, doc["_id"])
+
+
+def test_naive_created_at_is_utc():
+    doc = {"_id": ObjectId(), "created_at": NOW.replace(tzinfo=None)}
+    assert pagination.decode_cursor(pagination.encode_cursor(doc)) == (NOW, doc["_id"])
+
+
+def test_rank_cursor_round_trip():
+    position = (7.123456789012345, NOW, ObjectId())
+    assert pagination.decode_rank_cursor(pagination.encode_rank_cursor(position)) == position
+
+
+@pytest.mark.parametrize("token", ["not-a-cursor", "MTIzOm5vdC1hbi1vaWQ", "////"])
+def test_invalid_cursor(token):
+    with pytest.raises(ValueError):
+        pagination.decode_cursor(token)
+    with pytest.raises(ValueError):
+        pagination.decode_rank_cursor(token)
+
+
+def test_parse_page_args_always_bounds_the_page():
+    assert pagination.parse_page_args({}) == (Config.PAGE_DEFAULT_LIMIT, None)
+    assert pagination.parse_page_args({"limit": "0"})[0] == 1
+    assert pagination.parse_page_args({"limit": "100000"})[0] == Config.PAGE_MAX_LIMIT
+    with pytest.raises(ValueError):
+        pagination.parse_page_args({"limit": "many"})
+
+
+def test_paginate_walks_every_document_once(db):
+    # 같은 created_at 이 섞여 있어도 _id 로 순서가 정해져 빠지거나 겹치지 않습니다.
+    for i in range(25):
+        db.diaries.insert_one({"user_id": 1, "created_at": NOW - datetime.timedelta(minutes=i // 3)})
+
+    seen, cursor = [], None
+    while True:
+        docs, cursor = pagination.paginate(db.diaries, {"user_id": 1}, 10, cursor and pagination.decode_cursor(cursor))
+        seen.extend(doc["_id"] for doc in docs)
+        if cursor is None:
+            break
+
+    expected = [doc["_id"] for doc in db.diaries.find().sort(pagination.SORT)]
+    assert seen == expected
+
+
+def _follow(client, headers, url):
+    items, cursor = [], None
+    while True:
+        response = client.get(url + (f"&cursor={cursor}" if cursor else ""), headers=headers)
+        assert response.status_code == 200
+        items.extend(response.get_json())
+        cursor = response.headers.get(pagination.NEXT_CURSOR_HEADER)
+        if not cursor:
+            return items
+
+
+def test_routes_are_bounded_and_follow_cursor(app, db, user_id, auth_headers, monkeypatch):
+    monkeypatch.setattr(Config, "PAGE_DEFAULT_LIMIT", 7)
+    user_oid = ObjectId(user_id)
+    for i in range(20):
+        db.diaries.insert_one({
+            "user_id": user_oid, "status": "completed", "title": f"볶음밥을 먹은 날 {i}" if i % 2 else f"산책 {i}",
+            "summary_context": "맛있었다", "created_at": NOW - datetime.timedelta(hours=i),
+            "photos": [{"url": f"https://example.com/{i}.jpg"}],
+        })
+    with app.app_context():
+        search_index.rebuild()
+    client = app.test_client()
+
+    first = client.get("/api/diaries/", headers=auth_headers)
+    assert len(first.get_json()) == 7
+    assert first.headers.get(pagination.NEXT_CURSOR_HEADER)
+
+    assert len(_follow(client, auth_headers, "/api/diaries/?x=1")) == 20
+    assert len(_follow(client, auth_headers, "/api/diaries/gallery?x=1")) == 20
+
+    found = _follow(client, auth_headers, "/api/diaries/?search=볶음밥")
+    assert len(found) == 10
+    assert len({diary["_id"] for diary in found}) == 10
+    assert all("볶음밥" in diary["title"] for diary in found)
+
+
+def test_search_cursor_is_rejected_by_plain_list(app, auth_headers):
+    token = pagination.encode_rank_cursor((1.0, NOW, ObjectId()))
+    response = app.test_client().get(f"/api/diaries/?cursor={token}", headers=auth_headers)
+    assert response.status_code == 400
@@ -0,0 +1,39 @@
+"""
+서비스 쿼리가 인덱스를 타는지(winning plan 에 COLLSCAN 이 없는지) 확인합니다.
+
+mongomock 에는 쿼리 플래너가 없으므로 실제 MongoDB 가 필요합니다.
+TEST_MONGO_URI(기본 mongodb://localhost:27017) 에 임시 DB 를 만들어 인덱스를 적용하고, 연결되지 않으면 건너뜁니다.
+"""
+import os
+import uuid
+
+import pytest
+from pymongo import MongoClient
+from pymongo.errors import PyMongoError
+
+import indexes
+
+TEST_MONGO_URI = os.getenv("TEST_MONGO_URI", "mongodb://localhost:27017")
+QUERY_PLANS = indexes._query_plans()
+
+
+@pytest.fixture(scope="module")
+def real_db():
+    client = MongoClient(TEST_MONGO_URI, serverSelectionTimeoutMS=2000, tz_aware=True)
+    try:
+        client.admin.command("ping")
+    except PyMongoError as e:
+        client.close()
+        pytest.skip(f"MongoDB 에 연결할 수 없습니다 ({TEST_MONGO_URI}): {e}")
+    name = f"momentbox_query_plans_{uuid.uuid4().hex[:8]}"
+    db = client[name]
+    assert indexes.ensure_indexes(db) == []
+    yield db
+    client.drop_database(name)
+    client.close()
+
+
+@pytest.mark.parametrize("name, collection, query_filter, sort", QUERY_PLANS, ids=[plan[0] for plan in QUERY_PLANS])
+def test_query_uses_index(real_db, name, collection, query_filter, sort):
+    stages = indexes.plan_stages(real_db, collection, query_filter, sort)
+    assert "COLLSCAN" not in stages, f"{name}: {' <- '.join(stages)}"
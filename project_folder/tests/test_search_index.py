@@ -0,0 +1,89 @@
+import datetime
+
+from bson.objectid import ObjectId
+
+from features.ai_coach import conversation_store
+from features.diaries.search_index import search_index, tokenize
+
+NOW = datetime.datetime(2025, 3, 1, 12, 0, tzinfo=datetime.timezone.utc)
+
+
+def test_tokenize_korean_bigrams_and_words():
+    assert tokenize("볶음밥을 먹었다") == ["볶음", "음밥", "밥을", "먹었", "었다"]
+    assert tokenize("밥 Pizza 2025년!") == ["밥", "pizza", "2025", "년"]
+
+
+def test_tokenize_normalizes_width_and_case():
+    assert tokenize("ＰＩＺＺＡ") == ["pizza"]
+
+
+def test_tokenize_syllables_for_indexing():
+    assert tokenize("볶음밥", syllables=True) == ["볶음", "음밥", "볶", "음", "밥"]
+    assert tokenize("밥", syllables=True) == ["밥"]
+
+
+def _diary(db, user_id, title, summary="", hours_ago=0, categories=(), status="completed", conversations=()):
+    diary_id = db.diaries.insert_one({
+        "user_id": user_id, "status": status, "title": title, "summary_context": summary,
+        "categories": list(categories), "created_at": NOW - datetime.timedelta(hours=hours_ago),
+    }).inserted_id
+    if conversations:
+        conversation_store.append_messages(diary_id, list(conversations))
+    search_index.index_diary(diary_id)
+    return diary_id
+
+
+def test_search_requires_every_term_and_ranks_title_first(db):
+    user_id = ObjectId()
+    in_title = _diary(db, user_id, "제주 여행", "바다를 봤다", hours_ago=3)
+    in_summary = _diary(db, user_id, "주말", "제주로 여행을 갔다", hours_ago=1)
+    _diary(db, user_id, "제주 맛집", "흑돼지를 먹었다")
+    _diary(db, ObjectId(), "제주 여행", "다른 사용자")
+
+    ids, next_position = search_index.search(user_id, "제주 여행")
+
+    assert ids == [in_title, in_summary]
+    assert next_position is None
+
+
+def test_single_syllable_query_matches_inside_words(db):
+    user_id = ObjectId()
+    fried_rice = _diary(db, user_id, "볶음밥을 먹은 날")
+    _diary(db, user_id, "산책")
+
+    assert search_index.search(user_id, "밥")[0] == [fried_rice]
+
+
+def test_conversation_turns_and_incomplete_diaries(db):
+    user_id = ObjectId()
+    talked = _diary(db, user_id, "하루", conversations=[conversation_store.make_message("user", "오늘 캠핑을 갔어")])
+    _diary(db, user_id, "캠핑 준비", status="in_progress")
+
+    assert search_index.search(user_id, "캠핑")[0] == [talked]
+
+
+def test_reindex_and_remove(db):
+    user_id = ObjectId()
+    diary_id = _diary(db, user_id, "제주 여행")
+    db.diaries.update_one({"_id": diary_id}, {"$set": {"title": "부산 여행"}})
+    search_index.index_diary(diary_id)
+
+    assert search_index.search(user_id, "제주")[0] == []
+    assert search_index.search(user_id, "부산")[0] == [diary_id]
+    search_index.remove_diary(diary_id)
+    assert search_index.search(user_id, "부산")[0] == []
+
+
+def test_search_pages_by_rank_position(db):
+    user_id = ObjectId()
+    # 점수가 같은 일기는 최신순으로 이어집니다.
+    expected = [_diary(db, user_id, f"산책 {i}", hours_ago=i) for i in range(5)]
+
+    ids, position = search_index.search(user_id, "산책", limit=2)
+    pages = [ids]
+    while position:
+        ids, position = search_index.search(user_id, "산책", limit=2, after=position)
+        pages.append(ids)
+
+    assert [len(page) for page in pages] == [2, 2, 1]
+    assert [diary_id for page in pages for diary_id in page] == expected